@@ -0,0 +1,21 @@
+"""
+Benchmark suite for the public API, see benchmarks/README.md.
+
+Importing the package puts ``src`` on the path and points Django at the project
+settings; modules that touch models call ``django.setup()`` first. Celery is never
+reached (task enqueues are patched out), so a missing broker setting falls back to an
+in-memory one, and the webhook secret gets a default so webhooks can be signed.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ.setdefault("CELERY_BROKER_URL", "memory://")
+os.environ.setdefault("CELERY_RESULT_BACKEND", "cache+memory://")
+os.environ.setdefault("STRIPE_WEBHOOK_SECRET", "whsec_benchmark")
@@ -0,0 +1,138 @@
+"""
+Analytics benchmark: seeds a year of members, payments and memberships into a throwaway
+test database and times every report over the last 12 months, uncached.
+
+    python -m benchmarks.analytics --members 20000
+"""
+
+import argparse
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+import django
+
+import benchmarks  # noqa: F401  (puts src on the path)
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.test.utils import setup_databases, teardown_databases  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from apps.analytics.reports import REPORTS, shift_month  # noqa: E402
+from apps.membership.models import Membership  # noqa: E402
+from apps.payments.models import Payment  # noqa: E402
+from apps.plans.models import MembershipPlan  # noqa: E402
+
+User = get_user_model()
+
+# Chance that a member stops after a period, that a charge fails and that a checkout
+# is abandoned.
+CHURN = 0.1
+FAILURE = 0.05
+ABANDONED = 0.03
+
+
+def seed(members, batch_size=5000, seed=42):
+    rng = random.Random(seed)
+    plans = [
+        MembershipPlan.objects.create(
+            name="Basic", code="basic", duration_days=30, price=Decimal("30"), tier="BASIC"
+        ),
+        MembershipPlan.objects.create(
+            name="Standard", code="standard", duration_days=30, price=Decimal("50"), tier="STANDARD"
+        ),
+        MembershipPlan.objects.create(
+            name="Annual", code="annual", duration_days=365, price=Decimal("500"), tier="PREMIUM"
+        ),
+    ]
+    now = timezone.now()
+    year_ago = now - timedelta(days=365)
+
+    # Payments are backdated, which auto_now_add would overwrite on insert.
+    created_at = Payment._meta.get_field("created_at")
+    with patch.object(created_at, "auto_now_add", False):
+        for first in range(0, members, batch_size):
+            users = User.objects.bulk_create(
+                User(email=f"analytics{i}@bench.bench")
+                for i in range(first, min(first + batch_size, members))
+            )
+            payments = []
+            memberships = []
+            for user in users:
+                plan = rng.choice(plans)
+                paid_at = year_ago + timedelta(seconds=rng.randrange(365 * 86400))
+                payment_type = Payment.TypeChoices.MEMBERSHIP_PURCHASE
+                while paid_at < now:
+                    if rng.random() < ABANDONED:
+                        payments.append(
+                            Payment(
+                                user=user,
+                                membership_id=plan.id,
+                                type=payment_type,
+                                money_to_pay=plan.price,
+                                status=Payment.StatusChoices.EXPIRED,
+                                created_at=paid_at,
+                            )
+                        )
+                    status = (
+                        Payment.StatusChoices.FAILED
+                        if rng.random() < FAILURE
+                        else Payment.StatusChoices.PAID
+                    )
+                    payments.append(
+                        Payment(
+                            user=user,
+                            membership_id=plan.id,
+                            type=payment_type,
+                            money_to_pay=plan.price,
+                            status=status,
+                            created_at=paid_at,
+                        )
+                    )
+                    if status == Payment.StatusChoices.FAILED or rng.random() < CHURN:
+                        break
+                    payment_type = Payment.TypeChoices.RENEWAL
+                    paid_at += timedelta(days=plan.duration_days)
+                end_date = min(paid_at, now).date() + timedelta(days=plan.duration_days)
+                memberships.append(
+                    Membership(
+                        member=user,
+                        plan=plan,
+                        start_date=end_date - timedelta(days=plan.duration_days),
+                        end_date=end_date,
+                        price_at_purchase=plan.price,
+                    )
+                )
+            Payment.objects.bulk_create(payments)
+            Membership.objects.bulk_create(memberships)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--members", type=int, default=20_000)
+    options = parser.parse_args()
+
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    database_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        seed(options.members)
+        print(f"{options.members} members, {Payment.objects.count()} payments", flush=True)
+        end = timezone.localdate().replace(day=1)
+        start = shift_month(end, -11)
+        for name, report in REPORTS.items():
+            started = time.perf_counter()
+            report(start, end)
+            print(f"{name:>8}: {time.perf_counter() - started:.3f}s", flush=True)
+    finally:
+        teardown_databases(database_config, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
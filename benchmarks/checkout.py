@@ -0,0 +1,207 @@
+"""
+Sync vs async checkout benchmark.
+
+Starts the fake Stripe stub server (apps.payments.stripe_fake) with a fixed latency,
+serves the project once with gunicorn sync workers (the Dockerfile setup) and once with
+uvicorn, and fires the same concurrent checkout load at StripeCheckoutView and
+AsyncStripeCheckoutView. Every request uses its own user so none of them is answered
+from the "recent pending payment" shortcut.
+
+Run from the repository root against the database and cache configured in .env:
+
+    python benchmarks/checkout.py --requests 2000 --concurrency 200 --stripe-latency 0.3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+from apps.payments.stripe_fake import FakeStripe, make_fake_stripe_server  # noqa: E402
+from apps.plans.models import MembershipPlan  # noqa: E402
+
+User = get_user_model()
+
+TARGETS = {
+    "sync-gunicorn": (
+        [
+            "gunicorn",
+            "--bind",
+            "127.0.0.1:{port}",
+            "--workers",
+            "{workers}",
+            "--timeout",
+            "120",
+            "config.wsgi:application",
+        ],
+        "/api/payments/create-checkout-session/",
+    ),
+    "async-uvicorn": (
+        [
+            "uvicorn",
+            "config.asgi:application",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            "{port}",
+            "--workers",
+            "{workers}",
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        "/api/payments/create-checkout-session/async/",
+    ),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed(run_id, count):
+    plan, _ = MembershipPlan.objects.get_or_create(
+        code="benchmark",
+        defaults={"name": "Benchmark", "duration_days": 30, "price": 100, "tier": "BASIC"},
+    )
+    users = User.objects.bulk_create(
+        User(email=f"bench-{run_id}-{i}@bench.local") for i in range(count)
+    )
+    return plan, [str(AccessToken.for_user(user)) for user in users]
+
+
+def wait_until_up(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start in {timeout}s.")
+
+
+async def fire(url, plan_id, tokens, concurrency, timeout):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], {}
+
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+
+        async def one(token):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.post(
+                        url,
+                        json={"membership": plan_id},
+                        headers={"Authorization": f"Bearer {token}"},
+                    )
+                    code = response.status_code
+                except httpx.HTTPError:
+                    code = "error"
+                latencies.append(time.perf_counter() - started)
+                statuses[code] = statuses.get(code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(token) for token in tokens))
+        elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": len(tokens),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(tokens) / elapsed, 1),
+        "p50_ms": round(quantiles[49] * 1000, 1),
+        "p99_ms": round(quantiles[98] * 1000, 1),
+        "statuses": {str(code): count for code, count in sorted(statuses.items(), key=str)},
+    }
+
+
+def run_target(name, args, stripe_base, run_id):
+    command, path = TARGETS[name]
+    port = free_port()
+    env = {
+        **os.environ,
+        "STRIPE_API_BASE": stripe_base,
+        "STRIPE_SECRET_KEY": os.environ.get("STRIPE_SECRET_KEY") or "sk_test_benchmark",
+        "STRIPE_MAX_NETWORK_RETRIES": "0",
+    }
+    command = [part.format(port=port, workers=args.workers) for part in command]
+    server = subprocess.Popen(command, cwd=SRC, env=env)
+    try:
+        wait_until_up(port)
+        plan, tokens = seed(f"{run_id}-{name}", args.requests)
+        return asyncio.run(
+            fire(f"http://127.0.0.1:{port}{path}", plan.id, tokens, args.concurrency, args.timeout)
+        )
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--stripe-latency", type=float, default=0.3, help="Seconds per fake Stripe call."
+    )
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--target", choices=sorted(TARGETS), action="append")
+    parser.add_argument("--output", help="Also write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    stripe_server = make_fake_stripe_server(backend=FakeStripe(latency=args.stripe_latency))
+    threading.Thread(target=stripe_server.serve_forever, daemon=True).start()
+    host, port = stripe_server.server_address
+    run_id = uuid.uuid4().hex[:8]
+
+    results = {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "stripe_latency": args.stripe_latency,
+        },
+    }
+    try:
+        for name in args.target or TARGETS:
+            results[name] = run_target(name, args, f"http://{host}:{port}", run_id)
+            print(f"{name}: {json.dumps(results[name])}", flush=True)
+    finally:
+        stripe_server.shutdown()
+        User.objects.filter(email__startswith=f"bench-{run_id}-").delete()
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
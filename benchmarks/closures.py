@@ -0,0 +1,91 @@
+"""
+Facility closure engine benchmark: seeds memberships into a throwaway test database,
+applies one closure to all of them and reports the time per chunk size.
+
+    python -m benchmarks.closures --memberships 500000
+    python -m benchmarks.closures --memberships 100000 --chunk-size 5000 --chunk-size 20000
+"""
+
+import argparse
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+import django
+
+import benchmarks  # noqa: F401  (puts src on the path)
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.test.utils import setup_databases, teardown_databases  # noqa: E402
+
+from apps.membership.closures import CLOSURE_CHUNK_SIZE, apply_closure  # noqa: E402
+from apps.membership.models import FacilityClosure, Membership  # noqa: E402
+from apps.plans.models import MembershipPlan  # noqa: E402
+
+User = get_user_model()
+
+
+def seed(memberships, batch_size=5000):
+    plan = MembershipPlan.objects.create(
+        name="Bench", code="bench", duration_days=30, price=Decimal("30")
+    )
+    today = date.today()
+    for first in range(0, memberships, batch_size):
+        users = User.objects.bulk_create(
+            User(email=f"closure{i}@bench.bench")
+            for i in range(first, min(first + batch_size, memberships))
+        )
+        Membership.objects.bulk_create(
+            Membership(
+                member=user,
+                plan=plan,
+                start_date=today - timedelta(days=i % 30),
+                end_date=today - timedelta(days=i % 30) + timedelta(days=30),
+                price_at_purchase=plan.price,
+            )
+            for i, user in enumerate(users)
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--memberships", type=int, default=500_000)
+    parser.add_argument(
+        "--chunk-size", type=int, action="append", help=f"Repeatable, default {CLOSURE_CHUNK_SIZE}."
+    )
+    options = parser.parse_args()
+
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    database_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        started = time.perf_counter()
+        seed(options.memberships)
+        print(
+            f"Seeded {options.memberships} memberships in {time.perf_counter() - started:.1f}s.",
+            flush=True,
+        )
+
+        for chunk_size in options.chunk_size or [CLOSURE_CHUNK_SIZE]:
+            closure = FacilityClosure.objects.create(
+                starts_on=date.today() - timedelta(days=3), ends_on=date.today() + timedelta(days=3)
+            )
+            started = time.perf_counter()
+            summary = apply_closure(closure, chunk_size=chunk_size)
+            elapsed = time.perf_counter() - started
+            print(
+                f"chunk size {chunk_size:>6}: {summary['extended']} memberships extended in "
+                f"{summary['chunks']} chunks, {elapsed:.2f}s "
+                f"({summary['extended'] / elapsed:,.0f} memberships/s)",
+                flush=True,
+            )
+    finally:
+        teardown_databases(database_config, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
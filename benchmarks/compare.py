@@ -0,0 +1,58 @@
+"""
+Compare two benchmark result files scenario by scenario.
+
+    python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+METRICS = [
+    # key, label, True if higher is better
+    ("requests_per_second", "req/s", True),
+    ("p50_ms", "p50 ms", False),
+    ("p95_ms", "p95 ms", False),
+    ("p99_ms", "p99 ms", False),
+    ("queries_per_request", "queries", False),
+]
+
+
+def change(before, after, higher_is_better):
+    if not before:
+        return ""
+    delta = (after - before) / before * 100
+    better = delta > 0 if higher_is_better else delta < 0
+    return f"{delta:+.1f}%{'' if abs(delta) < 5 else (' better' if better else ' worse')}"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    before = json.loads(Path(args.before).read_text())
+    after = json.loads(Path(args.after).read_text())
+    print(
+        f"before: {before['meta']['git_revision']} on {before['meta']['database']}, "
+        f"after: {after['meta']['git_revision']} on {after['meta']['database']}"
+    )
+
+    for name, result in after["scenarios"].items():
+        baseline = before["scenarios"].get(name)
+        print(f"\n{name}")
+        if baseline is None:
+            print("  not in the baseline run")
+            continue
+        for key, label, higher_is_better in METRICS:
+            print(
+                f"  {label:<10} {baseline[key]:>10} -> {result[key]:>10}  "
+                f"{change(baseline[key], result[key], higher_is_better)}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Auto-renewal benchmark: seeds auto-renewing memberships that all end tomorrow into a
+throwaway test database, renews them against a fake Stripe with the given latency and
+reports the throughput per shard, as one Celery worker would see it.
+
+    python -m benchmarks.renewals --memberships 20000 --stripe-latency 0.3
+    python -m benchmarks.renewals --memberships 20000 --concurrency 4 --concurrency 16
+"""
+
+import argparse
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+import django
+
+import benchmarks  # noqa: F401  (puts src on the path)
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.test.utils import setup_databases, teardown_databases  # noqa: E402
+
+from apps.membership.models import Membership  # noqa: E402
+from apps.membership.renewals import renew_memberships  # noqa: E402
+from apps.payments.models import Payment, StripeCustomer  # noqa: E402
+from apps.payments.stripe_client import StripeClient  # noqa: E402
+from apps.payments.stripe_fake import FakeStripe, FakeStripeHTTPClient  # noqa: E402
+from apps.plans.models import MembershipPlan  # noqa: E402
+
+User = get_user_model()
+
+
+def seed(memberships, batch_size=5000):
+    plan = MembershipPlan.objects.create(
+        name="Bench", code="bench", duration_days=30, price=Decimal("30")
+    )
+    end_date = date.today() + timedelta(days=1)
+    for first in range(0, memberships, batch_size):
+        users = User.objects.bulk_create(
+            User(email=f"renewal{i}@bench.bench")
+            for i in range(first, min(first + batch_size, memberships))
+        )
+        StripeCustomer.objects.bulk_create(
+            StripeCustomer(
+                user=user, stripe_customer_id=f"cus_{user.id}", default_payment_method="pm_card"
+            )
+            for user in users
+        )
+        Membership.objects.bulk_create(
+            Membership(
+                member=user,
+                plan=plan,
+                start_date=end_date - timedelta(days=30),
+                end_date=end_date,
+                price_at_purchase=plan.price,
+                auto_renew=True,
+            )
+            for user in users
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--memberships", type=int, default=20_000)
+    parser.add_argument(
+        "--stripe-latency", type=float, default=0.3, help="Seconds per Stripe call."
+    )
+    parser.add_argument(
+        "--concurrency", type=int, action="append", help="Repeatable, default RENEWAL_CONCURRENCY."
+    )
+    options = parser.parse_args()
+
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    database_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        seed(options.memberships)
+        for concurrency in options.concurrency or [settings.RENEWAL_CONCURRENCY]:
+            Membership.objects.update(end_date=date.today() + timedelta(days=1))
+            Payment.objects.all().delete()
+            stripe_client = StripeClient(
+                "sk_test_benchmark",
+                http_client=FakeStripeHTTPClient(FakeStripe(latency=options.stripe_latency)),
+                max_network_retries=0,
+            )
+            started = time.perf_counter()
+            with patch("apps.payments.stripe_helper.get_stripe_client", return_value=stripe_client):
+                summary = renew_memberships(concurrency=concurrency)
+            elapsed = time.perf_counter() - started
+            rate = summary["renewed"] / elapsed
+            print(
+                f"concurrency {concurrency:>3}: {summary['renewed']} renewed in {summary['batches']} "
+                f"batches, {elapsed:.2f}s ({rate:,.0f} renewals/s per shard, "
+                f"{rate * settings.RENEWAL_SHARDS * 3600:,.0f}/hour with {settings.RENEWAL_SHARDS} shards)",
+                flush=True,
+            )
+    finally:
+        teardown_databases(database_config, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Run the API benchmark scenarios in-process and report throughput, latency percentiles
+and queries per request.
+
+By default a throwaway test database is created and migrated (like the test runner
+does), seeded, measured and dropped, so the configured database is left alone. With
+--use-configured-db the run seeds into the configured database under a unique prefix
+and removes its rows afterwards.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --users 20000 --requests 2000 --scenario checkout --scenario payment_history
+    POSTGRES_ENGINE=django.db.backends.sqlite3 python -m benchmarks.run --output before.json
+
+Calls go through Django's test client, so the numbers cover the full request cycle
+(middleware, auth, views, ORM) without the network. --concurrency runs that many
+client threads, each with its own database connection; keep it at 1 on SQLite.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from datetime import UTC, datetime
+from pathlib import Path
+
+import django
+
+import benchmarks  # noqa: F401  (puts src on the path)
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_databases, teardown_databases  # noqa: E402
+
+from benchmarks.scenarios import SCENARIOS  # noqa: E402
+from benchmarks.seed import delete, seed  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def percentile(values, pct):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+def execute(client, call):
+    if call.body is None or isinstance(call.body, bytes):
+        data = call.body or b""
+    else:
+        data = json.dumps(call.body)
+    return client.generic(
+        call.method, call.path, data=data, content_type="application/json", headers=call.headers
+    )
+
+
+def run_scenario(scenario, requests, concurrency):
+    counter = itertools.count()
+    samples = []
+
+    def loop():
+        client = Client()
+        while (i := next(counter)) < requests:
+            call = scenario.build(i)
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = execute(client, call)
+                latency = time.perf_counter() - started
+            samples.append((latency, len(queries), response.status_code))
+            scenario.observe(i, response)
+
+    def worker():
+        try:
+            loop()
+        finally:
+            connection.close()
+
+    with ExitStack() as stack:
+        for context in scenario.patches():
+            stack.enter_context(context)
+
+        started = time.perf_counter()
+        if concurrency == 1:
+            # Stay on the main thread so a throwaway in-memory SQLite database is shared.
+            loop()
+        else:
+            threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - started
+        extras = scenario.finish()
+
+    latencies = sorted(sample[0] for sample in samples)
+    queries = [sample[1] for sample in samples]
+    statuses = {}
+    for _, _, status_code in samples:
+        statuses[str(status_code)] = statuses.get(str(status_code), 0) + 1
+
+    report = {
+        "description": scenario.description,
+        "requests": len(samples),
+        "errors": sum(1 for sample in samples if sample[2] >= 400),
+        "statuses": statuses,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(samples) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "queries_per_request": round(statistics.mean(queries), 2),
+        "max_queries": max(queries),
+        **extras,
+    }
+    if scenario.items_per_call > 1:
+        report["items_per_second"] = round(len(samples) * scenario.items_per_call / elapsed, 1)
+    return report
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--scenario",
+        choices=sorted(SCENARIOS),
+        action="append",
+        help="Scenario to run, repeatable. All of them by default.",
+    )
+    parser.add_argument("--requests", type=int, default=500, help="Calls per scenario.")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--payments-per-user", type=int, default=10)
+    parser.add_argument(
+        "--history-pages", type=int, default=3, help="Pages each member walks in payment_history."
+    )
+    parser.add_argument(
+        "--access-batch", type=int, default=100, help="Checks per access_check_batch call."
+    )
+    parser.add_argument(
+        "--stripe-latency", type=float, default=0.0, help="Seconds per fake Stripe call."
+    )
+    parser.add_argument("--use-configured-db", action="store_true")
+    parser.add_argument(
+        "--output", help=f"JSON file for the results, default: a new file in {RESULTS_DIR}."
+    )
+    options = parser.parse_args()
+
+    # Expected 4xx answers would otherwise log a warning per request.
+    logging.getLogger("django.request").setLevel(logging.ERROR)
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, "testserver"]
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+    database_config = None
+    if not options.use_configured_db:
+        database_config = setup_databases(verbosity=0, interactive=False)
+    prefix = uuid.uuid4().hex[:8]
+
+    try:
+        seed_started = time.perf_counter()
+        data = seed(users=options.users, payments_per_user=options.payments_per_user, prefix=prefix)
+        print(
+            f"Seeded {options.users} users in {time.perf_counter() - seed_started:.1f}s.",
+            flush=True,
+        )
+
+        results = {}
+        for name in options.scenario or SCENARIOS:
+            results[name] = run_scenario(
+                SCENARIOS[name](data, options), options.requests, options.concurrency
+            )
+            report = results[name]
+            print(
+                f"{name:<20} {report['requests_per_second']:>8} req/s  "
+                f"p50 {report['p50_ms']:>8} ms  p95 {report['p95_ms']:>8} ms  p99 {report['p99_ms']:>8} ms  "
+                f"{report['queries_per_request']:>6} queries/req  errors {report['errors']}"
+                + (
+                    f"  {report['items_per_second']} items/s"
+                    if "items_per_second" in report
+                    else ""
+                ),
+                flush=True,
+            )
+    finally:
+        if database_config is not None:
+            teardown_databases(database_config, verbosity=0)
+        else:
+            delete(prefix)
+
+    output = {
+        "meta": {
+            "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "options": vars(options),
+        },
+        "scenarios": results,
+    }
+    if options.output:
+        path = Path(options.output)
+    else:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        path = (
+            RESULTS_DIR
+            / f"{datetime.now():%Y%m%d-%H%M%S}-{output['meta']['git_revision'] or 'local'}.json"
+        )
+    path.write_text(json.dumps(output, indent=2))
+    print(f"Results written to {path}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Benchmark scenarios. Each one turns an iteration number into one API call; the runner
+executes and measures it. Scenarios only see the seeded Dataset, so they run the same
+against SQLite and PostgreSQL.
+"""
+
+import hashlib
+import hmac
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import django
+
+import benchmarks  # noqa: F401  (puts src on the path)
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+from apps.payments.events import process_pending_events  # noqa: E402
+from apps.payments.stripe_client import StripeClient  # noqa: E402
+from apps.payments.stripe_fake import FakeStripe, FakeStripeHTTPClient  # noqa: E402
+
+User = get_user_model()
+
+
+@dataclass
+class Call:
+    method: str
+    path: str
+    body: dict | bytes | None = None
+    headers: dict = field(default_factory=dict)
+
+
+class Scenario:
+    name = ""
+    description = ""
+    # Checks, rows, ... handled per call, reported as items_per_second when above 1.
+    items_per_call = 1
+
+    def __init__(self, data, options):
+        self.data = data
+        self.options = options
+        self._tokens = {}
+
+    def patches(self):
+        """Context managers active while the scenario runs."""
+        return []
+
+    def build(self, i: int) -> Call:
+        raise NotImplementedError
+
+    def observe(self, i: int, response):
+        pass
+
+    def finish(self) -> dict:
+        """Extra figures for the report, measured after the timed calls."""
+        return {}
+
+    def auth(self, user_id):
+        if user_id not in self._tokens:
+            self._tokens[user_id] = str(AccessToken.for_user(User(id=user_id)))
+        return {"Authorization": f"Bearer {self._tokens[user_id]}"}
+
+    def member(self, i):
+        return self.data.members[i % len(self.data.members)]
+
+
+class PlanBrowse(Scenario):
+    name = "plan_browse"
+    description = "Plan catalog list and detail pages (the endpoints are staff-only)."
+
+    def build(self, i):
+        if i % 2 == 0:
+            return Call("GET", reverse("plans-list"), headers=self.auth(self.data.staff))
+        plan = self.data.plans[i % len(self.data.plans)]
+        return Call(
+            "GET", reverse("plans-detail", args=[plan.id]), headers=self.auth(self.data.staff)
+        )
+
+
+class StripeScenario(Scenario):
+    def __init__(self, data, options):
+        super().__init__(data, options)
+        self.stripe = FakeStripe(latency=options.stripe_latency)
+
+    def patches(self):
+        stripe_client = StripeClient(
+            "sk_test_benchmark",
+            http_client=FakeStripeHTTPClient(self.stripe),
+            max_network_retries=0,
+        )
+        return [patch("apps.payments.stripe_helper.get_stripe_client", return_value=stripe_client)]
+
+
+class Checkout(StripeScenario):
+    name = "checkout"
+    description = "First purchase by users without a membership, against a fake Stripe."
+
+    def build(self, i):
+        user_id = self.data.prospects[i % len(self.data.prospects)]
+        return Call(
+            "POST",
+            reverse("payments:create-checkout-session"),
+            {"membership": self.data.plans[0].id},
+            self.auth(user_id),
+        )
+
+    def finish(self):
+        return {"stripe_calls": len(self.stripe.requests)}
+
+
+class WebhookBurst(Scenario):
+    name = "webhook_burst"
+    description = "Signed checkout.session.completed webhooks, then draining the event inbox."
+
+    def __init__(self, data, options):
+        super().__init__(data, options)
+        self.run_id = int(time.time() * 1000)
+
+    def patches(self):
+        # Only ingestion is timed; the inbox is drained once in finish().
+        return [patch("apps.payments.views.process_stripe_events_task.delay")]
+
+    def build(self, i):
+        payment_id = self.data.pending_payments[i % len(self.data.pending_payments)]
+        payload = json.dumps(
+            {
+                "id": f"evt_bench_{self.run_id}_{i}",
+                "object": "event",
+                "type": "checkout.session.completed",
+                "data": {
+                    "object": {
+                        "object": "checkout.session",
+                        "metadata": {"payment_id": str(payment_id)},
+                    }
+                },
+            }
+        ).encode()
+        return Call(
+            "POST",
+            reverse("payments:stripe-webhook"),
+            payload,
+            {"Stripe-Signature": self.sign(payload)},
+        )
+
+    def sign(self, payload):
+        timestamp = int(time.time())
+        signature = hmac.new(
+            settings.STRIPE_WEBHOOK_SECRET.encode(),
+            f"{timestamp}.".encode() + payload,
+            hashlib.sha256,
+        ).hexdigest()
+        return f"t={timestamp},v1={signature}"
+
+    def finish(self):
+        started = time.perf_counter()
+        drained = 0
+        while processed := process_pending_events():
+            drained += processed
+        return {"events_drained": drained, "drain_seconds": round(time.perf_counter() - started, 3)}
+
+
+class MembershipList(Scenario):
+    name = "membership_list"
+    description = "A member lists their memberships."
+
+    def build(self, i):
+        return Call("GET", reverse("membership-list"), headers=self.auth(self.member(i)))
+
+
+class MembershipFreeze(Scenario):
+    name = "membership_freeze"
+    description = "Members freeze their active membership for a week."
+
+    def build(self, i):
+        user_id = self.member(i)
+        start = date.today() + timedelta(days=1)
+        return Call(
+            "POST",
+            reverse("membership-freeze", args=[self.data.memberships[user_id]]),
+            {
+                "frozen_from": start.isoformat(),
+                "frozen_to": (start + timedelta(days=7)).isoformat(),
+            },
+            self.auth(user_id),
+        )
+
+
+class MembershipUpgrade(Scenario):
+    name = "membership_upgrade"
+    description = (
+        "Members upgrade to the premium plan (taken from the other end of the member list)."
+    )
+
+    def build(self, i):
+        user_id = self.data.members[-1 - i % len(self.data.members)]
+        url = reverse("membership-upgrade", args=[self.data.memberships[user_id]])
+        return Call("POST", f"{url}?plan_id={self.data.plans[-1].id}", {}, self.auth(user_id))
+
+
+class AccessCheck(Scenario):
+    name = "access_check"
+    description = "Door scanners check single members and cards against the access cache."
+    api_key = "bench-scanner"
+
+    def patches(self):
+        return [override_settings(ACCESS_CHECK_API_KEYS=[self.api_key])]
+
+    def build(self, i):
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        if i % 2:
+            return Call(
+                "GET", f"{reverse('access-check')}?card=card-{self.member(i)}", headers=headers
+            )
+        return Call("GET", f"{reverse('access-check')}?member={self.member(i)}", headers=headers)
+
+
+class AccessCheckBatch(AccessCheck):
+    name = "access_check_batch"
+    description = "Scanners check members in batches (--access-batch per call)."
+
+    def __init__(self, data, options):
+        super().__init__(data, options)
+        self.items_per_call = options.access_batch
+
+    def build(self, i):
+        first = i * self.items_per_call
+        members = [self.member(first + offset) for offset in range(self.items_per_call)]
+        return Call(
+            "POST",
+            reverse("access-check"),
+            {"members": members},
+            {"Authorization": f"Bearer {self.api_key}"},
+        )
+
+
+class PaymentHistory(Scenario):
+    name = "payment_history"
+    description = "Members page through their payment history with keyset cursors."
+
+    def __init__(self, data, options):
+        super().__init__(data, options)
+        self.next_pages = {}
+
+    def build(self, i):
+        user_id = self.member(i // self.options.history_pages)
+        path = self.next_pages.pop(user_id, None) or f"{reverse('payments:history')}?cursor="
+        return Call("GET", path, headers=self.auth(user_id))
+
+    def observe(self, i, response):
+        next_link = response.status_code == 200 and response.json().get("next")
+        if next_link:
+            user_id = self.member(i // self.options.history_pages)
+            self.next_pages[user_id] = next_link.split("testserver", 1)[-1]
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        PlanBrowse,
+        Checkout,
+        MembershipList,
+        MembershipFreeze,
+        MembershipUpgrade,
+        PaymentHistory,
+        AccessCheck,
+        AccessCheckBatch,
+        # Last: activating the pending payments changes members' plans.
+        WebhookBurst,
+    )
+}
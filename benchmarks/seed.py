@@ -0,0 +1,161 @@
+"""
+Data seeder for the benchmarks: users, plans, memberships and payments in bulk.
+
+Every seeded user has an e-mail under ``@<prefix>.bench`` so a run can be removed again
+with ``delete``. Standalone use against the configured database:
+
+    python -m benchmarks.seed --users 10000 --payments-per-user 10
+    python -m benchmarks.seed --delete
+"""
+
+import argparse
+import random
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+
+import django
+
+import benchmarks  # noqa: F401  (puts src on the path)
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+
+from apps.membership.current import set_current_memberships  # noqa: E402
+from apps.membership.models import Membership  # noqa: E402
+from apps.payments.models import Payment  # noqa: E402
+from apps.plans.models import MembershipPlan  # noqa: E402
+
+User = get_user_model()
+
+PLANS = [
+    # code, name, duration_days, price, tier
+    ("bench-basic", "Bench Basic", 30, Decimal("30.00"), MembershipPlan.Tier.BASIC),
+    ("bench-standard", "Bench Standard", 90, Decimal("80.00"), MembershipPlan.Tier.STANDARD),
+    ("bench-premium", "Bench Premium", 365, Decimal("300.00"), MembershipPlan.Tier.PREMIUM),
+]
+
+PAYMENT_STATUSES = [
+    (Payment.StatusChoices.PAID, 0.8),
+    (Payment.StatusChoices.FAILED, 0.1),
+    (Payment.StatusChoices.EXPIRED, 0.05),
+    (Payment.StatusChoices.PENDING, 0.05),
+]
+
+
+@dataclass
+class Dataset:
+    plans: list = field(default_factory=list)
+    staff: int | None = None
+    members: list = field(default_factory=list)
+    prospects: list = field(default_factory=list)
+    memberships: dict = field(default_factory=dict)
+    pending_payments: list = field(default_factory=list)
+
+
+def seed(
+    users: int = 1000,
+    payments_per_user: int = 5,
+    prospect_share: float = 0.2,
+    prefix: str = "run",
+    batch_size: int = 2000,
+    random_seed: int = 42,
+) -> Dataset:
+    """
+    Seed ``users`` users. Most of them ("members") get one active membership on a basic
+    or standard plan and ``payments_per_user`` payments of mixed status; the rest
+    ("prospects") have nothing yet, for checkout scenarios.
+    """
+    rng = random.Random(random_seed)
+    today = date.today()
+    data = Dataset()
+
+    for code, name, duration_days, price, tier in PLANS:
+        plan, _ = MembershipPlan.objects.get_or_create(
+            code=code,
+            defaults={"name": name, "duration_days": duration_days, "price": price, "tier": tier},
+        )
+        data.plans.append(plan)
+
+    created = User.objects.bulk_create(
+        (User(email=f"user{i}@{prefix}.bench") for i in range(users)), batch_size=batch_size
+    )
+    # Cards are named after the user id so scenarios can derive them.
+    for user in created:
+        user.access_card = f"card-{user.id}"
+    User.objects.bulk_update(created, ["access_card"], batch_size=batch_size)
+    data.staff = User.objects.create(email=f"staff@{prefix}.bench", is_staff=True).id
+    prospects = int(users * prospect_share)
+    data.prospects = [user.id for user in created[:prospects]]
+    data.members = [user.id for user in created[prospects:]]
+
+    memberships = []
+    for user_id in data.members:
+        plan = rng.choice(data.plans[:2])
+        start_date = today - timedelta(days=rng.randrange(plan.duration_days))
+        memberships.append(
+            Membership(
+                member_id=user_id,
+                plan=plan,
+                start_date=start_date,
+                end_date=start_date + timedelta(days=plan.duration_days),
+                price_at_purchase=plan.price,
+                status=Membership.Status.ACTIVE,
+            )
+        )
+    Membership.objects.bulk_create(memberships, batch_size=batch_size)
+    set_current_memberships(memberships, batch_size=batch_size)
+    data.memberships = {membership.member_id: membership.id for membership in memberships}
+
+    statuses, weights = zip(*PAYMENT_STATUSES, strict=True)
+    payments = []
+    for user_id in data.members:
+        for status in rng.choices(statuses, weights, k=payments_per_user):
+            plan = rng.choice(data.plans)
+            payments.append(
+                Payment(
+                    user_id=user_id,
+                    membership_id=plan.id,
+                    money_to_pay=plan.price,
+                    status=status,
+                    type=Payment.TypeChoices.MEMBERSHIP_PURCHASE,
+                    session_id=f"cs_bench_{prefix}_{len(payments)}",
+                )
+            )
+    Payment.objects.bulk_create(payments, batch_size=batch_size)
+    data.pending_payments = [p.id for p in payments if p.status == Payment.StatusChoices.PENDING]
+
+    return data
+
+
+def delete(prefix: str | None = None) -> int:
+    """Remove seeded users (and with them their memberships and payments)."""
+    suffix = f"@{prefix}.bench" if prefix else ".bench"
+    deleted, _ = User.objects.filter(email__endswith=suffix).delete()
+    return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--payments-per-user", type=int, default=5)
+    parser.add_argument("--prefix", default="seed")
+    parser.add_argument("--delete", action="store_true", help="Remove seeded data instead.")
+    args = parser.parse_args()
+
+    if args.delete:
+        print(f"Deleted {delete(args.prefix)} rows.")
+        return
+
+    data = seed(users=args.users, payments_per_user=args.payments_per_user, prefix=args.prefix)
+    print(
+        f"Seeded {len(data.members) + len(data.prospects)} users, {len(data.memberships)} memberships "
+        f"and {len(data.members) * args.payments_per_user} payments."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+Revenue and churn reports for management, served by apps.analytics.views.
+
+Each report is a few grouped queries over the whole period, so the database returns one
+row per month, plan and payment type (or per cohort) and Python only folds those rows
+into the response. Months are first-of-month dates; a period runs from ``start`` to
+``end`` with both months included.
+
+Memberships are updated in place on every purchase and renewal, so anything historical
+is read from the payment ledger. ``Payment.membership_id`` holds the plan id.
+"""
+
+import bisect
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from apps.membership.models import Membership
+from apps.payments.models import Payment
+from apps.plans.cache import plan_catalog
+from apps.plans.models import MembershipPlan
+
+User = get_user_model()
+
+# Longest period one request may ask for.
+MAX_MONTHS = 36
+# MRR counts a plan's price per this many days of its duration.
+MRR_DAYS = 30
+RECURRING_TYPES = (Payment.TypeChoices.MEMBERSHIP_PURCHASE, Payment.TypeChoices.RENEWAL)
+FAILED_STATUSES = (Payment.StatusChoices.FAILED, Payment.StatusChoices.REJECTED)
+# Tier of payments whose plan no longer exists.
+UNKNOWN_TIER = "UNKNOWN"
+CENT = Decimal("0.01")
+ZERO = Decimal("0.00")
+
+
+def shift_month(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def months_between(start: date, end: date) -> list[date]:
+    count = (end.year - start.year) * 12 + end.month - start.month + 1
+    return [shift_month(start, offset) for offset in range(count)]
+
+
+def _midnight(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _created_in(start: date, end: date) -> Q:
+    """Payments created in the months ``start``..``end``, as an index-friendly range."""
+    return Q(created_at__gte=_midnight(start), created_at__lt=_midnight(shift_month(end, 1)))
+
+
+def _month(value) -> date:
+    # TruncMonth gives datetimes (in the current time zone) for datetime columns.
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _rate(part: int, whole: int) -> float | None:
+    return round(part / whole, 4) if whole else None
+
+
+def _revenue_bucket() -> dict:
+    return {
+        "revenue": ZERO,
+        "payments": 0,
+        "by_type": dict.fromkeys(Payment.TypeChoices.values, ZERO),
+        "by_tier": dict.fromkeys(MembershipPlan.Tier.values, ZERO),
+        "by_plan": {},
+    }
+
+
+def _close_revenue_bucket(bucket: dict) -> dict:
+    bucket["by_plan"] = sorted(bucket["by_plan"].values(), key=lambda plan: -plan["revenue"])
+    return bucket
+
+
+def revenue_report(start: date, end: date) -> dict:
+    """Paid revenue per month and for the whole period, by payment type, tier and plan."""
+    months = months_between(start, end)
+    rows = list(
+        Payment.objects.filter(_created_in(start, end), status=Payment.StatusChoices.PAID)
+        .values("membership_id", "type", month=TruncMonth("created_at"))
+        .annotate(revenue=Sum("money_to_pay"), payments=Count("id"))
+        .order_by()
+    )
+    plans = plan_catalog.in_bulk({row["membership_id"] for row in rows})
+
+    buckets = {month: _revenue_bucket() for month in months}
+    total = _revenue_bucket()
+    for row in rows:
+        plan = plans.get(row["membership_id"])
+        tier = plan.tier if plan else UNKNOWN_TIER
+        for bucket in (buckets[_month(row["month"])], total):
+            bucket["revenue"] += row["revenue"]
+            bucket["payments"] += row["payments"]
+            bucket["by_type"][row["type"]] += row["revenue"]
+            bucket["by_tier"][tier] = bucket["by_tier"].get(tier, ZERO) + row["revenue"]
+            by_plan = bucket["by_plan"].setdefault(
+                row["membership_id"],
+                {
+                    "plan_id": row["membership_id"],
+                    "name": plan.name if plan else None,
+                    "tier": tier,
+                    "revenue": ZERO,
+                    "payments": 0,
+                },
+            )
+            by_plan["revenue"] += row["revenue"]
+            by_plan["payments"] += row["payments"]
+
+    return {
+        "start": f"{start:%Y-%m}",
+        "end": f"{end:%Y-%m}",
+        "total": _close_revenue_bucket(total),
+        "months": [
+            {"month": f"{month:%Y-%m}", **_close_revenue_bucket(bucket)}
+            for month, bucket in buckets.items()
+        ],
+    }
+
+
+def mrr_report(start: date, end: date) -> dict:
+    """
+    Monthly recurring revenue on the last day of every month (today for the running one).
+
+    A paid purchase or renewal counts from the day it was paid for its plan's duration,
+    at its amount per MRR_DAYS days. Upgrade fees are one-off and only show up in revenue.
+    """
+    months = months_between(start, end)
+    today = timezone.localdate()
+    days = [min(shift_month(month, 1) - timedelta(days=1), today) for month in months]
+    plans = {plan.id: plan for plan in plan_catalog.all()}
+    longest = max((plan.duration_days for plan in plans.values()), default=0)
+
+    # Per plan, running totals over the days anything was paid; a payment made on day p
+    # still runs on day d when d - duration < p <= d.
+    ledger = {}
+    for row in (
+        Payment.objects.filter(
+            status=Payment.StatusChoices.PAID,
+            type__in=RECURRING_TYPES,
+            created_at__gte=_midnight(days[0] - timedelta(days=longest)),
+            created_at__lt=_midnight(days[-1] + timedelta(days=1)),
+        )
+        .values("membership_id", day=TruncDate("created_at"))
+        .annotate(amount=Sum("money_to_pay"), payments=Count("id"))
+        .order_by("membership_id", "day")
+    ):
+        paid_on, amounts, counts = ledger.setdefault(row["membership_id"], ([], [ZERO], [0]))
+        paid_on.append(row["day"])
+        amounts.append(amounts[-1] + row["amount"])
+        counts.append(counts[-1] + row["payments"])
+
+    result = []
+    for month, day in zip(months, days, strict=True):
+        mrr = ZERO
+        subscriptions = 0
+        by_tier = dict.fromkeys(MembershipPlan.Tier.values, ZERO)
+        for plan_id, (paid_on, amounts, counts) in ledger.items():
+            plan = plans.get(plan_id)
+            if plan is None:
+                continue
+            last = bisect.bisect_right(paid_on, day)
+            first = bisect.bisect_right(paid_on, day - timedelta(days=plan.duration_days))
+            plan_mrr = (amounts[last] - amounts[first]) * MRR_DAYS / plan.duration_days
+            mrr += plan_mrr
+            by_tier[plan.tier] += plan_mrr
+            subscriptions += counts[last] - counts[first]
+        result.append(
+            {
+                "month": f"{month:%Y-%m}",
+                "measured_on": day.isoformat(),
+                "mrr": mrr.quantize(CENT),
+                "subscriptions": subscriptions,
+                "by_tier": {tier: value.quantize(CENT) for tier, value in by_tier.items()},
+            }
+        )
+
+    return {"start": f"{start:%Y-%m}", "end": f"{end:%Y-%m}", "months": result}
+
+
+def _outcomes(row) -> dict:
+    settled = row["paid"] + row["failed"]
+    return {
+        "attempts": row["attempts"],
+        "paid": row["paid"],
+        "failed": row["failed"],
+        "expired": row["expired"],
+        "failed_amount": row["failed_amount"],
+        # Share of settled attempts that failed; expired checkouts were abandoned instead.
+        "failure_rate": _rate(row["failed"], settled),
+    }
+
+
+def failure_report(start: date, end: date) -> dict:
+    """Payment outcomes per month, overall and by payment type."""
+    failed = Q(status__in=FAILED_STATUSES)
+    rows = (
+        Payment.objects.filter(_created_in(start, end))
+        .values("type", month=TruncMonth("created_at"))
+        .annotate(
+            attempts=Count("id"),
+            paid=Count("id", filter=Q(status=Payment.StatusChoices.PAID)),
+            failed=Count("id", filter=failed),
+            expired=Count("id", filter=Q(status=Payment.StatusChoices.EXPIRED)),
+            failed_amount=Sum("money_to_pay", filter=failed, default=ZERO),
+        )
+        .order_by()
+    )
+
+    totals = {
+        month: {"attempts": 0, "paid": 0, "failed": 0, "expired": 0, "failed_amount": ZERO}
+        for month in months_between(start, end)
+    }
+    by_type = {month: {} for month in totals}
+    for row in rows:
+        month = _month(row["month"])
+        for counter in totals[month]:
+            totals[month][counter] += row[counter]
+        by_type[month][row["type"]] = _outcomes(row)
+
+    return {
+        "start": f"{start:%Y-%m}",
+        "end": f"{end:%Y-%m}",
+        "months": [
+            {"month": f"{month:%Y-%m}", **_outcomes(total), "by_type": by_type[month]}
+            for month, total in totals.items()
+        ],
+    }
+
+
+def churn_report(start: date, end: date) -> dict:
+    """
+    Retention of the members who first paid in each month of the period (their cohort).
+
+    ``retention`` counts, for every month from the cohort's to the current one, the
+    members whose membership still ran into it; ``churned`` are those without a
+    membership running today. Gaps are not kept on memberships, so a member who lapsed
+    and came back counts as retained throughout.
+    """
+    today = timezone.localdate()
+    first_paid = (
+        Payment.objects.filter(user=OuterRef("pk"), status=Payment.StatusChoices.PAID)
+        .order_by("created_at")
+        .values("created_at")[:1]
+    )
+    covered_until = (
+        Membership.objects.filter(member=OuterRef("pk"))
+        .order_by("-end_date")
+        .values("end_date")[:1]
+    )
+    rows = (
+        User.objects.annotate(joined=Subquery(first_paid), covered_until=Subquery(covered_until))
+        .filter(joined__gte=_midnight(start), joined__lt=_midnight(shift_month(end, 1)))
+        .values(cohort=TruncMonth("joined"), last_month=TruncMonth("covered_until"))
+        .annotate(members=Count("id"), active=Count("id", filter=Q(covered_until__gte=today)))
+        .order_by()
+    )
+
+    cohorts = {
+        month: {"members": 0, "active": 0, "left": Counter()}
+        for month in months_between(start, end)
+    }
+    for row in rows:
+        month = _month(row["cohort"])
+        cohort = cohorts[month]
+        cohort["members"] += row["members"]
+        cohort["active"] += row["active"]
+        # Memberships that ended before the first payment count as gone after one month.
+        cohort["left"][max(row["last_month"] or month, month)] += row["members"]
+
+    result = []
+    for month, cohort in cohorts.items():
+        retention = []
+        gone = 0
+        for offset_month in months_between(month, today.replace(day=1)):
+            retention.append(cohort["members"] - gone)
+            gone += cohort["left"][offset_month]
+        churned = cohort["members"] - cohort["active"]
+        result.append(
+            {
+                "cohort": f"{month:%Y-%m}",
+                "members": cohort["members"],
+                "active": cohort["active"],
+                "churned": churned,
+                "churn_rate": _rate(churned, cohort["members"]),
+                "retention": retention,
+            }
+        )
+
+    return {"start": f"{start:%Y-%m}", "end": f"{end:%Y-%m}", "cohorts": result}
+
+
+REPORTS = {
+    "revenue": revenue_report,
+    "mrr": mrr_report,
+    "failures": failure_report,
+    "churn": churn_report,
+}
+
+
+def cached_report(name: str, start: date, end: date) -> dict:
+    """
+    The report from the shared cache, computed on a miss. Periods that are over are kept
+    for ANALYTICS_CLOSED_PERIOD_CACHE_TTL, the running one for ANALYTICS_CACHE_TTL.
+    """
+    key = f"analytics:{name}:{start:%Y-%m}:{end:%Y-%m}"
+    report = cache.get(key)
+    if report is None:
+        report = REPORTS[name](start, end)
+        closed = end < timezone.localdate().replace(day=1)
+        cache.set(
+            key,
+            report,
+            settings.ANALYTICS_CLOSED_PERIOD_CACHE_TTL if closed else settings.ANALYTICS_CACHE_TTL,
+        )
+    return report
@@ -0,0 +1,28 @@
+from django.utils import timezone
+from rest_framework import serializers
+
+from apps.analytics.reports import MAX_MONTHS, months_between, shift_month
+
+MONTH_FORMATS = ["%Y-%m"]
+
+
+class PeriodSerializer(serializers.Serializer):
+    """``?start=YYYY-MM&end=YYYY-MM``, both months included; the last 12 months by default."""
+
+    start = serializers.DateField(input_formats=MONTH_FORMATS, required=False)
+    end = serializers.DateField(input_formats=MONTH_FORMATS, required=False)
+
+    def validate(self, attrs):
+        current = timezone.localdate().replace(day=1)
+        end = attrs.get("end", current)
+        start = attrs.get("start", shift_month(end, -11))
+
+        if end > current:
+            raise serializers.ValidationError({"end": "The period cannot end in the future."})
+        if start > end:
+            raise serializers.ValidationError({"start": "The period must start before it ends."})
+        if len(months_between(start, end)) > MAX_MONTHS:
+            raise serializers.ValidationError(
+                {"start": f"The period can span at most {MAX_MONTHS} months."}
+            )
+        return {"start": start, "end": end}
@@ -0,0 +1,198 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.analytics.reports import (
+    _midnight,
+    churn_report,
+    failure_report,
+    mrr_report,
+    revenue_report,
+    shift_month,
+)
+from apps.membership.models import Membership
+from apps.payments.models import Payment
+from apps.plans.models import MembershipPlan
+
+User = get_user_model()
+
+PAID = Payment.StatusChoices.PAID
+PURCHASE = Payment.TypeChoices.MEMBERSHIP_PURCHASE
+
+
+@pytest.fixture
+def this_month():
+    return timezone.localdate().replace(day=1)
+
+
+@pytest.fixture
+def plans():
+    return (
+        MembershipPlan.objects.create(
+            name="Basic", code="basic", duration_days=30, price=30, tier="BASIC"
+        ),
+        MembershipPlan.objects.create(
+            name="Annual", code="annual", duration_days=365, price=365, tier="PREMIUM"
+        ),
+    )
+
+
+def member(email):
+    return User.objects.create(email=email)
+
+
+def pay(user, plan, month, day=5, status=PAID, type=PURCHASE, amount=None):
+    payment = Payment.objects.create(
+        user=user,
+        membership_id=plan.id,
+        status=status,
+        type=type,
+        money_to_pay=plan.price if amount is None else amount,
+    )
+    created_at = _midnight(month.replace(day=day)) + timedelta(hours=12)
+    Payment.objects.filter(pk=payment.pk).update(created_at=created_at)
+    return payment
+
+
+@pytest.mark.django_db
+class TestReports:
+    def test_revenue_by_month_type_tier_and_plan(self, plans, this_month):
+        basic, annual = plans
+        last_month = shift_month(this_month, -1)
+        first, second = member("a@fitness.com"), member("b@fitness.com")
+        pay(first, basic, last_month)
+        pay(first, annual, this_month, day=1, type=Payment.TypeChoices.UPGRADE_FEE, amount=20)
+        pay(second, annual, this_month, day=1)
+        pay(second, basic, this_month, day=1, status=Payment.StatusChoices.FAILED)
+        pay(second, basic, shift_month(this_month, -2))
+
+        report = revenue_report(last_month, this_month)
+
+        previous, current = report["months"]
+        assert report["total"]["revenue"] == Decimal("415.00")
+        assert previous["revenue"] == Decimal("30.00")
+        assert previous["by_tier"]["BASIC"] == Decimal("30.00")
+        assert current["payments"] == 2
+        assert current["by_type"]["UPGRADE_FEE"] == Decimal("20.00")
+        assert current["by_tier"] == {"BASIC": 0, "STANDARD": 0, "PREMIUM": Decimal("385.00")}
+        assert current["by_plan"] == [
+            {
+                "plan_id": annual.id,
+                "name": "Annual",
+                "tier": "PREMIUM",
+                "revenue": Decimal("385.00"),
+                "payments": 2,
+            }
+        ]
+
+    def test_mrr_spreads_payments_over_the_plan_duration(self, plans, this_month):
+        basic, annual = plans
+        two_months_ago = shift_month(this_month, -2)
+        first, second = member("a@fitness.com"), member("b@fitness.com")
+        pay(first, basic, two_months_ago)
+        pay(second, annual, two_months_ago)
+        pay(second, annual, two_months_ago, type=Payment.TypeChoices.UPGRADE_FEE, amount=100)
+        pay(first, basic, two_months_ago, status=Payment.StatusChoices.FAILED)
+
+        report = mrr_report(two_months_ago, shift_month(this_month, -1))
+
+        assert [(month["mrr"], month["subscriptions"]) for month in report["months"]] == [
+            (Decimal("60.00"), 2),
+            (Decimal("30.00"), 1),
+        ]
+        assert report["months"][0]["by_tier"]["BASIC"] == Decimal("30.00")
+
+    def test_failure_rates_leave_abandoned_checkouts_out(self, plans, this_month):
+        basic, _ = plans
+        user = member("a@fitness.com")
+        for status in (PAID, PAID, PAID, "FAILED", "REJECTED", "EXPIRED"):
+            pay(user, basic, this_month, day=1, status=status)
+        pay(user, basic, this_month, day=1, status="FAILED", type=Payment.TypeChoices.RENEWAL)
+
+        month = failure_report(this_month, this_month)["months"][0]
+
+        assert (month["attempts"], month["failed"], month["expired"]) == (7, 3, 1)
+        assert month["failure_rate"] == 0.5
+        assert month["failed_amount"] == Decimal("90.00")
+        assert month["by_type"][PURCHASE]["failure_rate"] == 0.4
+        assert month["by_type"]["RENEWAL"]["failure_rate"] == 1.0
+
+    def test_churn_by_cohort_of_the_first_payment(self, plans, this_month):
+        basic, _ = plans
+        today = timezone.localdate()
+        cohort = shift_month(this_month, -2)
+        stayed, left, never_started, earlier = (
+            member(f"{name}@fitness.com") for name in ("stayed", "left", "never", "earlier")
+        )
+        for user in (stayed, left, never_started):
+            pay(user, basic, cohort)
+        pay(stayed, basic, shift_month(cohort, 1))
+        pay(earlier, basic, shift_month(cohort, -1))
+        for user, end_date in (
+            (stayed, today + timedelta(days=10)),
+            (left, shift_month(cohort, 1).replace(day=15)),
+            (earlier, today + timedelta(days=10)),
+        ):
+            Membership.objects.create(
+                member=user,
+                plan=basic,
+                start_date=cohort,
+                end_date=end_date,
+                price_at_purchase=30,
+            )
+
+        cohorts = churn_report(cohort, this_month)["cohorts"]
+
+        assert cohorts[0] == {
+            "cohort": f"{cohort:%Y-%m}",
+            "members": 3,
+            "active": 1,
+            "churned": 2,
+            "churn_rate": 0.6667,
+            "retention": [3, 2, 1],
+        }
+        assert [entry["members"] for entry in cohorts[1:]] == [0, 0]
+
+
+@pytest.mark.django_db
+class TestReportView:
+    def test_reports_are_staff_only(self):
+        client = APIClient()
+        client.force_authenticate(user=member("a@fitness.com"))
+
+        assert client.get(reverse("analytics:revenue")).status_code == 403
+
+    def test_report_is_cached_per_period(self, staff_client, plans, django_assert_num_queries):
+        pay(member("a@fitness.com"), plans[0], timezone.localdate().replace(day=1), day=1)
+        url = reverse("analytics:revenue")
+
+        response = staff_client.get(url)
+        with django_assert_num_queries(0):
+            cached = staff_client.get(url)
+
+        assert response.status_code == 200
+        assert len(response.data["months"]) == 12
+        assert response.data["total"]["payments"] == 1
+        assert cached.data == response.data
+        assert staff_client.get(url, {"start": response.data["end"]}).data["total"]["payments"] == 1
+
+    @pytest.mark.parametrize("name", ["revenue", "mrr", "failures", "churn"])
+    def test_every_report_renders(self, staff_client, name):
+        assert staff_client.get(reverse(f"analytics:{name}")).status_code == 200
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"start": "2025-13"},
+            {"end": "2999-01"},
+            {"start": "2025-06", "end": "2025-01"},
+            {"start": "2020-01", "end": "2025-01"},
+        ],
+    )
+    def test_invalid_periods_are_rejected(self, staff_client, params):
+        assert staff_client.get(reverse("analytics:mrr"), params).status_code == 400
@@ -0,0 +1,12 @@
+from django.urls import path
+
+from apps.analytics.views import ReportView
+
+app_name = "analytics"
+
+urlpatterns = [
+    path("revenue/", ReportView.as_view(report="revenue"), name="revenue"),
+    path("mrr/", ReportView.as_view(report="mrr"), name="mrr"),
+    path("failures/", ReportView.as_view(report="failures"), name="failures"),
+    path("churn/", ReportView.as_view(report="churn"), name="churn"),
+]
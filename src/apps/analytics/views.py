@@ -0,0 +1,21 @@
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.analytics.reports import cached_report
+from apps.analytics.serializers import PeriodSerializer
+from apps.plans.permissions import IsAuthenticatedStaff
+
+
+class ReportView(APIView):
+    """
+    One of the revenue and churn reports in apps.analytics.reports, for staff. Results
+    are cached per report and period.
+    """
+
+    permission_classes = [IsAuthenticatedStaff]
+    report = None
+
+    def get(self, request):
+        serializer = PeriodSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(cached_report(self.report, **serializer.validated_data))
@@ -0,0 +1,37 @@
+from django.contrib import admin
+
+from core.admin import LargeTableAdminMixin, looks_like_email
+
+from .models import Notification, TelegramSubscription, TelegramUpdate
+
+
+@admin.register(TelegramSubscription)
+class TelegramSubscriptionAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ("user", "telegram_uid", "chat_id", "created_at")
+    list_select_related = ("user",)
+    search_routes = ((looks_like_email, "user__email__iexact"), (str.isdigit, "telegram_uid"))
+    search_fields = ("user__email__iexact",)
+    search_help_text = "Member e-mail or Telegram user id."
+    autocomplete_fields = ("user",)
+
+
+@admin.register(Notification)
+class NotificationAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "chat_id", "kind", "status", "attempts", "created_at", "sent_at")
+    list_filter = ("status", "kind")
+    ordering = ("-id",)
+    search_routes = ((str.isdigit, "chat_id"),)
+    search_fields = ("kind__exact",)
+    search_help_text = "Chat id or notification kind."
+    readonly_fields = ("created_at", "sent_at")
+
+
+@admin.register(TelegramUpdate)
+class TelegramUpdateAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ("update_id", "status", "received_at", "processed_at")
+    list_filter = ("status",)
+    ordering = ("-id",)
+    search_routes = ((str.isdigit, "update_id"),)
+    search_fields = ("status__exact",)
+    search_help_text = "Update id or status."
+    readonly_fields = ("update_id", "payload", "received_at", "processed_at")
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class BotConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "apps.bot"
+
+    def ready(self):
+        from apps.bot import signals  # noqa: F401
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from apps.bot.models import Notification
+from apps.bot.sender import MAX_MESSAGE_LENGTH, TelegramSender
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_BATCH_SIZE = 500
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(seconds=30)
+# Claimed rows are leased to the worker sending them; a crashed worker's rows come back
+# after this long.
+LEASE = timedelta(minutes=5)
+# Held by the one worker draining the outbox, renewed every batch; it lapses after LEASE
+# if that worker dies.
+DELIVERY_LOCK_KEY = "bot:delivery:lock"
+
+
+def get_sender() -> TelegramSender:
+    return TelegramSender(
+        settings.TG_BOT_TOKEN,
+        api_base=settings.TELEGRAM_API_BASE,
+        global_rate=settings.TELEGRAM_GLOBAL_RATE,
+        chat_interval=settings.TELEGRAM_CHAT_INTERVAL,
+        concurrency=settings.TELEGRAM_SEND_CONCURRENCY,
+    )
+
+
+def coalesce(notifications) -> list[tuple[int, str, list]]:
+    """
+    Fold the notifications of a chat into as few messages as fit Telegram's length
+    limit: ``(chat_id, text, notifications)`` in order of the chats' first notification.
+    """
+    messages = []
+    last_of_chat = {}
+    for notification in notifications:
+        text = notification.text[:MAX_MESSAGE_LENGTH]
+        message = last_of_chat.get(notification.chat_id)
+        if message is not None and len(message[1]) + 2 + len(text) <= MAX_MESSAGE_LENGTH:
+            message[1] = f"{message[1]}\n\n{text}"
+            message[2].append(notification)
+            continue
+        message = [notification.chat_id, text, [notification]]
+        last_of_chat[notification.chat_id] = message
+        messages.append(message)
+    return [tuple(message) for message in messages]
+
+
+def deliver_pending(
+    batch_size: int = NOTIFICATION_BATCH_SIZE, sender: TelegramSender | None = None
+) -> dict:
+    """
+    Drain the notification outbox.
+
+    Telegram's limits are per bot, so one worker at a time drains the outbox and its
+    sender keeps them across batches: a run that finds the delivery lock taken returns
+    at once, and the worker holding it picks the new rows up. The lock is released
+    only once the last chats written to may get another message, so the next run
+    cannot follow too closely.
+
+    Batches are claimed with SKIP LOCKED and leased, so no transaction is held while
+    the worker talks to Telegram. Each batch is coalesced per chat and sent from one
+    event loop; failures worth retrying are put back with a growing delay, up to
+    MAX_ATTEMPTS.
+    """
+    sender = sender or get_sender()
+    summary = {"sent": 0, "retried": 0, "failed": 0, "messages": 0}
+    token = uuid.uuid4().hex
+    if not cache.add(DELIVERY_LOCK_KEY, token, LEASE.total_seconds()):
+        return summary
+    try:
+        _drain(batch_size, sender, summary)
+    finally:
+        time.sleep(sender.cooldown())
+        if cache.get(DELIVERY_LOCK_KEY) == token:
+            cache.delete(DELIVERY_LOCK_KEY)
+    return summary
+
+
+def _drain(batch_size, sender, summary):
+    while True:
+        cache.touch(DELIVERY_LOCK_KEY, LEASE.total_seconds())
+        now = timezone.now()
+        with transaction.atomic():
+            batch = list(
+                Notification.objects.select_for_update(skip_locked=True)
+                .filter(status=Notification.Status.PENDING, available_at__lte=now)
+                .order_by("available_at", "id")[:batch_size]
+            )
+            if not batch:
+                break
+            Notification.objects.filter(pk__in=[n.pk for n in batch]).update(
+                available_at=now + LEASE
+            )
+
+        messages = coalesce(batch)
+        results = asyncio.run(sender.send_many([(chat_id, text) for chat_id, text, _ in messages]))
+        summary["messages"] += len(messages)
+
+        now = timezone.now()
+        for (_, _, notifications), result in zip(messages, results, strict=True):
+            for notification in notifications:
+                notification.attempts += 1
+                notification.error_message = result.error or None
+                if result.ok:
+                    notification.status = Notification.Status.SENT
+                    notification.sent_at = now
+                    summary["sent"] += 1
+                elif result.retry_after is not None and notification.attempts < MAX_ATTEMPTS:
+                    delay = max(
+                        timedelta(seconds=result.retry_after),
+                        RETRY_DELAY * 2**notification.attempts,
+                    )
+                    notification.available_at = now + delay
+                    summary["retried"] += 1
+                else:
+                    notification.status = Notification.Status.FAILED
+                    summary["failed"] += 1
+        Notification.objects.bulk_update(
+            batch, ["status", "attempts", "error_message", "available_at", "sent_at"]
+        )
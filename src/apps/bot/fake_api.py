@@ -0,0 +1,118 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeTelegram:
+    """
+    In-memory stand-in for the Bot API's sendMessage. Like Telegram it answers 429 with
+    ``retry_after`` when a chat gets messages faster than ``chat_interval`` or all
+    chats together faster than ``global_rate`` a second, and 403 for ``blocked`` chats.
+    ``fail_with`` turns every answer into an error with that status code.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0,
+        global_rate: float | None = None,
+        chat_interval: float | None = None,
+        blocked=(),
+        fail_with: int | None = None,
+    ):
+        self.latency = latency
+        self.global_rate = global_rate
+        self.chat_interval = chat_interval
+        self.blocked = set(blocked)
+        self.fail_with = fail_with
+        self.messages = []
+        self.requests = 0
+        self.rejected = 0
+        self._sent_at = []
+        self._last_per_chat = {}
+        self._lock = threading.Lock()
+
+    def handle(self, method: str, body: dict) -> tuple[int, dict]:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            if self.fail_with:
+                return self.fail_with, {
+                    "ok": False,
+                    "error_code": self.fail_with,
+                    "description": "Bad Gateway",
+                }
+            if method != "sendMessage":
+                return 404, {"ok": False, "error_code": 404, "description": "Not Found"}
+
+            chat_id = int(body["chat_id"])
+            if chat_id in self.blocked:
+                return 403, {
+                    "ok": False,
+                    "error_code": 403,
+                    "description": "Forbidden: bot was blocked by the user",
+                }
+
+            now = time.monotonic()
+            retry_after = self._retry_after(chat_id, now)
+            if retry_after:
+                self.rejected += 1
+                return 429, {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {retry_after}",
+                    "parameters": {"retry_after": retry_after},
+                }
+
+            self._sent_at.append(now)
+            self._last_per_chat[chat_id] = now
+            self.messages.append((chat_id, body["text"]))
+            return 200, {
+                "ok": True,
+                "result": {
+                    "message_id": len(self.messages),
+                    "chat": {"id": chat_id},
+                    "text": body["text"],
+                },
+            }
+
+    def _retry_after(self, chat_id, now):
+        last = self._last_per_chat.get(chat_id)
+        # Small tolerance, real limits are not enforced to the millisecond either.
+        if self.chat_interval and last is not None and now - last < self.chat_interval * 0.9:
+            return 1
+        if self.global_rate:
+            self._sent_at = [sent for sent in self._sent_at if now - sent < 1]
+            if len(self._sent_at) >= self.global_rate * 1.1:
+                return 1
+        return 0
+
+
+def make_fake_telegram_server(address=("127.0.0.1", 0), backend: FakeTelegram | None = None):
+    """
+    Serve a FakeTelegram over HTTP (``/bot<token>/<method>``); point the sender's
+    ``api_base`` at it. The caller runs ``serve_forever``.
+    """
+    backend = backend or FakeTelegram()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):  # noqa: N802
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            status_code, payload = backend.handle(self.path.rsplit("/", 1)[-1], body)
+            content = json.dumps(payload).encode()
+            self.send_response(status_code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, *_args):
+            pass
+
+    server = ThreadingHTTPServer(address, Handler)
+    server.backend = backend
+    return server
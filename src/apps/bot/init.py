@@ -1,4 +1,12 @@
 import telebot
-from decouple import config
+from django.conf import settings
 
-bot = telebot.TeleBot(config("TG_BOT_TOKEN"))
+from apps.bot.wrapper import SubscrUnsubscrBotWrapper
+
+
+def make_bot(threaded: bool = True) -> SubscrUnsubscrBotWrapper:
+    """
+    The bot with its command handlers. ``threaded=False`` runs handlers in the thread
+    that feeds the updates, which is what the webhook's Celery workers want.
+    """
+    return SubscrUnsubscrBotWrapper(telebot.TeleBot(settings.TG_BOT_TOKEN, threaded=threaded))
@@ -1,4 +0,0 @@
-from init import bot
-from wrapper import BaseBotWrapper
-
-tg_bot = BaseBotWrapper(bot)
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.bot.init import make_bot
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the Telegram bot with long polling, or with --set-webhook register "
+        "TELEGRAM_WEBHOOK_URL so updates go to the web app instead."
+    )
+
+    def add_arguments(self, parser):
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument(
+            "--set-webhook", action="store_true", help="Register the webhook and exit."
+        )
+        mode.add_argument(
+            "--delete-webhook",
+            action="store_true",
+            help="Remove the webhook and exit, to poll again.",
+        )
+
+    def handle(self, *_args, **options):
+        if not settings.TG_BOT_TOKEN:
+            raise CommandError("TG_BOT_TOKEN is not set.")
+        wrapper = make_bot()
+
+        if options["delete_webhook"]:
+            wrapper.bot.remove_webhook()
+            self.stdout.write("Webhook removed.")
+            return
+
+        if options["set_webhook"]:
+            if not settings.TELEGRAM_WEBHOOK_URL or not settings.TELEGRAM_WEBHOOK_SECRET:
+                raise CommandError("TELEGRAM_WEBHOOK_URL and TELEGRAM_WEBHOOK_SECRET must be set.")
+            wrapper.bot.set_webhook(
+                url=settings.TELEGRAM_WEBHOOK_URL,
+                secret_token=settings.TELEGRAM_WEBHOOK_SECRET,
+                max_connections=settings.TELEGRAM_WEBHOOK_MAX_CONNECTIONS,
+                drop_pending_updates=False,
+            )
+            self.stdout.write(f"Webhook set to {settings.TELEGRAM_WEBHOOK_URL}.")
+            return
+
+        self.stdout.write("Polling for updates.")
+        wrapper.run()
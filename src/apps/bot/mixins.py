@@ -1,13 +1,4 @@
-# todo: add user model
-class User:
-    def __init__(self, uid: int):
-        self.uid = uid
-
-    def exists(self) -> bool:
-        return True
-
-    def subscribed(self) -> bool:
-        return True
+from apps.bot.subscriptions import set_chat, subscription_cache
 
 
 class SubscriptionMixin:
@@ -21,14 +12,13 @@ class SubscriptionMixin:
         )
         text_already_subscribed = "You're already subscribed!"
         text_not_registered = "You're not registered yet!"
-        usr = User(uid)
+        subscriber = subscription_cache.get(uid)
 
-        if usr.exists():
-            if usr.subscribed is not None:
+        if subscriber is not None:
+            if subscriber.chat_id is not None:
                 self.bot.send_message(cid, text_already_subscribed)
                 return
-            usr.subscribed = cid
-            usr.save()
+            set_chat(uid, cid)
             self.bot.send_message(cid, text_success)
             return
 
@@ -41,14 +31,13 @@ class UnsubscriptionMixin:
         text_success = "You've succesfully unsubscribed"
         text_already_unsubscribed = "You're already unsubscribed!"
         text_not_registered = "You're not registered yet!"
-        usr = User(uid)
+        subscriber = subscription_cache.get(uid)
 
-        if usr.exists():
-            if usr.subscribed is None:
+        if subscriber is not None:
+            if subscriber.chat_id is None:
                 self.bot.send_message(cid, text_already_unsubscribed)
                 return
-            usr.subscribed = None
-            usr.save()
+            set_chat(uid, None)
             self.bot.send_message(cid, text_success)
             return
 
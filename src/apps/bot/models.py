@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class TelegramSubscription(models.Model):
+    """
+    Link between a member and their Telegram account. A member is registered with the
+    bot once the link exists and subscribed while ``chat_id`` is set.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="telegram_subscription",
+    )
+    telegram_uid = models.BigIntegerField(unique=True)
+    chat_id = models.BigIntegerField(unique=True, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"Telegram user {self.telegram_uid} of {self.user}"
+
+
+class Notification(models.Model):
+    """
+    Outbox of Telegram messages, written in the transaction of the change they report
+    and drained by a Celery worker, see apps.bot.delivery.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        SENT = "SENT", "Sent"
+        FAILED = "FAILED", "Failed"
+
+    chat_id = models.BigIntegerField()
+    kind = models.CharField(max_length=50)
+    text = models.TextField()
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error_message = models.TextField(blank=True, null=True)
+
+    # Not sent before this time: set for retries and while a worker holds the row.
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(
+                fields=["available_at", "id"],
+                condition=models.Q(status="PENDING"),
+                name="notification_pending_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"Notification {self.id} to {self.chat_id} ({self.kind} - {self.status})"
+
+
+class TelegramUpdate(models.Model):
+    """
+    Inbox of updates Telegram sent to the webhook, drained by a Celery worker, see
+    apps.bot.webhook.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        PROCESSED = "PROCESSED", "Processed"
+        FAILED = "FAILED", "Failed"
+
+    update_id = models.BigIntegerField(unique=True)
+    payload = models.JSONField()
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    error_message = models.TextField(blank=True, null=True)
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=models.Q(status="PENDING"),
+                name="telegram_update_pending_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"Telegram update {self.update_id} ({self.status})"
@@ -0,0 +1,58 @@
+"""
+Domain events for members' Telegram chats. Producers call ``notify`` in the transaction
+of the change; the messages land in the Notification outbox and are sent by
+apps.bot.delivery once it commits.
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+from apps.bot.models import Notification
+from apps.bot.subscriptions import subscriber_chats
+from apps.bot.tasks import deliver_notifications_task
+
+logger = logging.getLogger(__name__)
+
+MEMBERSHIP_STARTED = "membership_started"
+MEMBERSHIP_RENEWED = "membership_renewed"
+MEMBERSHIP_FROZEN = "membership_frozen"
+PAYMENT_SUCCEEDED = "payment_succeeded"
+
+MESSAGES = {
+    MEMBERSHIP_STARTED: "Your {plan} membership is active until {end_date}.",
+    MEMBERSHIP_RENEWED: "Your {plan} membership was renewed until {end_date}.",
+    MEMBERSHIP_FROZEN: "Your membership is frozen from {frozen_from} to {frozen_to}.",
+    PAYMENT_SUCCEEDED: "Payment of {amount} USD received, thank you!",
+}
+
+
+def notify(kind: str, events) -> int:
+    """
+    Queue a ``kind`` message for each ``(member_id, context)`` pair; members who are not
+    subscribed are skipped. Returns the number of queued notifications.
+    """
+    if not settings.TG_BOT_TOKEN:
+        return 0
+    events = list(events)
+    if not events:
+        return 0
+
+    chats = subscriber_chats({member_id for member_id, _ in events})
+    notifications = Notification.objects.bulk_create(
+        Notification(chat_id=chats[member_id], kind=kind, text=MESSAGES[kind].format(**context))
+        for member_id, context in events
+        if member_id in chats
+    )
+    if notifications:
+        transaction.on_commit(_enqueue_delivery)
+    return len(notifications)
+
+
+def _enqueue_delivery():
+    # The beat schedule drains the outbox anyway, so a broker hiccup must not fail the caller.
+    try:
+        deliver_notifications_task.delay()
+    except Exception as e:
+        logger.warning(f"Could not enqueue notification delivery: {str(e)}")
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Telegram's documented limits: about 30 messages a second overall and one a second per chat.
+GLOBAL_RATE = 30
+CHAT_INTERVAL = 1.0
+# Longest text sendMessage accepts.
+MAX_MESSAGE_LENGTH = 4096
+
+
+@dataclass
+class SendResult:
+    ok: bool
+    error: str = ""
+    # Set when the failure is worth retrying later: seconds to wait first.
+    retry_after: float | None = None
+
+
+class RateLimiter:
+    """
+    Token bucket for ``rate`` acquisitions a second. Without ``burst`` acquisitions are
+    spaced evenly, so no one-second window ever sees more than ``rate`` of them.
+
+    Refill and take happen without an await in between, so no lock is needed and the
+    bucket can outlive the event loop of one ``send_many`` call.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = burst
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Hold every sender back, after Telegram asked us to slow down."""
+        self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+
+class TelegramSender:
+    """
+    Sends many messages through the Bot API from one event loop.
+
+    Messages go out concurrently over a pooled ``httpx.AsyncClient`` but stay within
+    ``global_rate`` messages a second overall and ``chat_interval`` seconds between two
+    messages to the same chat. Both are tracked on the sender, so they also hold across
+    consecutive ``send_many`` calls. A 429 is waited out for its ``retry_after`` (pausing all
+    chats), network errors and 5xx are retried with exponential backoff and jitter.
+    Other errors (blocked bot, unknown chat) are final. ``transport`` lets tests plug in
+    an in-process transport.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        *,
+        api_base: str = "https://api.telegram.org",
+        global_rate: float = GLOBAL_RATE,
+        chat_interval: float = CHAT_INTERVAL,
+        concurrency: int = 20,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 10,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.url = f"{api_base.rstrip('/')}/bot{token}/sendMessage"
+        self.global_rate = global_rate
+        self.chat_interval = chat_interval
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.transport = transport
+        self.limiter = RateLimiter(global_rate)
+        # Monotonic time of the last send to each chat, for chat_interval.
+        self._last_sent = {}
+
+    def cooldown(self) -> float:
+        """Seconds until every chat this sender wrote to may get another message."""
+        if not self._last_sent:
+            return 0.0
+        return max(0.0, max(self._last_sent.values()) + self.chat_interval - time.monotonic())
+
+    async def send_many(self, messages: list[tuple[int, str]]) -> list[SendResult]:
+        """Send ``(chat_id, text)`` pairs; results come back in the same order."""
+        slots = asyncio.Semaphore(self.concurrency)
+        now = time.monotonic()
+        self._last_sent = {
+            chat_id: sent_at
+            for chat_id, sent_at in self._last_sent.items()
+            if now - sent_at < self.chat_interval
+        }
+        results = [None] * len(messages)
+
+        by_chat = {}
+        for index, (chat_id, _) in enumerate(messages):
+            by_chat.setdefault(chat_id, []).append(index)
+
+        async with httpx.AsyncClient(
+            timeout=self.timeout,
+            transport=self.transport,
+            limits=httpx.Limits(max_connections=self.concurrency),
+        ) as client:
+
+            async def send_chat(chat_id, indexes):
+                # A chat's messages go out one after the other, chat_interval apart.
+                for index in indexes:
+                    last_sent = self._last_sent.get(chat_id)
+                    if last_sent is not None:
+                        await asyncio.sleep(last_sent + self.chat_interval - time.monotonic())
+                    results[index] = await self._send(client, slots, chat_id, messages[index][1])
+                    self._last_sent[chat_id] = time.monotonic()
+
+            await asyncio.gather(
+                *(send_chat(chat_id, indexes) for chat_id, indexes in by_chat.items())
+            )
+
+        return results
+
+    async def _send(self, client, slots, chat_id, text) -> SendResult:
+        attempt = 0
+        while True:
+            await self.limiter.acquire()
+            async with slots:
+                try:
+                    response = await client.post(self.url, json={"chat_id": chat_id, "text": text})
+                    status_code = response.status_code
+                    body = response.json()
+                except (httpx.HTTPError, ValueError) as e:
+                    status_code, body = None, {"description": str(e)}
+
+            if status_code == 200 and body.get("ok"):
+                return SendResult(ok=True)
+
+            error = body.get("description") or f"HTTP {status_code}"
+            if status_code == 429:
+                wait = float((body.get("parameters") or {}).get("retry_after", 1))
+                self.limiter.pause(wait)
+            elif status_code is None or status_code >= 500:
+                wait = self.backoff * 2**attempt * (1 + random.random())
+            else:
+                return SendResult(ok=False, error=error)
+
+            if attempt >= self.max_retries:
+                logger.warning(
+                    f"Telegram send to {chat_id} gave up after {attempt + 1} attempts: {error}"
+                )
+                return SendResult(ok=False, error=error, retry_after=wait)
+            attempt += 1
+            if status_code != 429:
+                # After a 429 the paused limiter does the waiting, for every chat.
+                await asyncio.sleep(wait)
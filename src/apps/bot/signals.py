@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.bot.models import TelegramSubscription
+from apps.bot.subscriptions import subscription_cache
+
+
+@receiver(post_save, sender=TelegramSubscription)
+@receiver(post_delete, sender=TelegramSubscription)
+def invalidate_subscription(instance, **_kwargs):
+    subscription_cache.invalidate_on_commit(instance.telegram_uid)
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.bot.models import TelegramSubscription
+
+
+class Subscriber(NamedTuple):
+    user_id: int
+    telegram_uid: int
+    chat_id: int | None
+
+
+class SubscriptionCache:
+    """
+    Two-level cache of Telegram uid -> Subscriber, for the lookup every incoming update
+    starts with. Unknown uids are cached too, so strangers writing to the bot do not
+    cost a query per message either.
+
+    Lookups go to a small in-process LRU first (TELEGRAM_SUBSCRIPTION_LOCAL_TTL
+    seconds), then to the shared cache (TELEGRAM_SUBSCRIPTION_CACHE_TTL seconds), then
+    to the database. Changes drop the shared entry and this process's copy, once right
+    away and once after commit, so other processes see them after at most the local TTL.
+    """
+
+    KEY = "bot:subscription:{}"
+    # Shared-cache value of uids without a link; a miss is None.
+    UNKNOWN = ()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, telegram_uid: int) -> Subscriber | None:
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(telegram_uid)
+            if item is not None and item[0] > now:
+                self._entries.move_to_end(telegram_uid)
+                return item[1]
+
+        key = self.KEY.format(telegram_uid)
+        value = cache.get(key)
+        if value is None:
+            row = (
+                TelegramSubscription.objects.filter(telegram_uid=telegram_uid)
+                .values_list("user_id", "telegram_uid", "chat_id")
+                .first()
+            )
+            value = tuple(row) if row else self.UNKNOWN
+            cache.set(key, value, settings.TELEGRAM_SUBSCRIPTION_CACHE_TTL)
+        subscriber = Subscriber(*value) if value else None
+
+        with self._lock:
+            self._entries[telegram_uid] = (
+                now + settings.TELEGRAM_SUBSCRIPTION_LOCAL_TTL,
+                subscriber,
+            )
+            self._entries.move_to_end(telegram_uid)
+            while len(self._entries) > settings.TELEGRAM_SUBSCRIPTION_CACHE_SIZE:
+                self._entries.popitem(last=False)
+        return subscriber
+
+    def invalidate(self, telegram_uid: int):
+        cache.delete(self.KEY.format(telegram_uid))
+        with self._lock:
+            self._entries.pop(telegram_uid, None)
+
+    def invalidate_on_commit(self, telegram_uid: int):
+        self.invalidate(telegram_uid)
+        transaction.on_commit(lambda: self.invalidate(telegram_uid))
+
+    def clear_local(self):
+        with self._lock:
+            self._entries.clear()
+
+
+subscription_cache = SubscriptionCache()
+
+
+def set_chat(telegram_uid: int, chat_id: int | None) -> int:
+    """Subscribe the uid's member to ``chat_id``, or unsubscribe them with None."""
+    updated = TelegramSubscription.objects.filter(telegram_uid=telegram_uid).update(chat_id=chat_id)
+    subscription_cache.invalidate_on_commit(telegram_uid)
+    return updated
+
+
+def subscriber_chats(member_ids) -> dict[int, int]:
+    """Chat of every subscribed member among ``member_ids``, in one query."""
+    return dict(
+        TelegramSubscription.objects.filter(
+            user_id__in=member_ids, chat_id__isnull=False
+        ).values_list("user_id", "chat_id")
+    )
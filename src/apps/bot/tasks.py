@@ -0,0 +1,27 @@
+import logging
+
+from celery import shared_task
+
+from apps.bot.delivery import deliver_pending
+from apps.bot.webhook import process_pending_updates
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def deliver_notifications_task():
+    summary = deliver_pending()
+    if summary["messages"]:
+        logger.info(
+            f"Telegram: {summary['sent']} notifications sent in {summary['messages']} messages, "
+            f"{summary['retried']} to retry, {summary['failed']} failed."
+        )
+    return summary
+
+
+@shared_task
+def process_telegram_updates_task():
+    processed = process_pending_updates()
+    if processed:
+        logger.info(f"Processed {processed} Telegram updates.")
+    return processed
@@ -0,0 +1,367 @@
+import asyncio
+import threading
+from datetime import timedelta
+from unittest.mock import patch
+
+import httpx
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.bot.delivery import DELIVERY_LOCK_KEY, coalesce, deliver_pending
+from apps.bot.fake_api import FakeTelegram, make_fake_telegram_server
+from apps.bot.mixins import SubscriptionMixin, UnsubscriptionMixin
+from apps.bot.models import Notification, TelegramSubscription, TelegramUpdate
+from apps.bot.notifications import PAYMENT_SUCCEEDED, notify
+from apps.bot.sender import MAX_MESSAGE_LENGTH, TelegramSender
+from apps.bot.subscriptions import SubscriptionCache, set_chat, subscriber_chats, subscription_cache
+from apps.bot.webhook import get_webhook_bot, process_pending_updates
+from apps.payments.events import process_pending_events
+from apps.payments.models import Payment, StripeEvent
+from apps.plans.models import MembershipPlan
+
+User = get_user_model()
+
+
+@pytest.fixture
+def fake_telegram():
+    server = make_fake_telegram_server(backend=FakeTelegram(global_rate=200, chat_interval=0.05))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    sender = TelegramSender(
+        "123:test", api_base=f"http://{host}:{port}", global_rate=200, chat_interval=0.05
+    )
+    yield server.backend, sender
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.django_db
+class TestNotify:
+    def test_paid_checkout_notifies_subscribed_members(self, settings):
+        settings.TG_BOT_TOKEN = "123:test"
+        plan = MembershipPlan.objects.create(name="Standard", duration_days=30, price=100.00)
+        subscribed = User.objects.create(email="a@fitness.com")
+        TelegramSubscription.objects.create(user=subscribed, telegram_uid=111, chat_id=111)
+        other = User.objects.create(email="b@fitness.com")
+        for user in (subscribed, other):
+            payment = Payment.objects.create(
+                user=user,
+                membership_id=plan.id,
+                money_to_pay=100,
+                type=Payment.TypeChoices.MEMBERSHIP_PURCHASE,
+            )
+            StripeEvent.objects.create(
+                event_id=f"evt_{payment.id}",
+                type="checkout.session.completed",
+                payload={"data": {"object": {"metadata": {"payment_id": str(payment.id)}}}},
+            )
+
+        process_pending_events()
+
+        assert sorted(Notification.objects.values_list("chat_id", "kind")) == [
+            (111, "membership_started"),
+            (111, "payment_succeeded"),
+        ]
+        assert (
+            "Standard membership is active until"
+            in Notification.objects.get(kind="membership_started").text
+        )
+
+    def test_nothing_is_queued_without_a_token(self, settings):
+        settings.TG_BOT_TOKEN = ""
+        user = User.objects.create(email="a@fitness.com")
+        TelegramSubscription.objects.create(user=user, telegram_uid=111, chat_id=111)
+
+        assert notify(PAYMENT_SUCCEEDED, [(user.id, {"amount": 10})]) == 0
+        assert not Notification.objects.exists()
+
+
+def test_coalesce_folds_a_chats_notifications_within_the_length_limit():
+    notifications = [
+        Notification(chat_id=1, text="a"),
+        Notification(chat_id=2, text="b"),
+        Notification(chat_id=1, text="c"),
+        Notification(chat_id=1, text="x" * MAX_MESSAGE_LENGTH),
+    ]
+
+    messages = coalesce(notifications)
+
+    assert [(chat_id, text[:4], len(covered)) for chat_id, text, covered in messages] == [
+        (1, "a\n\nc", 2),
+        (2, "b", 1),
+        (1, "xxxx", 1),
+    ]
+
+
+@pytest.mark.django_db
+class TestDelivery:
+    def queue(self, chat_id, text="Hello"):
+        return Notification.objects.create(chat_id=chat_id, kind="test", text=text)
+
+    def test_burst_is_coalesced_and_sent_within_the_limits(self, fake_telegram):
+        backend, sender = fake_telegram
+        for chat_id in range(40):
+            self.queue(chat_id, "Membership started")
+            self.queue(chat_id, "Payment received")
+
+        summary = deliver_pending(sender=sender)
+
+        assert summary == {"sent": 80, "retried": 0, "failed": 0, "messages": 40}
+        assert backend.rejected == 0
+        assert backend.messages[0] == (0, "Membership started\n\nPayment received")
+        assert not Notification.objects.exclude(status=Notification.Status.SENT).exists()
+
+    def test_blocked_chat_fails_and_server_errors_are_retried_later(self, fake_telegram):
+        backend, sender = fake_telegram
+        backend.blocked = {7}
+        blocked = self.queue(7)
+        sender.max_retries = 0
+
+        deliver_pending(sender=sender)
+        backend.fail_with = 502
+        flaky = self.queue(8)
+        summary = deliver_pending(sender=sender)
+
+        blocked.refresh_from_db()
+        flaky.refresh_from_db()
+        assert blocked.status == Notification.Status.FAILED
+        assert "blocked" in blocked.error_message
+        assert summary["retried"] == 1
+        assert flaky.status == Notification.Status.PENDING
+        assert flaky.attempts == 1
+        assert flaky.available_at > timezone.now() + timedelta(seconds=30)
+
+    def test_rows_leased_by_another_worker_are_skipped(self, fake_telegram):
+        backend, sender = fake_telegram
+        Notification.objects.create(
+            chat_id=1, kind="test", text="x", available_at=timezone.now() + timedelta(minutes=5)
+        )
+
+        assert deliver_pending(sender=sender)["messages"] == 0
+        assert backend.requests == 0
+
+    def test_chat_interval_holds_across_batches_and_runs(self, fake_telegram):
+        backend, sender = fake_telegram
+        for text in ("one", "two", "three"):
+            self.queue(1, "x" * MAX_MESSAGE_LENGTH)
+            self.queue(1, text)
+
+        assert deliver_pending(batch_size=2, sender=sender)["messages"] == 6
+        self.queue(1)
+        assert deliver_pending(sender=sender)["messages"] == 1
+
+        assert backend.rejected == 0
+        assert len(backend.messages) == 7
+
+    def test_only_one_worker_drains_the_outbox(self, fake_telegram):
+        backend, sender = fake_telegram
+        self.queue(1)
+        cache.add(DELIVERY_LOCK_KEY, "other-worker")
+
+        assert deliver_pending(sender=sender)["messages"] == 0
+        assert backend.requests == 0
+        assert cache.get(DELIVERY_LOCK_KEY) == "other-worker"
+
+
+def test_sender_waits_out_429_and_retries():
+    replies = [
+        httpx.Response(
+            429,
+            json={
+                "ok": False,
+                "description": "Too Many Requests",
+                "parameters": {"retry_after": 0},
+            },
+        ),
+        httpx.Response(500, json={"ok": False, "description": "Internal Server Error"}),
+        httpx.Response(200, json={"ok": True, "result": {}}),
+    ]
+    sender = TelegramSender(
+        "123:test",
+        backoff=0,
+        global_rate=1000,
+        transport=httpx.MockTransport(lambda _: replies.pop(0)),
+    )
+
+    results = asyncio.run(sender.send_many([(1, "Hello")]))
+
+    assert results[0].ok
+    assert replies == []
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, cid, text, **_kwargs):
+        self.sent.append((cid, text))
+
+
+@pytest.mark.django_db
+class TestSubscriptions:
+    @pytest.fixture
+    def wrapper(self):
+        wrapper = type("Wrapper", (SubscriptionMixin, UnsubscriptionMixin), {})()
+        wrapper.bot = FakeBot()
+        return wrapper
+
+    def test_subscribe_and_unsubscribe(self, wrapper):
+        user = User.objects.create(email="a@fitness.com")
+        TelegramSubscription.objects.create(user=user, telegram_uid=42)
+
+        wrapper.subscribe(42, 420)
+        wrapper.subscribe(42, 420)
+        assert TelegramSubscription.objects.get().chat_id == 420
+        assert subscriber_chats([user.id]) == {user.id: 420}
+
+        wrapper.unsubscribe(42, 420)
+        wrapper.unsubscribe(42, 420)
+        wrapper.subscribe(7, 70)
+
+        assert [text.split("!")[0].split("\n")[0] for _, text in wrapper.bot.sent] == [
+            "Success",
+            "You're already subscribed",
+            "You've succesfully unsubscribed",
+            "You're already unsubscribed",
+            "You're not registered yet",
+        ]
+        assert subscriber_chats([user.id]) == {}
+
+    def test_lookups_are_cached_including_unknown_users(self, django_assert_num_queries):
+        user = User.objects.create(email="a@fitness.com")
+        TelegramSubscription.objects.create(user=user, telegram_uid=42, chat_id=420)
+
+        with django_assert_num_queries(2):
+            for _ in range(3):
+                assert subscription_cache.get(42).chat_id == 420
+                assert subscription_cache.get(7) is None
+
+    def test_least_recently_used_entries_are_evicted(self, settings, django_assert_num_queries):
+        settings.TELEGRAM_SUBSCRIPTION_CACHE_SIZE = 2
+        for uid in (1, 2):
+            subscription_cache.get(uid)
+        subscription_cache.get(1)
+        subscription_cache.get(3)
+        cache.clear()
+
+        with django_assert_num_queries(1):
+            subscription_cache.get(1)
+            subscription_cache.get(3)
+            subscription_cache.get(2)
+
+    def test_saving_a_link_drops_the_cached_entry(self):
+        user = User.objects.create(email="a@fitness.com")
+        assert subscription_cache.get(42) is None
+
+        TelegramSubscription.objects.create(user=user, telegram_uid=42, chat_id=420)
+
+        assert subscription_cache.get(42).user_id == user.id
+
+    def test_other_processes_see_a_change_after_the_local_ttl(self, settings):
+        settings.TELEGRAM_SUBSCRIPTION_LOCAL_TTL = 0
+        user = User.objects.create(email="a@fitness.com")
+        TelegramSubscription.objects.create(user=user, telegram_uid=42, chat_id=420)
+        other_process = SubscriptionCache()
+        assert other_process.get(42).chat_id == 420
+
+        set_chat(42, None)
+
+        assert other_process.get(42).chat_id is None
+
+    def test_fan_out_is_one_query(self, django_assert_num_queries):
+        users = User.objects.bulk_create(User(email=f"m{i}@fitness.com") for i in range(50))
+        TelegramSubscription.objects.bulk_create(
+            TelegramSubscription(user=user, telegram_uid=i, chat_id=i if i % 2 else None)
+            for i, user in enumerate(users)
+        )
+
+        with django_assert_num_queries(1):
+            chats = subscriber_chats([user.id for user in users])
+
+        assert len(chats) == 25
+
+
+@pytest.mark.django_db
+class TestWebhook:
+    @pytest.fixture(autouse=True)
+    def webhook_settings(self, settings):
+        settings.TG_BOT_TOKEN = "123:test"
+        settings.TELEGRAM_WEBHOOK_SECRET = "s3cret"
+
+    def update(self, uid, text, update_id=1):
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 0,
+                "text": text,
+                "from": {"id": uid, "is_bot": False, "first_name": "Member"},
+                "chat": {"id": uid, "type": "private"},
+            },
+        }
+
+    def post(self, client, body, secret="s3cret"):
+        headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+        return client.post(
+            reverse("bot:webhook"), body, content_type="application/json", headers=headers
+        )
+
+    def test_secret_token_is_required(self, client, settings):
+        assert self.post(client, self.update(42, "/help"), secret=None).status_code == 403
+        assert self.post(client, self.update(42, "/help"), secret="wrong").status_code == 403
+        assert self.post(client, {"message": {}}).status_code == 400
+        assert client.get(reverse("bot:webhook")).status_code == 405
+        settings.TELEGRAM_WEBHOOK_SECRET = ""
+        assert self.post(client, self.update(42, "/help"), secret="").status_code == 404
+
+        assert not TelegramUpdate.objects.exists()
+
+    def test_update_is_stored_before_the_answer(self, client, django_capture_on_commit_callbacks):
+        update = self.update(42, "/help")
+
+        with (
+            patch("apps.bot.views.process_telegram_updates_task.delay") as mock_delay,
+            django_capture_on_commit_callbacks(execute=True),
+        ):
+            assert self.post(client, update).status_code == 200
+            # Telegram resends updates it got no answer for.
+            assert self.post(client, update).status_code == 200
+
+        assert TelegramUpdate.objects.get().payload == update
+        mock_delay.assert_called_once_with()
+
+    def test_worker_runs_the_command_handlers(self):
+        user = User.objects.create(email="a@fitness.com")
+        TelegramSubscription.objects.create(user=user, telegram_uid=42)
+        for update_id, text in enumerate(["/subscribe", "/unsubscribe", "/subscribe"], start=1):
+            TelegramUpdate.objects.create(
+                update_id=update_id, payload=self.update(42, text, update_id)
+            )
+        bot = get_webhook_bot().bot
+
+        with patch.object(bot, "send_message") as send_message:
+            assert process_pending_updates() == 3
+
+        assert [call.args[1].split("!")[0] for call in send_message.call_args_list] == [
+            "Success",
+            "You've succesfully unsubscribed",
+            "Success",
+        ]
+        assert TelegramSubscription.objects.get().chat_id == 42
+        assert not TelegramUpdate.objects.exclude(status=TelegramUpdate.Status.PROCESSED).exists()
+
+    def test_failing_update_is_parked(self):
+        TelegramUpdate.objects.create(update_id=1, payload=self.update(42, "/help"))
+        TelegramUpdate.objects.create(update_id=2, payload=self.update(42, "/help", update_id=2))
+
+        with patch("apps.bot.webhook.handle_update", side_effect=[RuntimeError("boom"), None]):
+            assert process_pending_updates() == 2
+
+        assert list(TelegramUpdate.objects.values_list("status", "error_message")) == [
+            (TelegramUpdate.Status.FAILED, "boom"),
+            (TelegramUpdate.Status.PROCESSED, None),
+        ]
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from apps.bot.views import telegram_webhook
+
+app_name = "bot"
+
+urlpatterns = [
+    path("webhook/", telegram_webhook, name="webhook"),
+]
@@ -0,0 +1,57 @@
+import hmac
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotFound
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from apps.bot.models import TelegramUpdate
+from apps.bot.tasks import process_telegram_updates_task
+
+logger = logging.getLogger(__name__)
+
+
+@csrf_exempt
+@require_POST
+async def telegram_webhook(request):
+    """
+    Updates from Telegram in webhook mode. Telegram sends the secret given to
+    setWebhook in X-Telegram-Bot-Api-Secret-Token; the update is stored before the
+    answer goes back and handled by a Celery worker. Telegram's retries of an update
+    are dropped by its update_id.
+    """
+    secret = settings.TELEGRAM_WEBHOOK_SECRET
+    if not secret:
+        return HttpResponseNotFound()
+    token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+    if not hmac.compare_digest(token.encode(), secret.encode()):
+        return HttpResponse(status=403)
+
+    try:
+        update = json.loads(request.body)
+        update_id = int(update["update_id"])
+    except (ValueError, TypeError, KeyError):
+        return HttpResponse(status=400)
+
+    await sync_to_async(_store_update)(update_id, update)
+    return HttpResponse(status=200)
+
+
+def _store_update(update_id, update):
+    _, created = TelegramUpdate.objects.get_or_create(
+        update_id=update_id, defaults={"payload": update}
+    )
+    if created:
+        transaction.on_commit(_enqueue_update_processing)
+
+
+def _enqueue_update_processing():
+    # The beat schedule drains the inbox anyway, so a broker hiccup must not fail the webhook.
+    try:
+        process_telegram_updates_task.delay()
+    except Exception as e:
+        logger.warning(f"Could not enqueue Telegram update processing: {str(e)}")
@@ -0,0 +1,76 @@
+"""
+Webhook mode: Telegram POSTs updates to an endpoint of the web app instead of a polling
+process fetching them. The endpoint checks the secret token and stores the update in the
+TelegramUpdate inbox before it answers, so an update Telegram was told we have is never
+lost to a restart. Celery workers drain the inbox, kicked off by the webhook and by the
+beat schedule, so scaling the bot means adding workers.
+"""
+
+import functools
+import logging
+
+import telebot
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.bot.init import make_bot
+from apps.bot.models import TelegramUpdate
+
+logger = logging.getLogger(__name__)
+
+UPDATE_BATCH_SIZE = 100
+
+
+@functools.cache
+def get_webhook_bot():
+    return make_bot(threaded=False)
+
+
+def handle_update(update: dict):
+    get_webhook_bot().bot.process_new_updates([telebot.types.Update.de_json(update)])
+
+
+def process_pending_updates(batch_size: int = UPDATE_BATCH_SIZE) -> int:
+    """
+    Drain the update inbox in batches, in the order Telegram sent them.
+
+    Each batch is claimed with SKIP LOCKED so several workers can drain the inbox side
+    by side. An update whose handler fails is parked as FAILED instead of blocking the
+    rest.
+    """
+    processed = 0
+
+    while True:
+        with transaction.atomic():
+            batch = list(
+                TelegramUpdate.objects.select_for_update(skip_locked=True)
+                .filter(status=TelegramUpdate.Status.PENDING)
+                .order_by("id")[:batch_size]
+            )
+            if not batch:
+                break
+
+            for update in batch:
+                try:
+                    with transaction.atomic():
+                        handle_update(update.payload)
+                    update.status = TelegramUpdate.Status.PROCESSED
+                except Exception as e:
+                    logger.exception(f"Telegram update {update.update_id} failed.")
+                    update.status = TelegramUpdate.Status.FAILED
+                    update.error_message = str(e)
+                update.processed_at = timezone.now()
+
+            TelegramUpdate.objects.bulk_update(batch, ["status", "error_message", "processed_at"])
+
+        processed += len(batch)
+
+    return processed
+
+
+@receiver(setting_changed)
+def _reset_webhook_bot(setting, **_kwargs):
+    if setting.startswith(("TG_", "TELEGRAM_")):
+        get_webhook_bot.cache_clear()
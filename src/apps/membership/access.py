@@ -0,0 +1,172 @@
+import threading
+import time
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.membership.models import Membership
+
+UNKNOWN = "UNKNOWN"
+
+
+def access_status(entry: dict, today: date | None = None) -> str:
+    """
+    ACTIVE, FROZEN or EXPIRED for a cached member entry, UNKNOWN for an empty one.
+
+    The answer is worked out from the membership dates on every check, so entries stay
+    right across midnight and do not depend on the expiry sweep having run.
+    """
+    if not entry:
+        return UNKNOWN
+    today = today or date.today()
+    end_date = entry["end_date"]
+    if end_date is None or end_date <= today:
+        return Membership.Status.EXPIRED
+    frozen_from, frozen_to = entry["frozen_from"], entry["frozen_to"]
+    if frozen_from and frozen_to and frozen_from <= today < frozen_to:
+        return Membership.Status.FROZEN
+    return Membership.Status.ACTIVE
+
+
+class AccessCache:
+    """
+    Two-level cache of what the door needs to know about a member: their card and the
+    dates of their current membership (``User.current_membership``).
+
+    Lookups go to a small in-process dict first (ACCESS_LOCAL_TTL seconds), then to the
+    shared cache (ACCESS_CACHE_TTL seconds), then to one database query for all misses
+    of a batch. Unknown members and cards are cached as empty entries so a scanner
+    retrying a bad card does not hit the database.
+
+    Every change to a membership or a user drops the member's entries, once right away
+    and once after commit so readers that raced the write cannot keep the old row.
+    """
+
+    MEMBER_KEY = "access:member:{}"
+    CARD_KEY = "access:card:{}"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = {}
+
+    def members(self, member_ids) -> dict[int, dict]:
+        keys = {self.MEMBER_KEY.format(member_id): member_id for member_id in member_ids}
+        found = self._get_many(keys)
+
+        missing = [member_id for key, member_id in keys.items() if key not in found]
+        if missing:
+            loaded = self._load(id__in=missing)
+            entries = {
+                self.MEMBER_KEY.format(member_id): loaded.get(member_id, {})
+                for member_id in missing
+            }
+            self._set_many(entries)
+            found.update(entries)
+
+        return {member_id: found[key] for key, member_id in keys.items()}
+
+    def cards(self, cards) -> dict[str, dict]:
+        keys = {self.CARD_KEY.format(card): card for card in cards}
+        member_ids = self._get_many(keys)
+        entries = self.members({member_id for member_id in member_ids.values() if member_id})
+
+        result = {}
+        for key, card in keys.items():
+            member_id = member_ids.get(key)
+            if member_id == 0:
+                result[card] = {}
+            elif member_id is not None and entries[member_id].get("card") == card:
+                result[card] = entries[member_id]
+            # Otherwise not cached, or the card has moved on since it was cached.
+
+        missing = [card for card in keys.values() if card not in result]
+        if missing:
+            loaded = {
+                entry["card"]: entry for entry in self._load(access_card__in=missing).values()
+            }
+            shared = {self.MEMBER_KEY.format(entry["member"]): entry for entry in loaded.values()}
+            for card in missing:
+                entry = loaded.get(card, {})
+                shared[self.CARD_KEY.format(card)] = entry.get("member", 0)
+                result[card] = entry
+            self._set_many(shared)
+
+        return result
+
+    def invalidate(self, member_ids=(), cards=()):
+        keys = [self.MEMBER_KEY.format(member_id) for member_id in member_ids]
+        keys += [self.CARD_KEY.format(card) for card in cards]
+        if not keys:
+            return
+        cache.delete_many(keys)
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+
+    def invalidate_on_commit(self, member_ids=(), cards=()):
+        member_ids, cards = list(member_ids), list(cards)
+        self.invalidate(member_ids, cards)
+        transaction.on_commit(lambda: self.invalidate(member_ids, cards))
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def _get_many(self, keys) -> dict:
+        now = time.monotonic()
+        found = {}
+        for key in keys:
+            item = self._local.get(key)
+            if item is not None and item[0] > now:
+                found[key] = item[1]
+
+        missing = [key for key in keys if key not in found]
+        if missing:
+            shared = cache.get_many(missing)
+            self._remember(shared)
+            found.update(shared)
+        return found
+
+    def _set_many(self, entries: dict):
+        cache.set_many(entries, settings.ACCESS_CACHE_TTL)
+        self._remember(entries)
+
+    def _remember(self, entries: dict):
+        if not entries:
+            return
+        expires_at = time.monotonic() + settings.ACCESS_LOCAL_TTL
+        with self._lock:
+            if len(self._local) + len(entries) > settings.ACCESS_LOCAL_MAX_ENTRIES:
+                self._local.clear()
+            for key, value in entries.items():
+                self._local[key] = (expires_at, value)
+
+    @staticmethod
+    def _load(**filters) -> dict[int, dict]:
+        rows = (
+            get_user_model()
+            .objects.filter(**filters)
+            .values_list(
+                "id",
+                "access_card",
+                "current_membership__end_date",
+                "current_membership__frozen_from",
+                "current_membership__frozen_to",
+            )
+        )
+        return {
+            member_id: {
+                "member": member_id,
+                "card": card,
+                "end_date": end_date,
+                "frozen_from": frozen_from,
+                "frozen_to": frozen_to,
+            }
+            for member_id, card, end_date, frozen_from, frozen_to in rows
+        }
+
+
+access_cache = AccessCache()
@@ -1,3 +1,30 @@
 from django.contrib import admin
 
-# Register your models here.
+from apps.membership.models import FacilityClosure, Membership
+from core.admin import LargeTableAdminMixin, looks_like_email
+
+
+@admin.register(Membership)
+class MembershipAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "member", "plan", "status", "start_date", "end_date", "auto_renew")
+    list_filter = ("status", "auto_renew", "plan")
+    list_select_related = ("member", "plan")
+    date_hierarchy = "end_date"
+    ordering = ("-id",)
+    autocomplete_fields = ("member", "plan")
+
+    search_routes = ((looks_like_email, "member__email__iexact"), (str.isdigit, "pk"))
+    search_fields = ("member__email__iexact",)
+    search_help_text = "Member e-mail or membership id."
+
+
+@admin.register(FacilityClosure)
+class FacilityClosureAdmin(admin.ModelAdmin):
+    list_display = ("starts_on", "ends_on", "reason", "applied_at")
+    readonly_fields = ("applied_through_id", "applied_at")
+
+    def get_readonly_fields(self, request, obj=None):
+        # Memberships have been extended for these dates already.
+        if obj is not None and obj.applied_through_id is not None:
+            return ("starts_on", "ends_on", *self.readonly_fields)
+        return super().get_readonly_fields(request, obj)
@@ -0,0 +1,175 @@
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max, Min
+from rest_framework.exceptions import ValidationError
+
+from apps.bot.notifications import MEMBERSHIP_FROZEN, notify
+from apps.membership.access import access_cache
+from apps.membership.closures import applied_closure_days
+from apps.membership.filters import MembershipFilter
+from apps.membership.models import Membership
+from apps.payments.models import Payment
+from apps.plans.cache import plan_catalog
+
+# Selections up to this size are applied in the request, larger ones by a Celery task.
+BULK_SYNC_LIMIT = 1000
+BULK_CHUNK_SIZE = 1000
+# Submitted jobs are remembered as long as Celery keeps their results (a day by default),
+# so the status endpoint only reports on bulk jobs.
+BULK_JOB_KEY = "membership:bulk-job:{}"
+BULK_JOB_TTL = 24 * 60 * 60
+
+FREEZE = "freeze"
+RESUME = "resume"
+EXTEND = "extend"
+UPGRADE = "upgrade"
+OPERATIONS = (FREEZE, RESUME, EXTEND, UPGRADE)
+
+
+def bulk_queryset(spec):
+    """
+    Memberships selected by ``spec`` (``ids``, MembershipFilter ``filter`` params or
+    ``all``) that its operation applies to, e.g. only active ones for a freeze.
+
+    An empty or unknown filter is an error rather than the whole club; selecting every
+    membership takes an explicit ``all``.
+    """
+    if spec.get("ids") is not None:
+        queryset = Membership.objects.filter(id__in=spec["ids"])
+    elif spec.get("all"):
+        queryset = Membership.objects.all()
+    else:
+        params = spec.get("filter") or {}
+        filterset = MembershipFilter(params, queryset=Membership.objects.all())
+        known = _filter_params(filterset)
+        if not params or not set(params) <= known:
+            raise ValidationError({"filter": f"Filter by at least one of {sorted(known)}."})
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        queryset = filterset.qs
+
+    operation = spec["operation"]
+    if operation == FREEZE:
+        return queryset.filter(status=Membership.Status.ACTIVE)
+    if operation == RESUME:
+        return queryset.filter(status=Membership.Status.FROZEN)
+    if operation == EXTEND:
+        return queryset.filter(status__in=[Membership.Status.ACTIVE, Membership.Status.FROZEN])
+    plan = plan_catalog.get(spec["plan_id"])
+    return queryset.filter(status=Membership.Status.ACTIVE, price_at_purchase__lt=plan.price)
+
+
+def _filter_params(filterset) -> set[str]:
+    # Range filters take their bounds as <name>_after / <name>_before.
+    params = set()
+    for name, field in filterset.filters.items():
+        suffixes = getattr(field.field.widget, "suffixes", None)
+        if suffixes:
+            params.update(f"{name}_{suffix}" for suffix in suffixes)
+        else:
+            params.add(name)
+    return params
+
+
+def remember_bulk_job(job_id: str):
+    cache.set(BULK_JOB_KEY.format(job_id), True, BULK_JOB_TTL)
+
+
+def is_bulk_job(job_id: str) -> bool:
+    return bool(cache.get(BULK_JOB_KEY.format(job_id)))
+
+
+def run_bulk_operation(spec: dict, chunk_size: int | None = None, progress=None) -> dict:
+    """
+    Apply a freeze, resume, extend or upgrade to every membership in ``spec``.
+
+    Rows are locked and changed with one set-based UPDATE per chunk of primary keys, in
+    the chunk's own transaction; upgrade fees are written with one bulk_create. Without
+    ``chunk_size`` the whole selection is a single chunk. ``progress`` is called with
+    the summary so far after every chunk.
+    """
+    queryset = bulk_queryset(spec)
+    summary = {
+        "operation": spec["operation"],
+        "matched": 0,
+        "updated": 0,
+        "payments": 0,
+        "chunks": 0,
+    }
+
+    bounds = queryset.aggregate(first_id=Min("id"), last_id=Max("id"), matched=Count("id"))
+    summary["matched"] = bounds["matched"]
+    if bounds["first_id"] is None:
+        return summary
+
+    step = chunk_size or bounds["last_id"] - bounds["first_id"] + 1
+    for chunk_start in range(bounds["first_id"], bounds["last_id"] + 1, step):
+        with transaction.atomic():
+            rows = list(
+                queryset.filter(id__gte=chunk_start, id__lt=chunk_start + step)
+                .select_for_update()
+                .values_list("id", "member_id", "price_at_purchase")
+            )
+            if rows:
+                updated, payments = _apply(spec, rows)
+                summary["updated"] += updated
+                summary["payments"] += payments
+
+        summary["chunks"] += 1
+        if progress is not None:
+            progress(summary)
+
+    return summary
+
+
+def _apply(spec, rows) -> tuple[int, int]:
+    memberships = Membership.objects.filter(id__in=[row[0] for row in rows])
+    operation = spec["operation"]
+    payments = []
+
+    if operation == FREEZE:
+        frozen_from = date.fromisoformat(spec["frozen_from"])
+        frozen_to = date.fromisoformat(spec["frozen_to"])
+        end_date = F("end_date") + timedelta(days=(frozen_to - frozen_from).days)
+        credited = applied_closure_days(frozen_from, frozen_to)
+        updated = memberships.update(
+            status=Membership.Status.FROZEN,
+            frozen_from=frozen_from,
+            frozen_to=frozen_to,
+            end_date=end_date if credited is None else end_date - credited,
+        )
+        notify(
+            MEMBERSHIP_FROZEN,
+            [
+                (member_id, {"frozen_from": frozen_from, "frozen_to": frozen_to})
+                for _, member_id, _ in rows
+            ],
+        )
+    elif operation == RESUME:
+        updated = memberships.update(
+            status=Membership.Status.ACTIVE, frozen_from=None, frozen_to=None
+        )
+    elif operation == EXTEND:
+        updated = memberships.update(end_date=F("end_date") + timedelta(days=spec["days"]))
+    else:
+        plan = plan_catalog.get(spec["plan_id"])
+        updated = memberships.update(
+            plan=plan,
+            price_at_purchase=plan.price,
+            end_date=F("start_date") + timedelta(days=plan.duration_days),
+        )
+        payments = Payment.objects.bulk_create(
+            Payment(
+                user_id=member_id,
+                membership_id=plan.id,
+                type=Payment.TypeChoices.UPGRADE_FEE,
+                money_to_pay=plan.price - price_at_purchase,
+                status=Payment.StatusChoices.PENDING,
+            )
+            for _, member_id, price_at_purchase in rows
+        )
+
+    access_cache.invalidate_on_commit(member_ids=[row[1] for row in rows])
+    return updated, len(payments)
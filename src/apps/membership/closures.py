@@ -0,0 +1,141 @@
+import logging
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Case, DurationField, ExpressionWrapper, F, Max, Q, Value, When
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from apps.membership.access import access_cache
+from apps.membership.models import FacilityClosure, Membership
+
+logger = logging.getLogger(__name__)
+
+CLOSURE_CHUNK_SIZE = 10000
+
+
+def _days(start, end):
+    return ExpressionWrapper(end - start, output_field=DurationField())
+
+
+def closure_shift(closure: FacilityClosure):
+    """
+    SQL expression for how far a membership's end_date moves for ``closure``: the days
+    its [start_date, end_date) interval overlaps the closure, minus the overlapping days
+    it spends frozen, which the freeze has already added.
+    """
+    closed_from = Value(closure.starts_on)
+    closed_until = Value(closure.ends_on + timedelta(days=1))
+
+    overlap = _days(Greatest(F("start_date"), closed_from), Least(F("end_date"), closed_until))
+    frozen = _days(
+        Greatest(F("start_date"), F("frozen_from"), closed_from),
+        Least(F("end_date"), F("frozen_to"), closed_until),
+    )
+    return overlap - Case(
+        When(
+            Q(frozen_from__lt=closed_until, frozen_to__gt=closed_from),
+            then=frozen,
+        ),
+        default=Value(timedelta(0)),
+        output_field=DurationField(),
+    )
+
+
+def applied_closure_days(frozen_from: date, frozen_to: date):
+    """
+    SQL expression for the days of a freeze over [frozen_from, frozen_to) that fall in
+    closures already applied to a membership, or None when no applied closure overlaps
+    it. The closure extended end_date for those days, so the freeze must not add them
+    again; closures applied after the freeze leave them out themselves, see closure_shift.
+    """
+    closures = FacilityClosure.objects.filter(
+        applied_through_id__isnull=False,
+        starts_on__lt=frozen_to,
+        ends_on__gte=frozen_from,
+    )
+    credited = None
+    for closure in closures:
+        closed_from = Value(max(frozen_from, closure.starts_on))
+        closed_until = Value(min(frozen_to, closure.ends_on + timedelta(days=1)))
+        days = Case(
+            When(
+                # Extended by this closure: reached by its run and running into the closure.
+                Q(
+                    id__lte=closure.applied_through_id,
+                    start_date__lt=closed_until,
+                    end_date__gt=closed_from,
+                ),
+                then=_days(Greatest(F("start_date"), closed_from), closed_until),
+            ),
+            default=Value(timedelta(0)),
+            output_field=DurationField(),
+        )
+        credited = days if credited is None else credited + days
+    return credited
+
+
+def affected_memberships(closure: FacilityClosure):
+    return Membership.objects.filter(
+        status__in=[Membership.Status.ACTIVE, Membership.Status.FROZEN],
+        start_date__lte=closure.ends_on,
+        end_date__gt=closure.starts_on,
+    )
+
+
+def apply_closure(closure: FacilityClosure, chunk_size: int = CLOSURE_CHUNK_SIZE) -> dict:
+    """
+    Extend every live membership overlapping ``closure``, one UPDATE per primary-key
+    chunk with the shift worked out in SQL.
+
+    Each chunk moves the closure's ``applied_through_id`` watermark in the same
+    transaction, under a lock on the closure row, so a rerun or a second worker picks
+    up after the last committed chunk and no membership is extended twice. Memberships
+    created after the run started are left alone.
+    """
+    summary = {"closure": closure.pk, "extended": 0, "chunks": 0}
+    if closure.applied_at is not None:
+        return summary
+
+    last_id = Membership.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+    shift = closure_shift(closure)
+
+    while True:
+        with transaction.atomic():
+            locked = FacilityClosure.objects.select_for_update().get(pk=closure.pk)
+            watermark = locked.applied_through_id or 0
+            if locked.applied_at is not None:
+                break
+            if watermark >= last_id:
+                locked.applied_at = timezone.now()
+                locked.save(update_fields=["applied_at"])
+                break
+
+            chunk_end = min(watermark + chunk_size, last_id)
+            chunk = affected_memberships(closure).filter(id__gt=watermark, id__lte=chunk_end)
+            member_ids = list(chunk.values_list("member_id", flat=True))
+            if member_ids:
+                summary["extended"] += chunk.update(end_date=F("end_date") + shift)
+                access_cache.invalidate_on_commit(member_ids=member_ids)
+
+            locked.applied_through_id = chunk_end
+            locked.save(update_fields=["applied_through_id"])
+        summary["chunks"] += 1
+
+    closure.refresh_from_db()
+    return summary
+
+
+def apply_facility_closures(
+    today: date | None = None, chunk_size: int = CLOSURE_CHUNK_SIZE
+) -> list[dict]:
+    """Apply every closure that has begun and is not fully applied yet, oldest first."""
+    today = today or date.today()
+    summaries = []
+    for closure in FacilityClosure.objects.filter(applied_at__isnull=True, starts_on__lte=today):
+        summaries.append(apply_closure(closure, chunk_size))
+        logger.info(
+            f"{closure}: {summaries[-1]['extended']} memberships extended "
+            f"in {summaries[-1]['chunks']} chunks."
+        )
+    return summaries
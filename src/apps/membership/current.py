@@ -0,0 +1,92 @@
+"""
+``User.current_membership`` points at the member's live (ACTIVE or FROZEN) membership,
+so checks on the hot path are a primary-key lookup instead of a status query.
+
+Whoever changes a membership keeps the pointer in step in the same transaction: new
+memberships set it and the expiry sweep clears it. Freezing, resuming and upgrading
+change the membership row itself, so the pointer stays valid. Drift (raw SQL, restores)
+is found and repaired by ``manage.py rebuild_current_memberships``.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Max, Min, OuterRef, Subquery
+
+from apps.membership.access import access_cache
+from apps.membership.models import Membership
+
+LIVE_STATUSES = (Membership.Status.ACTIVE, Membership.Status.FROZEN)
+REBUILD_CHUNK_SIZE = 5000
+
+
+def set_current_memberships(memberships, batch_size=None):
+    """Point each membership's member at it."""
+    User = get_user_model()
+    User.objects.bulk_update(
+        [
+            User(pk=membership.member_id, current_membership_id=membership.pk)
+            for membership in memberships
+        ],
+        ["current_membership"],
+        batch_size=batch_size,
+    )
+    access_cache.invalidate_on_commit(
+        member_ids=[membership.member_id for membership in memberships]
+    )
+
+
+def release_expired(first_id: int, last_id: int) -> int:
+    """Clear pointers to expired memberships with ids in [first_id, last_id)."""
+    return (
+        get_user_model()
+        .objects.filter(
+            current_membership_id__gte=first_id,
+            current_membership_id__lt=last_id,
+            current_membership__status=Membership.Status.EXPIRED,
+        )
+        .update(current_membership=None)
+    )
+
+
+def rebuild_current_memberships(fix: bool = True, chunk_size: int = REBUILD_CHUNK_SIZE) -> dict:
+    """
+    Compare every pointer with the live membership that ends last and, with ``fix``,
+    repair the ones that differ. Users are walked in primary-key ranges, each chunk
+    locked and written in its own transaction.
+    """
+    User = get_user_model()
+    summary = {"checked": 0, "mismatched": 0, "fixed": 0}
+
+    expected = Subquery(
+        Membership.objects.filter(member=OuterRef("pk"), status__in=LIVE_STATUSES)
+        .order_by("-end_date", "-id")
+        .values("id")[:1]
+    )
+    bounds = User.objects.aggregate(first_id=Min("id"), last_id=Max("id"))
+    if bounds["first_id"] is None:
+        return summary
+
+    for chunk_start in range(bounds["first_id"], bounds["last_id"] + 1, chunk_size):
+        with transaction.atomic():
+            users = User.objects.filter(id__gte=chunk_start, id__lt=chunk_start + chunk_size)
+            if fix:
+                users = users.select_for_update()
+            rows = list(
+                users.annotate(expected=expected).values_list(
+                    "id", "current_membership_id", "expected"
+                )
+            )
+
+            stale = [
+                User(pk=user_id, current_membership_id=expected_id)
+                for user_id, current_id, expected_id in rows
+                if current_id != expected_id
+            ]
+            summary["checked"] += len(rows)
+            summary["mismatched"] += len(stale)
+            if fix and stale:
+                User.objects.bulk_update(stale, ["current_membership"])
+                access_cache.invalidate_on_commit(member_ids=[user.pk for user in stale])
+                summary["fixed"] += len(stale)
+
+    return summary
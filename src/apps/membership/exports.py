@@ -0,0 +1,26 @@
+from rest_framework.exceptions import ValidationError
+
+from apps.membership.filters import MembershipFilter
+from apps.membership.models import Membership
+
+MEMBERSHIP_EXPORT_FIELDS = (
+    "id",
+    "member_id",
+    "member__email",
+    "plan_id",
+    "plan__name",
+    "status",
+    "start_date",
+    "end_date",
+    "auto_renew",
+    "price_at_purchase",
+    "frozen_from",
+    "frozen_to",
+)
+
+
+def membership_export_queryset(params):
+    filterset = MembershipFilter(params, queryset=Membership.objects.order_by("id"))
+    if not filterset.is_valid():
+        raise ValidationError(filterset.errors)
+    return filterset.qs
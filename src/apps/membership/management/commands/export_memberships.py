@@ -0,0 +1,21 @@
+from apps.membership.exports import MEMBERSHIP_EXPORT_FIELDS, membership_export_queryset
+from core.export import BaseExportCommand
+
+
+class Command(BaseExportCommand):
+    help = "Stream memberships to a CSV or NDJSON file."
+    fields = MEMBERSHIP_EXPORT_FIELDS
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--status")
+        parser.add_argument("--start-after", help="YYYY-MM-DD, inclusive.")
+        parser.add_argument("--start-before", help="YYYY-MM-DD, inclusive.")
+
+    def get_queryset(self, options):
+        params = {
+            "status": options["status"],
+            "start_date_after": options["start_after"],
+            "start_date_before": options["start_before"],
+        }
+        return membership_export_queryset({k: v for k, v in params.items() if v})
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.membership.current import REBUILD_CHUNK_SIZE, rebuild_current_memberships
+
+
+class Command(BaseCommand):
+    help = "Check users' current_membership pointers against their memberships and repair them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Only report, change nothing.")
+        parser.add_argument("--chunk-size", type=int, default=REBUILD_CHUNK_SIZE)
+
+    def handle(self, *_args, **options):
+        summary = rebuild_current_memberships(
+            fix=not options["check"], chunk_size=options["chunk_size"]
+        )
+        self.stdout.write(
+            f"{summary['checked']} users checked, {summary['mismatched']} pointers out of date, "
+            f"{summary['fixed']} fixed."
+        )
+        if options["check"] and summary["mismatched"]:
+            raise CommandError(f"{summary['mismatched']} pointers out of date")
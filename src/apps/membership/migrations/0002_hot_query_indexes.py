@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0001_initial'),
+        ('plans', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['member', 'status'], name='membership_member_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(condition=models.Q(('status__in', ['ACTIVE', 'FROZEN'])), fields=['member'], name='membership_live_idx'),
+        ),
+    ]
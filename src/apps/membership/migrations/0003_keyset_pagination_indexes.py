@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0002_hot_query_indexes'),
+        ('plans', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['end_date', 'id'], name='membership_end_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['member', 'end_date', 'id'], name='membership_member_end_idx'),
+        ),
+    ]
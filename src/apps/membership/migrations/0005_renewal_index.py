@@ -0,0 +1,20 @@
+# Generated by Django 5.2.10 on 2026-10-17 20:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0004_facility_closure'),
+        ('plans', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(condition=models.Q(('auto_renew', True), ('status', 'ACTIVE')), fields=['end_date', 'id'], name='membership_renewal_idx'),
+        ),
+    ]
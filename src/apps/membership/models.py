@@ -35,5 +35,53 @@ class Membership(models.Model):
     frozen_from = models.DateField(null=True, blank=True)
     frozen_to = models.DateField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["member", "status"], name="membership_member_status_idx"),
+            models.Index(
+                fields=["member"],
+                condition=models.Q(status__in=["ACTIVE", "FROZEN"]),
+                name="membership_live_idx",
+            ),
+            models.Index(fields=["end_date", "id"], name="membership_end_date_idx"),
+            models.Index(fields=["member", "end_date", "id"], name="membership_member_end_idx"),
+            models.Index(
+                fields=["end_date", "id"],
+                condition=models.Q(auto_renew=True, status="ACTIVE"),
+                name="membership_renewal_idx",
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"Membership #{self.id}: {self.member} - {self.plan.name}"
+
+
+class FacilityClosure(models.Model):
+    """
+    Days the club is closed (both ends inclusive). Live memberships are extended by the
+    days they overlap the closure, see apps.membership.closures.
+    """
+
+    starts_on = models.DateField()
+    ends_on = models.DateField()
+    reason = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    # Progress of the extension engine: memberships up to this id have been extended.
+    applied_through_id = models.BigIntegerField(null=True, blank=True, editable=False)
+    applied_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        ordering = ["starts_on", "id"]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(ends_on__gte=models.F("starts_on")), name="closure_dates_ordered"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"Closure {self.starts_on} - {self.ends_on}"
+
+    @property
+    def days(self) -> int:
+        return (self.ends_on - self.starts_on).days + 1
@@ -0,0 +1,13 @@
+from core.authentication import HasSettingToken, SettingTokenAuthentication
+
+
+class AccessKeyAuthentication(SettingTokenAuthentication):
+    """Accepts ``Authorization: Bearer <key>`` for keys listed in ACCESS_CHECK_API_KEYS."""
+
+    setting = "ACCESS_CHECK_API_KEYS"
+    auth_name = "access-key"
+    realm = "access"
+
+
+class HasAccessKey(HasSettingToken):
+    authentication_class = AccessKeyAuthentication
@@ -0,0 +1,226 @@
+"""
+Auto-renewal: memberships with ``auto_renew`` that end within RENEWAL_DAYS_AHEAD days
+are charged off-session to the card saved on the member's Stripe customer and extended
+by another period of their plan.
+
+A renewal day is split into shards by member id, each run by its own Celery task: at
+least RENEWAL_SHARDS, and more on busy days so no shard has over RENEWAL_SHARD_CAPACITY
+memberships to renew within its RENEWAL_TIME_BUDGET. A shard walks the partial renewal index in keyset batches: renewal payments
+are inserted with one bulk_create, charged by a pool of RENEWAL_CONCURRENCY threads and
+the outcome is written back with bulk updates.
+
+Every payment carries an idempotency key derived from the membership and the end date
+it renews, which is also sent to Stripe. A rerun therefore reuses the payments already
+created and never charges a period twice. Charges that hit a Stripe outage, a rate
+limit or a timeout stay PENDING and are retried, with the same key, by the hourly runs
+of the next 24 hours; only declines and other definitive errors mark a payment FAILED.
+Each batch holds its pending payments locked while it charges them, so runs that
+overlap never send the same key twice at once.
+"""
+
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Mod
+from django.utils import timezone
+
+from apps.bot.notifications import MEMBERSHIP_RENEWED, notify
+from apps.membership.access import access_cache
+from apps.membership.models import Membership
+from apps.payments.models import Payment
+from apps.payments.stripe_helper import charge_saved_payment_method
+from apps.plans.cache import plan_catalog
+
+logger = logging.getLogger(__name__)
+
+RENEWAL_BATCH_SIZE = 500
+
+# Stripe keeps idempotency keys for 24 hours. Pending renewals older than that are left
+# alone: charging them again could charge twice if the first attempt went through.
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+
+
+def renewal_key(membership_id: int, end_date: date) -> str:
+    return f"renewal-{membership_id}-{end_date.isoformat()}"
+
+
+def renewal_candidates(today: date, shard: int = 0, shards: int = 1):
+    """Active auto-renewing memberships of the shard ending within the renewal window."""
+    queryset = Membership.objects.filter(
+        auto_renew=True,
+        status=Membership.Status.ACTIVE,
+        end_date__gte=today,
+        end_date__lte=today + timedelta(days=settings.RENEWAL_DAYS_AHEAD),
+    )
+    if shards > 1:
+        queryset = queryset.alias(shard=Mod("member_id", shards)).filter(shard=shard)
+    return queryset
+
+
+def renewal_shards(today: date) -> int:
+    """Enough shards that none has more than RENEWAL_SHARD_CAPACITY memberships due."""
+    due = renewal_candidates(today).count()
+    return max(settings.RENEWAL_SHARDS, math.ceil(due / settings.RENEWAL_SHARD_CAPACITY))
+
+
+def renew_memberships(
+    today: date | None = None,
+    shard: int = 0,
+    shards: int = 1,
+    batch_size: int = RENEWAL_BATCH_SIZE,
+    concurrency: int | None = None,
+    time_budget: float | None = None,
+) -> dict:
+    """
+    Charge and extend the auto-renewing memberships of one shard.
+
+    Every end date in the window is walked by id, so each batch is a range scan of
+    ``membership_renewal_idx``. Members without a saved card and plans that no longer
+    exist are counted as skipped. After ``time_budget`` seconds no new batch is started
+    and ``stopped_early`` is set; the next run picks up the rest.
+    """
+    today = today or date.today()
+    summary = {
+        "selected": 0,
+        "renewed": 0,
+        "failed": 0,
+        "retried": 0,
+        "skipped": 0,
+        "batches": 0,
+        "stopped_early": False,
+    }
+    candidates = renewal_candidates(today, shard, shards)
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+
+    with ThreadPoolExecutor(max_workers=concurrency or settings.RENEWAL_CONCURRENCY) as pool:
+        for offset in range(settings.RENEWAL_DAYS_AHEAD + 1):
+            end_date = today + timedelta(days=offset)
+            last_id = 0
+            while not summary["stopped_early"]:
+                rows = list(
+                    candidates.filter(end_date=end_date, id__gt=last_id)
+                    .order_by("id")
+                    .values_list(
+                        "id",
+                        "member_id",
+                        "plan_id",
+                        "member__stripecustomer__stripe_customer_id",
+                        "member__stripecustomer__default_payment_method",
+                    )[:batch_size]
+                )
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                summary["selected"] += len(rows)
+                _renew_batch(rows, end_date, pool, summary)
+                summary["batches"] += 1
+                summary["stopped_early"] = deadline is not None and time.monotonic() >= deadline
+
+    return summary
+
+
+def _renew_batch(rows, end_date, pool, summary):
+    plans = plan_catalog.in_bulk({row[2] for row in rows})
+    renewals = {}
+    for membership_id, member_id, plan_id, customer_id, payment_method in rows:
+        plan = plans.get(plan_id)
+        if plan is None or not customer_id or not payment_method:
+            continue
+        renewals[renewal_key(membership_id, end_date)] = (
+            membership_id,
+            member_id,
+            plan,
+            customer_id,
+            payment_method,
+        )
+
+    Payment.objects.bulk_create(
+        [
+            Payment(
+                user_id=member_id,
+                membership_id=plan.id,
+                type=Payment.TypeChoices.RENEWAL,
+                money_to_pay=plan.price,
+                status=Payment.StatusChoices.PENDING,
+                idempotency_key=key,
+            )
+            for key, (_, member_id, plan, _, _) in renewals.items()
+        ],
+        ignore_conflicts=True,
+    )
+    with transaction.atomic():
+        # Claim the batch: payments of an earlier run are picked up again, but a run that
+        # overlaps this one (say, queued behind the month-start spike) skips the rows this
+        # one holds instead of charging them too. Paid and failed ones are not charged twice.
+        payments = list(
+            Payment.objects.select_for_update(skip_locked=True).filter(
+                idempotency_key__in=list(renewals),
+                status=Payment.StatusChoices.PENDING,
+                created_at__gt=timezone.now() - IDEMPOTENCY_KEY_TTL,
+            )
+        )
+        summary["skipped"] += len(rows) - len(payments)
+        if not payments:
+            return
+
+        results = pool.map(
+            lambda payment: charge_saved_payment_method(
+                payment, *renewals[payment.idempotency_key][3:]
+            ),
+            payments,
+        )
+        now = timezone.now()
+        settled = []
+        renewed = {}
+        notifications = []
+        for payment, result in zip(payments, results, strict=True):
+            membership_id, member_id, plan, _, _ = renewals[payment.idempotency_key]
+            if result.retryable:
+                # Left PENDING for the next run; Stripe may even have charged already.
+                summary["retried"] += 1
+                logger.warning(
+                    f"Renewal of membership {membership_id} will be retried: {result.error}"
+                )
+                continue
+            payment.error_message = result.error
+            payment.updated_at = now
+            if result.ok:
+                payment.status = Payment.StatusChoices.PAID
+                renewed.setdefault(plan.pk, (plan, []))[1].append(membership_id)
+                notifications.append(
+                    (
+                        member_id,
+                        {
+                            "plan": plan.name,
+                            "end_date": end_date + timedelta(days=plan.duration_days),
+                        },
+                    )
+                )
+                summary["renewed"] += 1
+            else:
+                payment.status = Payment.StatusChoices.FAILED
+                summary["failed"] += 1
+                logger.warning(
+                    f"Renewal of membership {membership_id} failed: {payment.error_message}"
+                )
+            settled.append(payment)
+        if not settled:
+            return
+
+        Payment.objects.bulk_update(settled, ["status", "error_message", "updated_at"])
+        # The end_date guard keeps a period from being added twice.
+        for plan, membership_ids in renewed.values():
+            Membership.objects.filter(id__in=membership_ids, end_date=end_date).update(
+                end_date=F("end_date") + timedelta(days=plan.duration_days),
+                price_at_purchase=plan.price,
+            )
+        access_cache.invalidate_on_commit(
+            member_ids=[renewals[payment.idempotency_key][1] for payment in settled]
+        )
+        notify(MEMBERSHIP_RENEWED, notifications)
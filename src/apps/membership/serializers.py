@@ -1,7 +1,9 @@
 from datetime import date
 from rest_framework import serializers
 
+from apps.membership.bulk import EXTEND, FREEZE, OPERATIONS, UPGRADE
 from apps.membership.models import Membership
+from apps.plans.cache import plan_catalog
 from apps.plans.models import MembershipPlan
 
 
@@ -38,12 +40,7 @@ class MembershipCreateSerializer(serializers.ModelSerializer):
 
     def validate(self, attrs):
         user = self.context["request"].user
-        active_exists = Membership.objects.filter(
-            member=user,
-            status__in=["ACTIVE", "FROZEN"]
-        ).exists()
-
-        if active_exists:
+        if user.current_membership_id is not None:
             raise serializers.ValidationError("You already have an active or frozen subscription.")
         return attrs
 
@@ -58,3 +55,29 @@ class FreezeSerializer(serializers.Serializer):
         if data["frozen_from"] < date.today():
             raise serializers.ValidationError("You can't freeze the past.")
         return data
+
+
+class BulkMembershipSerializer(serializers.Serializer):
+    operation = serializers.ChoiceField(choices=OPERATIONS)
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    filter = serializers.DictField(required=False, allow_empty=False)
+    all = serializers.BooleanField(required=False, default=False)
+    frozen_from = serializers.DateField(required=False)
+    frozen_to = serializers.DateField(required=False)
+    days = serializers.IntegerField(required=False, min_value=1)
+    plan_id = serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        if ["ids" in data, "filter" in data, data["all"]].count(True) != 1:
+            raise serializers.ValidationError("Pass one of ids, filter or all: true.")
+
+        operation = data["operation"]
+        if operation == FREEZE:
+            if "frozen_from" not in data or "frozen_to" not in data:
+                raise serializers.ValidationError("A freeze needs frozen_from and frozen_to.")
+            FreezeSerializer().validate(data)
+        elif operation == EXTEND and "days" not in data:
+            raise serializers.ValidationError("An extension needs days.")
+        elif operation == UPGRADE and plan_catalog.get(data.get("plan_id")) is None:
+            raise serializers.ValidationError("Plan not found.")
+        return data
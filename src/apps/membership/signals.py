@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.membership.access import access_cache
+from apps.membership.models import Membership
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def invalidate_membership_access(instance, **_kwargs):
+    access_cache.invalidate_on_commit(member_ids=[instance.member_id])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_access(instance, **_kwargs):
+    access_cache.invalidate_on_commit(
+        [instance.pk], [instance.access_card] if instance.access_card else []
+    )
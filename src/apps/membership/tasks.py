@@ -0,0 +1,118 @@
+import logging
+from datetime import date
+
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Q
+
+from apps.membership.bulk import BULK_CHUNK_SIZE, run_bulk_operation
+from apps.membership.closures import apply_facility_closures
+from apps.membership.current import release_expired
+from apps.membership.models import Membership
+from apps.membership.renewals import renew_memberships, renewal_shards
+
+logger = logging.getLogger(__name__)
+
+EXPIRY_CHUNK_SIZE = 5000
+
+
+def expire_memberships(today: date | None = None, chunk_size: int = EXPIRY_CHUNK_SIZE) -> dict:
+    """
+    Flip finished memberships to EXPIRED and thaw frozen ones whose freeze is over;
+    members of expired ones lose their current membership pointer.
+
+    The table is walked in primary-key ranges so every chunk is a couple of
+    set-based UPDATEs in its own short transaction, no matter how many members we have.
+    """
+    today = today or date.today()
+    summary = {"expired": 0, "unfrozen": 0, "chunks": 0}
+
+    bounds = Membership.objects.filter(
+        status__in=[Membership.Status.ACTIVE, Membership.Status.FROZEN]
+    ).aggregate(first_id=Min("id"), last_id=Max("id"))
+    if bounds["first_id"] is None:
+        return summary
+
+    for chunk_start in range(bounds["first_id"], bounds["last_id"] + 1, chunk_size):
+        chunk = Membership.objects.filter(id__gte=chunk_start, id__lt=chunk_start + chunk_size)
+
+        with transaction.atomic():
+            summary["expired"] += chunk.filter(
+                Q(status=Membership.Status.ACTIVE)
+                | Q(status=Membership.Status.FROZEN, frozen_to__lte=today),
+                end_date__lte=today,
+            ).update(status=Membership.Status.EXPIRED, frozen_from=None, frozen_to=None)
+
+            summary["unfrozen"] += chunk.filter(
+                status=Membership.Status.FROZEN,
+                frozen_to__lte=today,
+            ).update(status=Membership.Status.ACTIVE, frozen_from=None, frozen_to=None)
+
+            release_expired(chunk_start, chunk_start + chunk_size)
+
+        summary["chunks"] += 1
+
+    return summary
+
+
+@shared_task
+def expire_memberships_task():
+    summary = expire_memberships()
+    logger.info(
+        f"Membership sweep done: {summary['expired']} expired, "
+        f"{summary['unfrozen']} unfrozen in {summary['chunks']} chunks."
+    )
+    return summary
+
+
+@shared_task(bind=True)
+def bulk_membership_task(self, spec):
+    """Large bulk operations; the summary so far is reported as PROGRESS state meta."""
+    summary = run_bulk_operation(
+        spec,
+        chunk_size=BULK_CHUNK_SIZE,
+        progress=lambda so_far: self.update_state(state="PROGRESS", meta=so_far),
+    )
+    logger.info(
+        f"Bulk {summary['operation']} done: {summary['updated']} of {summary['matched']} memberships "
+        f"updated, {summary['payments']} payments created in {summary['chunks']} chunks."
+    )
+    return summary
+
+
+@shared_task
+def apply_facility_closures_task():
+    return apply_facility_closures()
+
+
+@shared_task
+def schedule_renewals_task():
+    """Fan the day's renewals out to one task per shard, so several workers share them."""
+    today = date.today()
+    shards = renewal_shards(today)
+    for shard in range(shards):
+        renew_memberships_task.delay(shard, shards, today.isoformat())
+    return shards
+
+
+# The budget ends new batches well before the next hourly run; the limits only stop a
+# shard stuck on Stripe, whose locked payments then roll back to PENDING for that run.
+@shared_task(
+    soft_time_limit=settings.RENEWAL_TIME_BUDGET + 5 * 60,
+    time_limit=settings.RENEWAL_TIME_BUDGET + 10 * 60,
+)
+def renew_memberships_task(shard=0, shards=1, today=None):
+    summary = renew_memberships(
+        today=date.fromisoformat(today) if today else None,
+        shard=shard,
+        shards=shards,
+        time_budget=settings.RENEWAL_TIME_BUDGET,
+    )
+    state = "stopped at its time budget" if summary["stopped_early"] else "done"
+    logger.info(
+        f"Renewal shard {shard}/{shards} {state}: "
+        f"{summary['renewed']} renewed, {summary['failed']} failed, {summary['retried']} to retry, "
+        f"{summary['skipped']} skipped of {summary['selected']} in {summary['batches']} batches."
+    )
+    return summary
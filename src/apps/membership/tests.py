@@ -1,3 +1,838 @@
-from django.test import TestCase
+import pytest
+from datetime import date, timedelta
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from rest_framework.test import APIClient
+from apps.membership.bulk import remember_bulk_job, run_bulk_operation
+from apps.membership.current import set_current_memberships
+from apps.membership.closures import apply_closure, apply_facility_closures
+from apps.membership.models import FacilityClosure, Membership
+from apps.membership.renewals import renew_memberships
+from apps.membership.tasks import bulk_membership_task, expire_memberships, schedule_renewals_task
+from apps.payments.events import create_or_update_membership
+from apps.payments.models import Payment, StripeCustomer
+from apps.payments.stripe_client import StripeClient
+from apps.payments.stripe_fake import FakeStripe, FakeStripeHTTPClient
+from apps.plans.models import MembershipPlan
 
-# Create your tests here.
+User = get_user_model()
+
+
+def make_membership(plan, start_date, end_date, **kwargs):
+    """A membership of ``plan`` for a new member."""
+    kwargs.setdefault("price_at_purchase", plan.price)
+    user = User.objects.create(email=f"m{User.objects.count()}@fitness.com")
+    return Membership.objects.create(
+        member=user, plan=plan, start_date=start_date, end_date=end_date, **kwargs
+    )
+
+
+@pytest.mark.django_db
+class TestMembershipExpirySweep:
+    def make_membership(self, plan, email, end_date, **kwargs):
+        user = User.objects.create_user(email=email, password="password")
+        return Membership.objects.create(
+            member=user,
+            plan=plan,
+            start_date=end_date - timedelta(days=30),
+            end_date=end_date,
+            price_at_purchase=plan.price,
+            **kwargs,
+        )
+
+    def test_expires_finished_and_thaws_frozen(self, plan):
+        today = date.today()
+        finished = self.make_membership(plan, "a@fitness.com", today)
+        running = self.make_membership(plan, "b@fitness.com", today + timedelta(days=5))
+        thawed = self.make_membership(
+            plan,
+            "c@fitness.com",
+            today + timedelta(days=10),
+            status=Membership.Status.FROZEN,
+            frozen_from=today - timedelta(days=7),
+            frozen_to=today - timedelta(days=1),
+        )
+        still_frozen = self.make_membership(
+            plan,
+            "d@fitness.com",
+            today + timedelta(days=10),
+            status=Membership.Status.FROZEN,
+            frozen_from=today - timedelta(days=1),
+            frozen_to=today + timedelta(days=3),
+        )
+
+        summary = expire_memberships(today=today, chunk_size=2)
+
+        assert summary == {"expired": 1, "unfrozen": 1, "chunks": 2}
+        for membership in (finished, running, thawed, still_frozen):
+            membership.refresh_from_db()
+        assert finished.status == Membership.Status.EXPIRED
+        assert running.status == Membership.Status.ACTIVE
+        assert thawed.status == Membership.Status.ACTIVE
+        assert thawed.frozen_to is None
+        assert still_frozen.status == Membership.Status.FROZEN
+
+    def test_sweep_is_idempotent(self, plan):
+        self.make_membership(plan, "a@fitness.com", date.today() - timedelta(days=1))
+
+        assert expire_memberships()["expired"] == 1
+        assert expire_memberships() == {"expired": 0, "unfrozen": 0, "chunks": 0}
+
+
+@pytest.mark.django_db
+class TestMembershipListQueryCount:
+    @pytest.fixture(params=[10, 1000])
+    def memberships(self, request):
+        plan = MembershipPlan.objects.create(
+            name="Standard", code="standard", duration_days=30, price=100.00
+        )
+        users = User.objects.bulk_create(
+            User(email=f"member{i}@fitness.com") for i in range(request.param)
+        )
+        return Membership.objects.bulk_create(
+            Membership(
+                member=user,
+                plan=plan,
+                start_date=date.today(),
+                end_date=date.today() + timedelta(days=30),
+                price_at_purchase=plan.price,
+            )
+            for user in users
+        )
+
+    def test_staff_list(self, memberships, django_assert_num_queries):
+        staff = User.objects.create_user(
+            email="staff@fitness.com", password="password", is_staff=True
+        )
+        client = APIClient()
+        client.force_authenticate(user=staff)
+
+        with django_assert_num_queries(2):
+            response = client.get(reverse("membership-list"))
+
+        assert response.data["count"] == len(memberships)
+
+    def test_member_list(self, memberships, django_assert_num_queries):
+        client = APIClient()
+        client.force_authenticate(user=memberships[0].member)
+
+        with django_assert_num_queries(2):
+            response = client.get(reverse("membership-list"))
+
+        assert response.data["results"][0]["plan"]["name"] == "Standard"
+
+    def test_staff_keyset_pages(self, memberships, django_assert_num_queries):
+        staff = User.objects.create_user(
+            email="staff@fitness.com", password="password", is_staff=True
+        )
+        client = APIClient()
+        client.force_authenticate(user=staff)
+
+        ids = []
+        url = reverse("membership-list") + "?cursor="
+        for _ in range(3):
+            with django_assert_num_queries(1):
+                response = client.get(url)
+            ids += [row["id"] for row in response.data["results"]]
+            url = response.data["next"]
+            if url is None:
+                break
+
+        assert ids == [m.id for m in memberships[: len(ids)]]
+
+    def test_staff_export(self, memberships):
+        staff = User.objects.create_user(
+            email="staff@fitness.com", password="password", is_staff=True
+        )
+        client = APIClient()
+        client.force_authenticate(user=staff)
+
+        response = client.get(reverse("membership-export") + "?format=csv&status=ACTIVE")
+
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        assert len(lines) == len(memberships) + 1
+        assert ",Standard,ACTIVE," in lines[1]
+
+
+@pytest.mark.django_db
+class TestCurrentMembershipPointer:
+    def pay(self, user, plan):
+        payment = Payment.objects.create(
+            user=user,
+            membership_id=plan.id,
+            money_to_pay=plan.price,
+            status=Payment.StatusChoices.PAID,
+            type=Payment.TypeChoices.MEMBERSHIP_PURCHASE,
+        )
+        create_or_update_membership(payment)
+
+    def test_activation_sets_and_reuses_the_pointer(self, plan):
+        user = User.objects.create_user(email="a@fitness.com", password="password")
+
+        self.pay(user, plan)
+        self.pay(user, plan)
+
+        user.refresh_from_db()
+        membership = Membership.objects.get(member=user)
+        assert user.current_membership == membership
+        assert membership.end_date == date.today() + timedelta(days=60)
+
+    def test_sweep_releases_expired(self, plan):
+        user = User.objects.create_user(email="a@fitness.com", password="password")
+        self.pay(user, plan)
+        Membership.objects.update(end_date=date.today())
+
+        expire_memberships()
+
+        user.refresh_from_db()
+        assert user.current_membership is None
+
+    def test_renewal_after_expiry_starts_a_new_membership(self, plan):
+        user = User.objects.create_user(email="a@fitness.com", password="password")
+        self.pay(user, plan)
+        Membership.objects.update(end_date=date.today())
+        expire_memberships()
+
+        self.pay(user, plan)
+
+        user.refresh_from_db()
+        assert Membership.objects.filter(member=user).count() == 2
+        assert user.current_membership.status == Membership.Status.ACTIVE
+
+    def test_create_is_refused_by_the_pointer(self, plan, django_assert_num_queries):
+        user = User.objects.create_user(email="a@fitness.com", password="password")
+        self.pay(user, plan)
+        user.refresh_from_db()
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        # Only the plan lookup of the serializer field, no membership query.
+        with django_assert_num_queries(1):
+            response = client.post(reverse("membership-list"), {"plan": plan.id}, format="json")
+
+        assert response.status_code == 400
+
+    def test_create_sets_the_pointer_and_a_pending_payment(self, plan):
+        user = User.objects.create_user(email="a@fitness.com", password="password")
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        response = client.post(reverse("membership-list"), {"plan": plan.id}, format="json")
+
+        assert response.status_code == 201
+        user.refresh_from_db()
+        membership = Membership.objects.get(member=user)
+        assert user.current_membership == membership
+        assert membership.end_date == date.today() + timedelta(days=30)
+        payment = Payment.objects.get(user=user)
+        assert (payment.membership_id, payment.type, payment.status, payment.money_to_pay) == (
+            plan.id,
+            Payment.TypeChoices.MEMBERSHIP_PURCHASE,
+            Payment.StatusChoices.PENDING,
+            plan.price,
+        )
+
+    def test_rebuild_repairs_drift(self, plan, capsys):
+        users = User.objects.bulk_create(User(email=f"m{i}@fitness.com") for i in range(3))
+        memberships = Membership.objects.bulk_create(
+            Membership(
+                member=user,
+                plan=plan,
+                start_date=date.today(),
+                end_date=date.today() + timedelta(days=30),
+                price_at_purchase=plan.price,
+            )
+            for user in users
+        )
+        User.objects.filter(pk=users[0].pk).update(current_membership=memberships[0])
+
+        with pytest.raises(CommandError, match="2 pointers out of date"):
+            call_command("rebuild_current_memberships", "--check")
+        assert "3 users checked, 2 pointers out of date, 0 fixed" in capsys.readouterr().out
+
+        call_command("rebuild_current_memberships", "--chunk-size", "2")
+
+        assert {u.pk: u.current_membership_id for u in User.objects.all()} == {
+            m.member_id: m.pk for m in memberships
+        }
+
+
+@pytest.mark.django_db
+class TestAccessCheck:
+    @pytest.fixture
+    def scanner(self, settings):
+        settings.ACCESS_CHECK_API_KEYS = ["door-1"]
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Bearer door-1")
+        return client
+
+    @pytest.fixture
+    def members(self):
+        plan = MembershipPlan.objects.create(
+            name="Standard", code="standard", duration_days=30, price=100.00
+        )
+        today = date.today()
+        users = User.objects.bulk_create(
+            User(email=f"m{i}@fitness.com", access_card=f"card-{i}") for i in range(3)
+        )
+        active, frozen, expired = Membership.objects.bulk_create(
+            [
+                Membership(
+                    member=users[0],
+                    plan=plan,
+                    start_date=today,
+                    end_date=today + timedelta(days=30),
+                    price_at_purchase=plan.price,
+                ),
+                Membership(
+                    member=users[1],
+                    plan=plan,
+                    start_date=today,
+                    end_date=today + timedelta(days=30),
+                    price_at_purchase=plan.price,
+                    status=Membership.Status.FROZEN,
+                    frozen_from=today,
+                    frozen_to=today + timedelta(days=7),
+                ),
+                Membership(
+                    member=users[2],
+                    plan=plan,
+                    start_date=today - timedelta(days=30),
+                    end_date=today,
+                    price_at_purchase=plan.price,
+                ),
+            ]
+        )
+        set_current_memberships([active, frozen, expired])
+        return users
+
+    def test_single_checks(self, scanner, members):
+        url = reverse("access-check")
+
+        assert scanner.get(url, {"member": members[0].id}).json()["status"] == "ACTIVE"
+        assert scanner.get(url, {"card": "card-1"}).json() == {
+            "card": "card-1",
+            "member": members[1].id,
+            "status": "FROZEN",
+            "valid_until": str(date.today() + timedelta(days=30)),
+        }
+        assert scanner.get(url, {"card": "card-2"}).json()["status"] == "EXPIRED"
+        assert scanner.get(url, {"card": "nope"}).json()["status"] == "UNKNOWN"
+        assert scanner.get(url).status_code == 400
+
+    def test_batch_is_served_from_cache(self, scanner, members, django_assert_num_queries):
+        payload = {"members": [user.id for user in members] + [0], "cards": ["card-0", "nope"]}
+        url = reverse("access-check")
+
+        with django_assert_num_queries(2):
+            first = scanner.post(url, payload, format="json").json()["results"]
+        with django_assert_num_queries(0):
+            second = scanner.post(url, payload, format="json").json()["results"]
+
+        assert first == second
+        assert [row["status"] for row in first] == [
+            "ACTIVE",
+            "FROZEN",
+            "EXPIRED",
+            "UNKNOWN",
+            "ACTIVE",
+            "UNKNOWN",
+        ]
+
+    def test_membership_change_invalidates(self, scanner, members):
+        url = reverse("access-check")
+        assert scanner.get(url, {"card": "card-0"}).json()["status"] == "ACTIVE"
+
+        membership = Membership.objects.get(member=members[0])
+        membership.frozen_from = date.today()
+        membership.frozen_to = date.today() + timedelta(days=7)
+        membership.status = Membership.Status.FROZEN
+        membership.save()
+
+        assert scanner.get(url, {"card": "card-0"}).json()["status"] == "FROZEN"
+
+    def test_moved_card_is_not_served_stale(self, scanner, members):
+        url = reverse("access-check")
+        assert scanner.get(url, {"card": "card-0"}).json()["member"] == members[0].id
+
+        members[0].access_card = "card-new"
+        members[0].save()
+
+        assert scanner.get(url, {"card": "card-0"}).json()["status"] == "UNKNOWN"
+        assert scanner.get(url, {"card": "card-new"}).json()["member"] == members[0].id
+
+    def test_batch_limit(self, scanner, settings):
+        settings.ACCESS_CHECK_MAX_BATCH = 2
+
+        response = scanner.post(reverse("access-check"), {"members": [1, 2, 3]}, format="json")
+
+        assert response.status_code == 400
+
+    def test_members_and_bad_keys_are_refused(self, settings, members):
+        settings.ACCESS_CHECK_API_KEYS = ["door-1"]
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Bearer door-2")
+        assert client.get(reverse("access-check"), {"member": 1}).status_code == 401
+
+        client = APIClient()
+        client.force_authenticate(user=members[0])
+        assert client.get(reverse("access-check"), {"member": 1}).status_code == 403
+
+
+@pytest.mark.django_db
+class TestBulkOperations:
+    @pytest.fixture
+    def plans(self):
+        return (
+            MembershipPlan.objects.create(
+                name="Standard", code="standard", duration_days=30, price=100
+            ),
+            MembershipPlan.objects.create(
+                name="Premium", code="premium", duration_days=90, price=250
+            ),
+        )
+
+    @pytest.fixture
+    def memberships(self, plans):
+        users = User.objects.bulk_create(User(email=f"m{i}@fitness.com") for i in range(5))
+        return Membership.objects.bulk_create(
+            Membership(
+                member=user,
+                plan=plans[0],
+                start_date=date.today(),
+                end_date=date.today() + timedelta(days=30),
+                price_at_purchase=plans[0].price,
+            )
+            for user in users
+        )
+
+    @pytest.mark.usefixtures("memberships")
+    def test_freeze_then_resume_by_filter(self, staff_client):
+        start = date.today() + timedelta(days=1)
+        freeze = {
+            "operation": "freeze",
+            "filter": {"status": "ACTIVE"},
+            "frozen_from": start.isoformat(),
+            "frozen_to": (start + timedelta(days=7)).isoformat(),
+        }
+
+        response = staff_client.post(reverse("membership-bulk"), freeze, format="json")
+
+        assert response.data == {
+            "operation": "freeze",
+            "matched": 5,
+            "updated": 5,
+            "payments": 0,
+            "chunks": 1,
+        }
+        assert set(Membership.objects.values_list("status", "end_date")) == {
+            (Membership.Status.FROZEN, date.today() + timedelta(days=37))
+        }
+
+        response = staff_client.post(
+            reverse("membership-bulk"), {"operation": "resume", "all": True}, format="json"
+        )
+
+        assert response.data["updated"] == 5
+        assert not Membership.objects.exclude(status=Membership.Status.ACTIVE).exists()
+
+    def test_extend_by_ids_in_few_queries(
+        self, staff_client, memberships, django_assert_max_num_queries
+    ):
+        ids = [membership.id for membership in memberships[:3]]
+
+        with django_assert_max_num_queries(8):
+            response = staff_client.post(
+                reverse("membership-bulk"),
+                {"operation": "extend", "ids": ids, "days": 10},
+                format="json",
+            )
+
+        assert response.data["updated"] == 3
+        assert Membership.objects.filter(end_date=date.today() + timedelta(days=40)).count() == 3
+
+    @pytest.mark.usefixtures("memberships")
+    def test_upgrade_creates_fee_payments(self, staff_client, plans):
+        response = staff_client.post(
+            reverse("membership-bulk"),
+            {"operation": "upgrade", "filter": {"status": "ACTIVE"}, "plan_id": plans[1].id},
+            format="json",
+        )
+
+        assert response.data["payments"] == 5
+        assert set(Payment.objects.values_list("type", "money_to_pay", "status")) == {
+            (Payment.TypeChoices.UPGRADE_FEE, 150, Payment.StatusChoices.PENDING)
+        }
+        assert set(Membership.objects.values_list("plan_id", "end_date")) == {
+            (plans[1].id, date.today() + timedelta(days=90))
+        }
+
+    @pytest.mark.usefixtures("memberships")
+    def test_large_selection_becomes_a_job(self, staff_client):
+        with (
+            patch("apps.membership.views.BULK_SYNC_LIMIT", 2),
+            patch("apps.membership.views.bulk_membership_task.delay") as delay,
+        ):
+            delay.return_value.id = "job-1"
+            response = staff_client.post(
+                reverse("membership-bulk"),
+                {"operation": "extend", "all": True, "days": 1},
+                format="json",
+            )
+
+        assert response.status_code == 202
+        assert response.data["matched"] == 5
+        assert response.data["status_url"].endswith("/memberships/bulk/job-1/")
+        assert delay.call_args.args[0]["operation"] == "extend"
+
+    def test_chunks_report_progress(self, memberships):
+        reports = []
+
+        summary = run_bulk_operation(
+            {"operation": "extend", "ids": [m.id for m in memberships], "days": 1},
+            chunk_size=2,
+            progress=lambda so_far: reports.append(dict(so_far)),
+        )
+
+        assert summary["chunks"] == 3
+        assert [report["updated"] for report in reports] == [2, 4, 5]
+
+    @pytest.mark.usefixtures("memberships")
+    def test_job_runs_in_chunks(self):
+        spec = {"operation": "extend", "all": True, "days": 3}
+
+        with patch("apps.membership.tasks.BULK_CHUNK_SIZE", 2):
+            summary = bulk_membership_task.apply(args=[spec]).get()
+
+        assert summary == {
+            "operation": "extend",
+            "matched": 5,
+            "updated": 5,
+            "payments": 0,
+            "chunks": 3,
+        }
+
+    def test_job_status(self, staff_client):
+        remember_bulk_job("job-1")
+        with patch("apps.membership.views.AsyncResult") as result:
+            result.return_value.state = "PROGRESS"
+            result.return_value.info = {"updated": 2}
+            response = staff_client.get(reverse("membership-bulk-status", args=["job-1"]))
+
+        assert response.data == {"job_id": "job-1", "state": "PROGRESS", "progress": {"updated": 2}}
+
+    def test_status_of_other_tasks_is_not_found(self, staff_client):
+        with patch("apps.membership.views.AsyncResult") as result:
+            response = staff_client.get(reverse("membership-bulk-status", args=["other-task"]))
+
+        assert response.status_code == 404
+        result.assert_not_called()
+
+    def test_validation_and_permissions(self, staff_client, memberships):
+        url = reverse("membership-bulk")
+        assert (
+            staff_client.post(url, {"operation": "extend", "ids": [1]}, format="json").status_code
+            == 400
+        )
+        for selection in (
+            {"filter": {}},
+            {"filter": {"bogus": 1}},
+            {"all": False},
+            {"ids": [1], "all": True},
+        ):
+            response = staff_client.post(url, {"operation": "resume", **selection}, format="json")
+            assert response.status_code == 400, selection
+        assert (
+            staff_client.post(
+                url, {"operation": "resume", "filter": {"status": "BOGUS"}}, format="json"
+            ).status_code
+            == 400
+        )
+
+        client = APIClient()
+        client.force_authenticate(user=memberships[0].member)
+        assert (
+            client.post(url, {"operation": "resume", "all": True}, format="json").status_code == 403
+        )
+
+
+@pytest.mark.django_db
+class TestFacilityClosures:
+    def test_shift_is_the_overlap(self, plan):
+        d = date(2026, 3, 1)
+        closure = FacilityClosure.objects.create(starts_on=d, ends_on=d + timedelta(days=9))
+        covering = make_membership(plan, d - timedelta(days=5), d + timedelta(days=25))
+        ends_inside = make_membership(plan, d - timedelta(days=20), d + timedelta(days=4))
+        starts_inside = make_membership(plan, d + timedelta(days=6), d + timedelta(days=36))
+        before = make_membership(plan, d - timedelta(days=30), d)
+        frozen = make_membership(
+            plan,
+            d - timedelta(days=5),
+            d + timedelta(days=30),
+            status=Membership.Status.FROZEN,
+            frozen_from=d + timedelta(days=7),
+            frozen_to=d + timedelta(days=12),
+        )
+        expired = make_membership(
+            plan, d - timedelta(days=5), d + timedelta(days=25), status=Membership.Status.EXPIRED
+        )
+
+        summary = apply_closure(closure, chunk_size=2)
+
+        shifts = {}
+        for membership in (covering, ends_inside, starts_inside, before, frozen, expired):
+            old_end = membership.end_date
+            membership.refresh_from_db()
+            shifts[membership.pk] = (membership.end_date - old_end).days
+        assert [
+            shifts[m.pk] for m in (covering, ends_inside, starts_inside, before, frozen, expired)
+        ] == [10, 4, 4, 0, 7, 0]
+        assert summary["extended"] == 4
+        closure.refresh_from_db()
+        assert closure.applied_at is not None
+
+    def test_rerun_after_a_crash_does_not_extend_twice(self, plan):
+        d = date(2026, 3, 1)
+        closure = FacilityClosure.objects.create(starts_on=d, ends_on=d + timedelta(days=6))
+        memberships = [make_membership(plan, d, d + timedelta(days=30)) for _ in range(4)]
+        FacilityClosure.objects.filter(pk=closure.pk).update(applied_through_id=memberships[1].pk)
+        closure.refresh_from_db()
+
+        apply_closure(closure, chunk_size=1)
+        apply_closure(closure, chunk_size=1)
+
+        assert [m.end_date for m in Membership.objects.order_by("id")] == [
+            d + timedelta(days=30),
+            d + timedelta(days=30),
+            d + timedelta(days=37),
+            d + timedelta(days=37),
+        ]
+
+    def test_freezes_do_not_add_applied_closure_days_again(self, plan):
+        today = date.today()
+        closure = FacilityClosure.objects.create(starts_on=today, ends_on=today + timedelta(days=9))
+        single, bulk = (
+            make_membership(plan, today - timedelta(days=5), today + timedelta(days=25))
+            for _ in range(2)
+        )
+        apply_closure(closure)
+        freeze = {
+            "frozen_from": (today + timedelta(days=5)).isoformat(),
+            "frozen_to": (today + timedelta(days=15)).isoformat(),
+        }
+
+        client = APIClient()
+        client.force_authenticate(user=single.member)
+        response = client.post(
+            reverse("membership-freeze", args=[single.pk]), freeze, format="json"
+        )
+        run_bulk_operation({"operation": "freeze", "ids": [bulk.pk], **freeze})
+
+        # 10 closed days, then a 10-day freeze of which 5 days were already closed.
+        assert response.status_code == 200
+        assert [m.end_date for m in Membership.objects.order_by("id")] == [
+            today + timedelta(days=40)
+        ] * 2
+
+    def test_only_begun_closures_are_applied(self, plan):
+        today = date.today()
+        make_membership(plan, today - timedelta(days=5), today + timedelta(days=25))
+        FacilityClosure.objects.create(starts_on=today, ends_on=today + timedelta(days=1))
+        FacilityClosure.objects.create(
+            starts_on=today + timedelta(days=3), ends_on=today + timedelta(days=3)
+        )
+
+        summaries = apply_facility_closures(today=today)
+
+        assert len(summaries) == 1
+        assert Membership.objects.get().end_date == today + timedelta(days=27)
+        assert FacilityClosure.objects.filter(applied_at__isnull=True).count() == 1
+
+
+@pytest.mark.django_db
+class TestAutoRenewal:
+    @pytest.fixture
+    def stripe_backend(self):
+        backend = FakeStripe(declined={"pm_declined"})
+        stripe_client = StripeClient(
+            "sk_test", http_client=FakeStripeHTTPClient(backend), max_network_retries=0
+        )
+        with patch("apps.payments.stripe_helper.get_stripe_client", return_value=stripe_client):
+            yield backend
+
+    def make(self, plan, end_date, payment_method="pm_card", auto_renew=True):
+        membership = make_membership(
+            plan,
+            end_date - timedelta(days=30),
+            end_date,
+            price_at_purchase=50,
+            auto_renew=auto_renew,
+        )
+        if payment_method:
+            StripeCustomer.objects.create(
+                user_id=membership.member_id,
+                stripe_customer_id=f"cus_{membership.member_id}",
+                default_payment_method=payment_method,
+            )
+        return membership
+
+    def test_charges_saved_cards_and_extends(self, plan, stripe_backend):
+        today = date.today()
+        tomorrow = today + timedelta(days=1)
+        renewed = self.make(plan, tomorrow)
+        declined = self.make(plan, tomorrow, payment_method="pm_declined")
+        no_card = self.make(plan, tomorrow, payment_method=None)
+        manual = self.make(plan, tomorrow, auto_renew=False)
+        later = self.make(plan, today + timedelta(days=5))
+
+        summary = renew_memberships(today=today, batch_size=2)
+
+        assert summary == {
+            "selected": 3,
+            "renewed": 1,
+            "failed": 1,
+            "retried": 0,
+            "skipped": 1,
+            "batches": 2,
+            "stopped_early": False,
+        }
+        ends = {m.pk: m.end_date for m in Membership.objects.all()}
+        assert ends[renewed.pk] == tomorrow + timedelta(days=30)
+        assert [ends[m.pk] for m in (declined, no_card, manual)] == [tomorrow] * 3
+        assert ends[later.pk] == today + timedelta(days=5)
+        assert Membership.objects.get(pk=renewed.pk).price_at_purchase == plan.price
+
+        payments = {p.user_id: p for p in Payment.objects.filter(type=Payment.TypeChoices.RENEWAL)}
+        assert payments[renewed.member_id].status == Payment.StatusChoices.PAID
+        assert payments[declined.member_id].status == Payment.StatusChoices.FAILED
+        assert payments[declined.member_id].error_message.startswith("Card Error")
+        assert len(payments) == 2
+        intent = next(iter(stripe_backend.payment_intents.values()))
+        assert intent["amount"] == 10000
+        assert intent["metadata"] == {"payment_id": str(payments[renewed.member_id].pk)}
+
+    def test_rerun_does_not_charge_twice(self, plan, stripe_backend):
+        today = date.today()
+        membership = self.make(plan, today + timedelta(days=1))
+        Payment.objects.create(
+            user_id=membership.member_id,
+            membership_id=plan.id,
+            money_to_pay=plan.price,
+            type=Payment.TypeChoices.RENEWAL,
+            idempotency_key=f"renewal-{membership.pk}-{membership.end_date}",
+        )
+
+        renew_memberships(today=today)
+        renew_memberships(today=today)
+
+        assert len(stripe_backend.requests) == 1
+        assert Payment.objects.get().status == Payment.StatusChoices.PAID
+        assert Membership.objects.get().end_date == today + timedelta(days=31)
+
+    # 409: a run that overlaps this one is charging the same idempotency key right now.
+    @pytest.mark.parametrize("status", [503, 409])
+    def test_outage_leaves_the_payment_pending_for_the_next_run(self, plan, stripe_backend, status):
+        today = date.today()
+        membership = self.make(plan, today + timedelta(days=1))
+        stripe_backend.fail_with = status
+
+        summary = renew_memberships(today=today)
+
+        assert (summary["retried"], summary["failed"]) == (1, 0)
+        payment = Payment.objects.get()
+        assert payment.status == Payment.StatusChoices.PENDING
+        assert Membership.objects.get().end_date == membership.end_date
+
+        stripe_backend.fail_with = None
+        summary = renew_memberships(today=today)
+
+        assert (summary["renewed"], summary["skipped"]) == (1, 0)
+        payment.refresh_from_db()
+        assert payment.status == Payment.StatusChoices.PAID
+        assert Membership.objects.get().end_date == membership.end_date + timedelta(days=30)
+        assert Payment.objects.count() == 1
+
+    @pytest.mark.usefixtures("stripe_backend")
+    def test_time_budget_stops_before_the_next_batch(self, plan):
+        today = date.today()
+        for _ in range(3):
+            self.make(plan, today + timedelta(days=1))
+
+        summary = renew_memberships(today=today, batch_size=2, time_budget=0)
+
+        assert (summary["renewed"], summary["batches"], summary["stopped_early"]) == (2, 1, True)
+        assert renew_memberships(today=today)["renewed"] == 1
+
+    def test_busy_days_get_more_shards(self, plan, settings):
+        settings.RENEWAL_SHARDS = 2
+        settings.RENEWAL_SHARD_CAPACITY = 2
+        for _ in range(5):
+            self.make(plan, date.today() + timedelta(days=1))
+
+        with patch("apps.membership.tasks.renew_memberships_task.delay") as delay:
+            shards = schedule_renewals_task()
+
+        assert shards == 3
+        assert [call.args[:2] for call in delay.call_args_list] == [(0, 3), (1, 3), (2, 3)]
+
+    @pytest.mark.usefixtures("stripe_backend")
+    def test_shards_split_the_day(self, plan):
+        today = date.today()
+        memberships = [self.make(plan, today + timedelta(days=1)) for _ in range(5)]
+
+        first = renew_memberships(today=today, shard=0, shards=2)
+        second = renew_memberships(today=today, shard=1, shards=2)
+
+        assert first["renewed"] + second["renewed"] == 5
+        assert first["renewed"] == sum(1 for m in memberships if m.member_id % 2 == 0)
+        assert Payment.objects.filter(status=Payment.StatusChoices.PAID).count() == 5
+
+
+@pytest.mark.django_db
+class TestMembershipAdmin:
+    @pytest.mark.parametrize("rows", [10, 1000])
+    def test_changelist_query_count(self, rows, client, django_assert_num_queries):
+        plan = MembershipPlan.objects.create(
+            name="Standard", code="standard", duration_days=30, price=100.00
+        )
+        users = User.objects.bulk_create(User(email=f"member{i}@fitness.com") for i in range(rows))
+        Membership.objects.bulk_create(
+            Membership(
+                member=user,
+                plan=plan,
+                start_date=date.today(),
+                end_date=date.today() + timedelta(days=30),
+                price_at_purchase=plan.price,
+            )
+            for user in users
+        )
+        client.force_login(User.objects.create_superuser(email="staff@fitness.com", password="pw"))
+
+        with django_assert_num_queries(7):
+            response = client.get(reverse("admin:membership_membership_changelist"))
+
+        assert response.status_code == 200
+        assert response.context["cl"].result_count == rows
+
+    def test_search_by_email(self, client):
+        plan = MembershipPlan.objects.create(
+            name="Standard", code="standard", duration_days=30, price=100.00
+        )
+        user = User.objects.create(email="Member@fitness.com")
+        Membership.objects.create(
+            member=user,
+            plan=plan,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30),
+            price_at_purchase=plan.price,
+        )
+        client.force_login(User.objects.create_superuser(email="staff@fitness.com", password="pw"))
+
+        response = client.get(
+            reverse("admin:membership_membership_changelist"), {"q": "member@FITNESS.com"}
+        )
+
+        assert response.context["cl"].result_count == 1
@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework import routers
 
-from apps.membership.views import MembershipViewSet
+from apps.membership.views import AccessCheckView, MembershipViewSet
 
 router = routers.DefaultRouter()
 router.register("memberships", MembershipViewSet, basename="membership")
 
 urlpatterns = [
+    path("access/", AccessCheckView.as_view(), name="access-check"),
     path("", include(router.urls)),
 ]
@@ -1,34 +1,65 @@
 from datetime import date, timedelta
 
+from celery.result import AsyncResult
+from django.conf import settings
 from django.db import transaction
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from apps.bot.notifications import MEMBERSHIP_FROZEN, notify
+from apps.membership.access import access_cache, access_status
+from apps.membership.bulk import (
+    BULK_SYNC_LIMIT,
+    bulk_queryset,
+    is_bulk_job,
+    remember_bulk_job,
+    run_bulk_operation,
+)
+from apps.membership.closures import applied_closure_days
+from apps.membership.current import set_current_memberships
+from apps.membership.exports import MEMBERSHIP_EXPORT_FIELDS, membership_export_queryset
 from apps.membership.filters import MembershipFilter
 from apps.membership.models import Membership
+from apps.membership.permissions import AccessKeyAuthentication, HasAccessKey
 from apps.membership.serializers import (
+    BulkMembershipSerializer,
     FreezeSerializer,
     MembershipCreateSerializer,
     MembershipReadSerializer,
 )
+from apps.membership.tasks import bulk_membership_task
 from apps.payments.models import Payment
-from apps.plans.models import MembershipPlan
+from apps.plans.cache import plan_catalog
+from apps.plans.permissions import IsAuthenticatedStaff
+from core.export import EXPORT_RENDERERS, streaming_export_response
+from core.pagination import KeysetPagination
+
+
+class MembershipPagination(KeysetPagination):
+    keyset_ordering = ("end_date", "id")
 
 
 class MembershipViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
+    pagination_class = MembershipPagination
 
     filter_backends = [DjangoFilterBackend]
     filterset_class = MembershipFilter
 
     def get_queryset(self):
         user = self.request.user
+        queryset = Membership.objects.select_related("plan")
         if user.is_staff:
-            return Membership.objects.all()
-        return Membership.objects.filter(member=user)
+            return queryset.order_by("id")
+        return queryset.filter(member=user).order_by("id")
 
     def get_serializer_class(self):
         if self.action in ["list", "retrieve"]:
@@ -48,14 +79,80 @@ class MembershipViewSet(viewsets.ModelViewSet):
                 price_at_purchase=plan.price,
                 status=Membership.Status.ACTIVE,
             )
+            set_current_memberships([membership])
+            self.request.user.current_membership = membership
 
             Payment.objects.create(
-                membership=membership,
-                payment_type=Payment.Type.MEMBERSHIP_PURCHASE,
+                user=self.request.user,
+                membership_id=plan.id,
+                type=Payment.TypeChoices.MEMBERSHIP_PURCHASE,
                 money_to_pay=plan.price,
-                status=Payment.Status.PENDING,
+                status=Payment.StatusChoices.PENDING,
+            )
+
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=[IsAuthenticatedStaff],
+        renderer_classes=EXPORT_RENDERERS,
+    )
+    def export(self, request):
+        """Stream all memberships matching the filters as CSV or NDJSON."""
+        return streaming_export_response(
+            membership_export_queryset(request.query_params),
+            MEMBERSHIP_EXPORT_FIELDS,
+            request.accepted_renderer,
+            "memberships",
+        )
+
+    @action(detail=False, methods=["post"], permission_classes=[IsAuthenticatedStaff])
+    def bulk(self, request):
+        """
+        Freeze, resume, extend or upgrade many memberships at once, selected by ``ids``,
+        by a non-empty ``filter`` (the list filters) or by ``"all": true``. Up to BULK_SYNC_LIMIT memberships are
+        changed in one transaction and the summary is returned; larger selections are
+        handed to a Celery job whose progress is at ``bulk/<job_id>/``.
+        """
+        serializer = BulkMembershipSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        spec = serializer.data
+
+        matched = bulk_queryset(spec).count()
+        if matched > BULK_SYNC_LIMIT:
+            job = bulk_membership_task.delay(spec)
+            remember_bulk_job(job.id)
+            return Response(
+                {
+                    "job_id": job.id,
+                    "matched": matched,
+                    "status_url": reverse("membership-bulk-status", args=[job.id], request=request),
+                },
+                status=202,
             )
 
+        with transaction.atomic():
+            summary = run_bulk_operation(spec)
+        return Response(summary)
+
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"bulk/(?P<job_id>[\w-]+)",
+        permission_classes=[IsAuthenticatedStaff],
+    )
+    def bulk_status(self, _request, job_id=None):
+        if not is_bulk_job(job_id):
+            return Response({"error": "Bulk job not found."}, status=404)
+        job = AsyncResult(job_id)
+        data = {"job_id": job_id, "state": job.state}
+        if job.state == "PROGRESS":
+            data["progress"] = job.info
+        elif job.successful():
+            data["summary"] = job.result
+        elif job.failed():
+            data["error"] = str(job.result)
+        return Response(data)
+
     @action(detail=True, methods=["post"])
     def freeze(self, request, pk=None):
         membership = self.get_object()
@@ -70,8 +167,28 @@ class MembershipViewSet(viewsets.ModelViewSet):
 
             freeze_days = (membership.frozen_to - membership.frozen_from).days
             membership.end_date += timedelta(days=freeze_days)
+            credited = applied_closure_days(membership.frozen_from, membership.frozen_to)
+            if credited is not None:
+                membership.end_date -= (
+                    Membership.objects.filter(pk=membership.pk)
+                    .annotate(credited=credited)
+                    .values_list("credited", flat=True)
+                    .get()
+                )
 
             membership.save()
+            notify(
+                MEMBERSHIP_FROZEN,
+                [
+                    (
+                        membership.member_id,
+                        {
+                            "frozen_from": membership.frozen_from,
+                            "frozen_to": membership.frozen_to,
+                        },
+                    )
+                ],
+            )
             return Response(MembershipReadSerializer(membership).data)
         return Response(serializer.errors, status=400)
 
@@ -90,11 +207,8 @@ class MembershipViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["post"])
     def upgrade(self, request, pk=None):
         membership = self.get_object()
-        new_plan_id = request.query_params.get("plan_id")
-
-        try:
-            new_plan = MembershipPlan.objects.get(id=new_plan_id)
-        except MembershipPlan.DoesNotExist:
+        new_plan = plan_catalog.get(request.query_params.get("plan_id"))
+        if new_plan is None:
             return Response({"error": "Plan not found."}, status=404)
 
         if new_plan.price <= membership.price_at_purchase:
@@ -111,10 +225,79 @@ class MembershipViewSet(viewsets.ModelViewSet):
             membership.save()
 
             Payment.objects.create(
-                membership=membership,
-                payment_type=Payment.Type.UPGRADE_FEE,
+                user_id=membership.member_id,
+                membership_id=new_plan.id,
+                type=Payment.TypeChoices.UPGRADE_FEE,
                 money_to_pay=diff_price,
-                status=Payment.Status.PENDING,
+                status=Payment.StatusChoices.PENDING,
             )
 
         return Response(MembershipReadSerializer(membership).data)
+
+
+class AccessCheckView(APIView):
+    """
+    Door and turnstile checks: may this member come in right now?
+
+    GET ``?member=<id>`` or ``?card=<token>`` checks one, POST
+    ``{"members": [...], "cards": [...]}`` up to ACCESS_CHECK_MAX_BATCH at once. Answers
+    come from the access cache, not the membership endpoints, and each result carries
+    ACTIVE, FROZEN, EXPIRED or UNKNOWN. Open to scanners with an ACCESS_CHECK_API_KEYS
+    key and to staff.
+    """
+
+    authentication_classes = [AccessKeyAuthentication, JWTAuthentication]
+    permission_classes = [HasAccessKey | IsAuthenticatedStaff]
+    renderer_classes = [JSONRenderer]
+    parser_classes = [JSONParser]
+
+    def get(self, request):
+        member = request.query_params.get("member")
+        card = request.query_params.get("card")
+        if bool(member) == bool(card):
+            return Response({"error": "Pass either member or card."}, status=400)
+        return self.check([member] if member else [], [card] if card else [], single=True)
+
+    def post(self, request):
+        data = request.data if isinstance(request.data, dict) else {}
+        members = data.get("members") or []
+        cards = data.get("cards") or []
+        if not isinstance(members, list) or not isinstance(cards, list):
+            return Response({"error": "members and cards must be lists."}, status=400)
+        if len(members) + len(cards) > settings.ACCESS_CHECK_MAX_BATCH:
+            return Response(
+                {"error": f"At most {settings.ACCESS_CHECK_MAX_BATCH} checks per request."},
+                status=400,
+            )
+        return self.check(members, cards)
+
+    def check(self, members, cards, single=False):
+        try:
+            members = [int(member) for member in members]
+        except (TypeError, ValueError):
+            return Response({"error": "Member ids must be integers."}, status=400)
+        if not all(isinstance(card, str) and card for card in cards):
+            return Response({"error": "Cards must be non-empty strings."}, status=400)
+
+        today = date.today()
+        member_entries = access_cache.members(members)
+        card_entries = access_cache.cards(cards)
+        results = [self.result(member_entries[member], today, member=member) for member in members]
+        results += [
+            self.result(
+                card_entries[card], today, card=card, member=card_entries[card].get("member")
+            )
+            for card in cards
+        ]
+
+        if single:
+            return Response(results[0])
+        return Response({"results": results})
+
+    @staticmethod
+    def result(entry, today, **lookup):
+        return {
+            **lookup,
+            "status": access_status(entry, today),
+            "valid_until": entry.get("end_date"),
+        }
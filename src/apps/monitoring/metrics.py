@@ -0,0 +1,235 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name: (type, help, buckets)
+METRICS = {
+    "http_requests_total": ("counter", "Requests by view, method and status.", None),
+    "http_request_duration_seconds": ("histogram", "Wall time per request.", DURATION_BUCKETS),
+    "http_request_db_queries": ("histogram", "Database queries per request.", QUERY_BUCKETS),
+    "http_request_db_duration_seconds": (
+        "histogram",
+        "Database time per request.",
+        DURATION_BUCKETS,
+    ),
+    "http_request_stripe_duration_seconds": (
+        "histogram",
+        "Time spent waiting on Stripe per request.",
+        DURATION_BUCKETS,
+    ),
+    "http_response_size_bytes": ("histogram", "Response body size.", SIZE_BUCKETS),
+    "stripe_call_duration_seconds": (
+        "histogram",
+        "Duration of single Stripe API calls.",
+        DURATION_BUCKETS,
+    ),
+}
+
+SHARED_PROCESSES_KEY = "metrics:processes"
+SHARED_SNAPSHOT_KEY = "metrics:snapshot:{process}"
+
+
+class RequestMetrics:
+    """Figures collected while one request is handled."""
+
+    __slots__ = ("queries", "db_time", "stripe_time", "statements")
+
+    MAX_STATEMENTS = 100
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.stripe_time = 0.0
+        self.statements = []
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += duration
+            if len(self.statements) < self.MAX_STATEMENTS:
+                self.statements.append((duration, sql))
+
+
+current_request = ContextVar("current_request_metrics", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper on every database connection (see apps.monitoring.signals). Queries
+    are charged to the request in ``current_request``; asgiref copies the context into
+    the threads that run an async view's ORM calls, so those are counted too.
+    """
+    metrics = current_request.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.db_wrapper(execute, sql, params, many, context)
+
+
+class MetricsRegistry:
+    """
+    In-process counters and histograms, keyed by metric name and label values.
+
+    Snapshots are plain dicts (JSON-safe) so they can be published to the shared cache
+    and merged across worker processes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._published_at = 0.0
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    "buckets": [0] * (len(buckets) + 1),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            series["buckets"][bisect_left(buckets, value)] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            snapshot = {}
+            for (name, labels), value in self._series.items():
+                if isinstance(value, dict):
+                    value = {**value, "buckets": list(value["buckets"])}
+                snapshot.setdefault(name, {})[json.dumps(labels)] = value
+            return snapshot
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self._published_at = 0.0
+
+    def publish_due(self) -> bool:
+        return time.monotonic() - self._published_at >= settings.METRICS_PUBLISH_INTERVAL
+
+    def publish(self, force=False):
+        """
+        Store this process' snapshot in the shared cache, at most every
+        METRICS_PUBLISH_INTERVAL seconds. The cache being down never breaks a request.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._published_at < settings.METRICS_PUBLISH_INTERVAL:
+                return
+            self._published_at = now
+
+        process = f"{socket.gethostname()}:{os.getpid()}"
+        try:
+            cache.set(
+                SHARED_SNAPSHOT_KEY.format(process=process),
+                self.snapshot(),
+                settings.METRICS_SHARED_TTL,
+            )
+            processes = set(cache.get(SHARED_PROCESSES_KEY) or ())
+            if process not in processes:
+                cache.set(SHARED_PROCESSES_KEY, sorted(processes | {process}), None)
+        except Exception as e:
+            logger.warning(f"Could not publish metrics: {str(e)}")
+
+
+registry = MetricsRegistry()
+
+
+def merge(snapshots) -> dict:
+    merged = {}
+    for snapshot in snapshots:
+        for name, series in snapshot.items():
+            target = merged.setdefault(name, {})
+            for labels, value in series.items():
+                if labels not in target:
+                    target[labels] = (
+                        {**value, "buckets": list(value["buckets"])}
+                        if isinstance(value, dict)
+                        else value
+                    )
+                elif isinstance(value, dict):
+                    current = target[labels]
+                    current["buckets"] = [
+                        a + b for a, b in zip(current["buckets"], value["buckets"], strict=True)
+                    ]
+                    current["sum"] += value["sum"]
+                    current["count"] += value["count"]
+                else:
+                    target[labels] += value
+    return merged
+
+
+def collect_shared() -> dict:
+    """Merged snapshots of all worker processes that published within METRICS_SHARED_TTL."""
+    processes = cache.get(SHARED_PROCESSES_KEY) or []
+    keys = {SHARED_SNAPSHOT_KEY.format(process=process): process for process in processes}
+    snapshots = cache.get_many(list(keys))
+    alive = sorted(keys[key] for key in snapshots)
+    if alive != sorted(processes):
+        cache.set(SHARED_PROCESSES_KEY, alive, None)
+    return merge(snapshots.values())
+
+
+def observe_stripe_call(operation, seconds):
+    registry.observe("stripe_call_duration_seconds", {"operation": operation}, seconds)
+    metrics = current_request.get()
+    if metrics is not None:
+        metrics.stripe_time += seconds
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels):
+    return ",".join(f'{key}="{value}"' for key, value in labels)
+
+
+def render_prometheus(snapshot) -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = snapshot.get(name)
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels_json, value in sorted(series.items()):
+            labels = [tuple(pair) for pair in json.loads(labels_json)]
+            if kind == "counter":
+                lines.append(f"{name}{{{_format_labels(labels)}}} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, "+Inf"), value["buckets"], strict=True):
+                cumulative += count
+                bucket_labels = _format_labels([*labels, ("le", bound)])
+                lines.append(f"{name}_bucket{{{bucket_labels}}} {cumulative}")
+            lines.append(f"{name}_sum{{{_format_labels(labels)}}} {_format_value(value['sum'])}")
+            lines.append(f"{name}_count{{{_format_labels(labels)}}} {value['count']}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,97 @@
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from apps.monitoring.metrics import RequestMetrics, current_request, registry
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetricsMiddleware:
+    """
+    Records wall time, database queries and time, Stripe time and response size per
+    view into the in-process registry, and publishes the registry to the shared cache
+    every few seconds.
+
+    Works sync and async, so async views are not pushed onto a thread by the middleware
+    chain. Queries are timed by the execute wrapper every connection gets (see
+    apps.monitoring.signals), so DEBUG is not needed and async ORM calls are counted as
+    well. Slow requests are logged with their slowest SQL statements, for a sample of
+    them only.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = current_request.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        duration = time.perf_counter() - started
+
+        self.record(request, response, metrics, duration)
+        registry.publish()
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = current_request.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        duration = time.perf_counter() - started
+
+        self.record(request, response, metrics, duration)
+        # Publishing talks to the cache; keep that off the event loop.
+        if registry.publish_due():
+            await sync_to_async(registry.publish)()
+        return response
+
+    def record(self, request, response, metrics, duration):
+        match = request.resolver_match
+        labels = {"view": match.view_name if match else "unmatched", "method": request.method}
+
+        registry.inc("http_requests_total", {**labels, "status": response.status_code})
+        registry.observe("http_request_duration_seconds", labels, duration)
+        registry.observe("http_request_db_queries", labels, metrics.queries)
+        registry.observe("http_request_db_duration_seconds", labels, metrics.db_time)
+        registry.observe("http_request_stripe_duration_seconds", labels, metrics.stripe_time)
+        if not response.streaming:
+            registry.observe("http_response_size_bytes", labels, len(response.content))
+
+        if (
+            duration >= settings.METRICS_SLOW_REQUEST_SECONDS
+            and random.random() < settings.METRICS_SLOW_REQUEST_SAMPLE_RATE
+        ):
+            slowest = sorted(metrics.statements, key=lambda statement: statement[0], reverse=True)[
+                :10
+            ]
+            statements = "\n".join(f"  {seconds * 1000:.1f} ms  {sql}" for seconds, sql in slowest)
+            logger.warning(
+                f"Slow request {request.method} {request.path} ({labels['view']}): {duration:.3f}s, "
+                f"{metrics.queries} queries in {metrics.db_time:.3f}s, "
+                f"Stripe {metrics.stripe_time:.3f}s. Slowest SQL:\n{statements}"
+            )
@@ -0,0 +1,13 @@
+from core.authentication import HasSettingToken, SettingTokenAuthentication
+
+
+class MetricsTokenAuthentication(SettingTokenAuthentication):
+    """Accepts ``Authorization: Bearer <METRICS_TOKEN>`` for Prometheus scrapers."""
+
+    setting = "METRICS_TOKEN"
+    auth_name = "metrics-token"
+    realm = "metrics"
+
+
+class HasMetricsToken(HasSettingToken):
+    authentication_class = MetricsTokenAuthentication
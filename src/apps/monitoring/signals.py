@@ -0,0 +1,11 @@
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from apps.monitoring.metrics import record_query
+
+
+@receiver(connection_created)
+def install_query_recorder(connection, **_kwargs):
+    # Fires again on every reconnect of the same connection object.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
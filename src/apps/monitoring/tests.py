@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+
+import pytest
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.monitoring.metrics import (
+    RequestMetrics,
+    collect_shared,
+    current_request,
+    merge,
+    observe_stripe_call,
+    registry,
+    render_prometheus,
+)
+from apps.monitoring.middleware import RequestMetricsMiddleware
+from apps.plans.models import MembershipPlan
+
+User = get_user_model()
+
+PLANS_LIST = json.dumps([["method", "GET"], ["view", "plans-list"]])
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    registry.reset()
+    cache.clear()
+    yield
+    registry.reset()
+
+
+@pytest.mark.django_db
+class TestRequestMetrics:
+    def test_middleware_records_queries_duration_and_size(self, staff_client):
+        MembershipPlan.objects.create(name="Standard", duration_days=30, price=100.00)
+
+        response = staff_client.get(reverse("plans-list"))
+
+        snapshot = registry.snapshot()
+        status_labels = json.dumps([["method", "GET"], ["status", 200], ["view", "plans-list"]])
+        assert snapshot["http_requests_total"][status_labels] == 1
+        assert snapshot["http_request_db_queries"][PLANS_LIST]["sum"] >= 1
+        assert snapshot["http_request_duration_seconds"][PLANS_LIST]["count"] == 1
+        assert snapshot["http_response_size_bytes"][PLANS_LIST]["sum"] == len(response.content)
+
+    def test_stripe_time_is_added_to_the_running_request(self):
+        metrics = RequestMetrics()
+        token = current_request.set(metrics)
+        try:
+            observe_stripe_call("customers.create", 0.2)
+        finally:
+            current_request.reset(token)
+
+        assert metrics.stripe_time == 0.2
+        labels = json.dumps([["operation", "customers.create"]])
+        assert registry.snapshot()["stripe_call_duration_seconds"][labels]["count"] == 1
+
+    def test_slow_request_is_logged_with_its_sql(self, staff_client, settings, caplog):
+        settings.METRICS_SLOW_REQUEST_SECONDS = 0
+        settings.METRICS_SLOW_REQUEST_SAMPLE_RATE = 1
+
+        with caplog.at_level(logging.WARNING, logger="apps.monitoring.middleware"):
+            staff_client.get(reverse("plans-list"))
+
+        assert "Slow request GET /api/v1/plans/" in caplog.text
+        assert "SELECT" in caplog.text
+
+    def test_disabled(self, staff_client, settings):
+        settings.METRICS_ENABLED = False
+
+        staff_client.get(reverse("plans-list"))
+
+        assert registry.snapshot() == {}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_requests_stay_async_and_count_orm_queries():
+    async def view(_request):
+        await MembershipPlan.objects.acount()
+        return HttpResponse("ok")
+
+    middleware = RequestMetricsMiddleware(view)
+    response = asyncio.run(middleware(RequestFactory().get("/async/")))
+
+    assert iscoroutinefunction(middleware)
+    assert response.status_code == 200
+    labels = json.dumps([["method", "GET"], ["view", "unmatched"]])
+    assert registry.snapshot()["http_request_db_queries"][labels]["sum"] == 1
+
+
+@pytest.mark.django_db
+class TestMetricsEndpoint:
+    def test_staff_gets_prometheus_text(self, staff_client):
+        staff_client.get(reverse("plans-list"))
+
+        response = staff_client.get(reverse("monitoring:metrics"))
+
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/plain")
+        body = response.content.decode()
+        assert "# TYPE http_requests_total counter" in body
+        assert 'http_requests_total{method="GET",status="200",view="plans-list"} 1' in body
+        assert 'http_request_db_queries_bucket{method="GET",view="plans-list",le="+Inf"} 1' in body
+
+    def test_token_access(self, settings):
+        settings.METRICS_TOKEN = "scrape-me"
+        client = APIClient()
+
+        assert client.get(reverse("monitoring:metrics")).status_code == 401
+        client.credentials(HTTP_AUTHORIZATION="Bearer wrong")
+        assert client.get(reverse("monitoring:metrics")).status_code == 401
+        client.credentials(HTTP_AUTHORIZATION="Bearer scrape-me")
+        assert client.get(reverse("monitoring:metrics")).status_code == 200
+
+    def test_members_are_refused(self):
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create(email="member@fitness.com"))
+
+        assert client.get(reverse("monitoring:metrics")).status_code == 403
+
+    def test_snapshots_of_all_processes_are_merged(self, staff_client):
+        other = {"http_requests_total": {json.dumps([["view", "x"]]): 3}}
+        cache.set("metrics:snapshot:other:1", other)
+        cache.set("metrics:processes", ["other:1"])
+        registry.inc("http_requests_total", {"view": "x"}, 2)
+
+        response = staff_client.get(reverse("monitoring:metrics"), {"format": "json"})
+
+        assert response.json()["http_requests_total"][json.dumps([["view", "x"]])] == 5
+
+    def test_expired_processes_are_dropped(self):
+        cache.set("metrics:processes", ["gone:1"])
+
+        assert collect_shared() == {}
+        assert cache.get("metrics:processes") == []
+
+
+def test_merge_and_render_histograms():
+    labels = json.dumps([["view", "x"]])
+    first = {"http_request_db_queries": {labels: {"buckets": [1] + [0] * 9, "sum": 0, "count": 1}}}
+    second = {
+        "http_request_db_queries": {labels: {"buckets": [0, 0, 1] + [0] * 7, "sum": 2, "count": 1}}
+    }
+
+    merged = merge([first, second])
+
+    assert merged["http_request_db_queries"][labels]["count"] == 2
+    text = render_prometheus(merged)
+    assert 'http_request_db_queries_bucket{view="x",le="0"} 1' in text
+    assert 'http_request_db_queries_bucket{view="x",le="2"} 2' in text
+    assert 'http_request_db_queries_sum{view="x"} 2' in text
@@ -0,0 +1,40 @@
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from apps.monitoring.metrics import collect_shared, registry, render_prometheus
+from apps.monitoring.permissions import HasMetricsToken, MetricsTokenAuthentication
+from apps.plans.permissions import IsAuthenticatedStaff
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = "text/plain"
+    format = "prometheus"
+    charset = "utf-8"
+
+    def render(self, data, _accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get("response")
+        if response is not None and response.exception:
+            return JSONRenderer().render(data)
+        return render_prometheus(data).encode()
+
+
+class MetricsView(APIView):
+    """
+    Request metrics of all worker processes in Prometheus text format (?format=json for
+    the raw snapshot). ``?scope=process`` shows only the process answering. Open to
+    staff users and to scrapers sending the METRICS_TOKEN as a bearer token.
+    """
+
+    authentication_classes = [MetricsTokenAuthentication, JWTAuthentication, SessionAuthentication]
+    permission_classes = [HasMetricsToken | IsAuthenticatedStaff]
+    renderer_classes = [PrometheusRenderer, JSONRenderer]
+
+    def get(self, request):
+        if request.query_params.get("scope") == "process":
+            return Response(registry.snapshot())
+
+        registry.publish(force=True)
+        return Response(collect_shared())
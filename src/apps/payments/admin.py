@@ -1,9 +1,12 @@
 from django.contrib import admin
-from .models import Payment, StripeCustomer
+
+from core.admin import LargeTableAdminMixin, looks_like_email
+
+from .models import Payment, StripeCustomer, StripeEvent
 
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = (
         "id",
         "user",
@@ -13,14 +16,33 @@ class PaymentAdmin(admin.ModelAdmin):
         "created_at",
         )
 
-    list_filter = ("status", "type", "created_at")
+    list_filter = ("status", "type")
+    list_select_related = ("user",)
+    date_hierarchy = "created_at"
+    ordering = ("-id",)
+    autocomplete_fields = ("user",)
 
-    search_fields = ("user__username", "session_id", "error_message")
+    search_routes = ((looks_like_email, "user__email__iexact"), (str.isdigit, "pk"))
+    search_fields = ("session_id__exact",)
+    search_help_text = "Member e-mail, payment id or Stripe session id."
 
     readonly_fields = ("created_at", "updated_at", "session_id", "session_url")
 
 @admin.register(StripeCustomer)
-class StripeCustomerAdmin(admin.ModelAdmin):
+class StripeCustomerAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ("user", "stripe_customer_id")
-    search_fields = ("user__username", "stripe_customer_id")
+    list_select_related = ("user",)
+    ordering = ("-id",)
+    autocomplete_fields = ("user",)
+    search_routes = ((looks_like_email, "user__email__iexact"),)
+    search_fields = ("stripe_customer_id__exact",)
+    search_help_text = "Member e-mail or Stripe customer id."
+
 
+@admin.register(StripeEvent)
+class StripeEventAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ("event_id", "type", "status", "received_at", "processed_at")
+    list_filter = ("status", "type")
+    ordering = ("-id",)
+    search_fields = ("event_id__exact",)
+    readonly_fields = ("event_id", "type", "payload", "received_at", "processed_at")
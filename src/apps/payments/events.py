@@ -0,0 +1,206 @@
+import logging
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.bot.notifications import MEMBERSHIP_STARTED, PAYMENT_SUCCEEDED, notify
+from apps.membership.access import access_cache
+from apps.membership.current import set_current_memberships
+from apps.membership.models import Membership
+from apps.payments.models import Payment, StripeCustomer, StripeEvent
+from apps.plans.cache import plan_catalog
+
+logger = logging.getLogger(__name__)
+
+EVENT_BATCH_SIZE = 100
+
+CHECKOUT_COMPLETED = "checkout.session.completed"
+PAYMENT_FAILED = "payment_intent.payment_failed"
+PAYMENT_METHOD_ATTACHED = "payment_method.attached"
+
+
+def activate_memberships(payments):
+    """
+    Start or prolong memberships for a batch of paid payments, in the caller's transaction.
+
+    Plans come from the catalog cache, the members' current memberships are loaded in
+    one query through ``User.current_membership`` and the changes are written back with
+    a single bulk_create and bulk_update. Members without a live membership get a new
+    one, which becomes their current membership. Members are notified on Telegram.
+    """
+    plans = plan_catalog.in_bulk({payment.membership_id for payment in payments})
+
+    memberships = {
+        membership.member_id: membership
+        for membership in Membership.objects.filter(
+            member_id__in={payment.user_id for payment in payments},
+            member__current_membership=F("pk"),
+        )
+    }
+
+    to_create = []
+    to_update = {}
+    started = {}
+    today = date.today()
+
+    for payment in payments:
+        plan = plans.get(payment.membership_id)
+        if plan is None:
+            logger.error(f"Plan {payment.membership_id} not found.")
+            continue
+
+        membership = memberships.get(payment.user_id)
+        start_date = today
+        if membership and membership.end_date > today:
+            start_date = membership.end_date
+
+        if membership is None:
+            membership = Membership(member_id=payment.user_id)
+            memberships[payment.user_id] = membership
+            to_create.append(membership)
+        elif membership.pk:
+            to_update[membership.pk] = membership
+
+        membership.plan = plan
+        membership.start_date = start_date
+        membership.end_date = start_date + timedelta(days=plan.duration_days)
+        membership.status = Membership.Status.ACTIVE
+        membership.price_at_purchase = plan.price
+        started[payment.user_id] = membership
+        logger.info(f"Membership updated for user {payment.user_id}. Ends: {membership.end_date}")
+
+    Membership.objects.bulk_create(to_create)
+    Membership.objects.bulk_update(
+        to_update.values(), ["plan", "start_date", "end_date", "status", "price_at_purchase"]
+    )
+    set_current_memberships(to_create)
+    access_cache.invalidate_on_commit(
+        member_ids=[membership.member_id for membership in to_update.values()]
+    )
+    notify(
+        MEMBERSHIP_STARTED,
+        [
+            (member_id, {"plan": membership.plan.name, "end_date": membership.end_date})
+            for member_id, membership in started.items()
+        ],
+    )
+
+
+def create_or_update_membership(payment):
+    with transaction.atomic():
+        activate_memberships([payment])
+
+
+def _payment_id(event: StripeEvent):
+    stripe_obj = event.payload.get("data", {}).get("object", {})
+    payment_id = (stripe_obj.get("metadata") or {}).get("payment_id")
+    return int(payment_id) if payment_id else None
+
+
+def apply_event_batch(events):
+    """
+    Apply a batch of inbox events in the caller's transaction.
+
+    All referenced payments are locked with one SELECT ... FOR UPDATE, state changes are
+    resolved in memory in event order and flushed with bulk updates. Cards attached
+    to a customer become the customer's card for auto-renewals.
+    """
+    payment_ids = {_payment_id(event) for event in events} - {None}
+    payments = (
+        Payment.objects.select_for_update(of=("self",)).in_bulk(payment_ids) if payment_ids else {}
+    )
+
+    changed = {}
+    paid = []
+    saved_cards = {}
+    now = timezone.now()
+
+    for event in events:
+        payment = payments.get(_payment_id(event))
+
+        if event.type == PAYMENT_METHOD_ATTACHED:
+            stripe_obj = event.payload["data"]["object"]
+            if stripe_obj.get("customer"):
+                saved_cards[stripe_obj["customer"]] = stripe_obj["id"]
+
+        elif payment is None:
+            pass
+
+        elif event.type == CHECKOUT_COMPLETED:
+            if payment.status == Payment.StatusChoices.PENDING:
+                payment.status = Payment.StatusChoices.PAID
+                changed[payment.pk] = payment
+                paid.append(payment)
+                logger.info(f"Payment {payment.pk} marked as PAID.")
+
+        elif event.type == PAYMENT_FAILED:
+            stripe_obj = event.payload["data"]["object"]
+            error_msg = (stripe_obj.get("last_payment_error") or {}).get("message", "Unknown error")
+            payment.status = Payment.StatusChoices.FAILED
+            payment.error_message = error_msg
+            changed[payment.pk] = payment
+            logger.error(f"Payment {payment.pk} failed: {error_msg}")
+
+        event.status = StripeEvent.StatusChoices.PROCESSED
+        event.processed_at = now
+
+    for payment in changed.values():
+        payment.updated_at = now
+    Payment.objects.bulk_update(changed.values(), ["status", "error_message", "updated_at"])
+    for customer_id, payment_method in saved_cards.items():
+        StripeCustomer.objects.filter(stripe_customer_id=customer_id).update(
+            default_payment_method=payment_method
+        )
+
+    if paid:
+        notify(
+            PAYMENT_SUCCEEDED,
+            [(payment.user_id, {"amount": payment.money_to_pay}) for payment in paid],
+        )
+        activate_memberships(paid)
+
+
+def process_pending_events(batch_size: int = EVENT_BATCH_SIZE) -> int:
+    """
+    Drain the Stripe event inbox in batches.
+
+    Each batch is claimed with SKIP LOCKED so several workers can drain the inbox
+    side by side. If a batch fails as a whole it is replayed event by event, so
+    a single bad event is parked as FAILED instead of blocking the rest.
+    """
+    processed = 0
+
+    while True:
+        with transaction.atomic():
+            batch = list(
+                StripeEvent.objects.select_for_update(skip_locked=True)
+                .filter(status=StripeEvent.StatusChoices.PENDING)
+                .order_by("id")[:batch_size]
+            )
+            if not batch:
+                break
+
+            try:
+                with transaction.atomic():
+                    apply_event_batch(batch)
+            except Exception:
+                logger.exception(
+                    f"Stripe event batch of {len(batch)} failed, replaying one by one."
+                )
+                for event in batch:
+                    try:
+                        with transaction.atomic():
+                            apply_event_batch([event])
+                    except Exception as e:
+                        logger.exception(f"Stripe event {event.event_id} failed.")
+                        event.status = StripeEvent.StatusChoices.FAILED
+                        event.error_message = str(e)
+                        event.processed_at = timezone.now()
+
+            StripeEvent.objects.bulk_update(batch, ["status", "error_message", "processed_at"])
+
+        processed += len(batch)
+
+    return processed
@@ -0,0 +1,25 @@
+from rest_framework.exceptions import ValidationError
+
+from apps.payments.filters import PaymentFilter
+from apps.payments.models import Payment
+
+PAYMENT_EXPORT_FIELDS = (
+    "id",
+    "user_id",
+    "user__email",
+    "membership_id",
+    "type",
+    "status",
+    "money_to_pay",
+    "session_id",
+    "error_message",
+    "created_at",
+    "updated_at",
+)
+
+
+def payment_export_queryset(params):
+    filterset = PaymentFilter(params, queryset=Payment.objects.order_by("id"))
+    if not filterset.is_valid():
+        raise ValidationError(filterset.errors)
+    return filterset.qs
@@ -0,0 +1,14 @@
+from django_filters import rest_framework as filters
+
+from .models import Payment
+
+
+class PaymentFilter(filters.FilterSet):
+    created_at = filters.DateFromToRangeFilter(field_name="created_at__date")
+
+    status = filters.ChoiceFilter(choices=Payment.StatusChoices.choices)
+    type = filters.ChoiceFilter(choices=Payment.TypeChoices.choices)
+
+    class Meta:
+        model = Payment
+        fields = ["status", "type", "created_at"]
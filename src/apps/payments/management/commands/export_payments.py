@@ -0,0 +1,23 @@
+from apps.payments.exports import PAYMENT_EXPORT_FIELDS, payment_export_queryset
+from core.export import BaseExportCommand
+
+
+class Command(BaseExportCommand):
+    help = "Stream payments to a CSV or NDJSON file."
+    fields = PAYMENT_EXPORT_FIELDS
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--status")
+        parser.add_argument("--type")
+        parser.add_argument("--created-after", help="YYYY-MM-DD, inclusive.")
+        parser.add_argument("--created-before", help="YYYY-MM-DD, inclusive.")
+
+    def get_queryset(self, options):
+        params = {
+            "status": options["status"],
+            "type": options["type"],
+            "created_at_after": options["created_after"],
+            "created_at_before": options["created_before"],
+        }
+        return payment_export_queryset({k: v for k, v in params.items() if v})
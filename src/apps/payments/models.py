@@ -15,6 +15,7 @@ class Payment(models.Model):
     class TypeChoices(models.TextChoices):
         MEMBERSHIP_PURCHASE = "MEMBERSHIP_PURCHASE", "Membership Purchase"
         UPGRADE_FEE = "UPGRADE_FEE", "Upgrade Fee"
+        RENEWAL = "RENEWAL", "Renewal"
 
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -60,11 +61,38 @@ class Payment(models.Model):
         unique=True,
     )
 
+    # Renewal charges: one payment per membership period, also sent to Stripe as the
+    # Idempotency-Key so a rerun never charges twice
+    idempotency_key = models.CharField(
+        max_length=255,
+        null=True,
+        blank=True,
+        unique=True,
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["user", "membership_id", "status", "created_at"],
+                name="payment_user_plan_status_idx",
+            ),
+            models.Index(
+                fields=["user", "membership_id", "created_at"],
+                condition=models.Q(status="PENDING"),
+                name="payment_pending_idx",
+            ),
+            models.Index(fields=["user", "-created_at", "-id"], name="payment_user_history_idx"),
+            models.Index(fields=["created_at"], name="payment_created_idx"),
+            models.Index(
+                fields=["id"],
+                condition=models.Q(status="PENDING", session_id__isnull=False),
+                name="payment_pending_session_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Payment {self.id} ({self.status} - {self.money_to_pay} USD)"
@@ -78,7 +106,45 @@ class StripeCustomer(models.Model):
         max_length=255,
         unique=True,
     )
+    # Card saved for off-session charges (auto-renewal), from payment_method.attached
+    default_payment_method = models.CharField(max_length=255, blank=True, null=True)
 
     def __str__(self):
         return f"Stripe Customer ID: {self.stripe_customer_id}"
 
+
+class StripeEvent(models.Model):
+    """
+    Inbox of verified Stripe webhook events, drained by a Celery worker
+    """
+    class StatusChoices(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        PROCESSED = "PROCESSED", "Processed"
+        FAILED = "FAILED", "Failed"
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+
+    status = models.CharField(
+        max_length=20,
+        choices=StatusChoices.choices,
+        default=StatusChoices.PENDING,
+    )
+    error_message = models.TextField(blank=True, null=True)
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=models.Q(status="PENDING"),
+                name="stripe_event_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Stripe event {self.event_id} ({self.type} - {self.status})"
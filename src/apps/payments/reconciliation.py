@@ -0,0 +1,110 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import stripe
+from django.db import transaction
+from django.utils import timezone
+
+from apps.payments.events import activate_memberships
+from apps.payments.models import Payment
+from apps.payments.stripe_client import get_stripe_client
+from core.ratelimit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_STALE_AFTER = timedelta(minutes=30)
+RECONCILE_BATCH_SIZE = 100
+RECONCILE_MAX_WORKERS = 8
+RECONCILE_RATE_PER_SECOND = 20
+
+
+def _session_outcome(session):
+    if session["status"] == "complete" and session["payment_status"] == "paid":
+        return Payment.StatusChoices.PAID
+    if session["status"] == "expired":
+        return Payment.StatusChoices.EXPIRED
+    return None
+
+
+def _apply_outcomes(outcomes, summary):
+    """
+    Apply PAID/EXPIRED transitions for one batch. Rows are re-read under lock so a
+    webhook that landed in the meantime wins and nothing is activated twice.
+    """
+    with transaction.atomic():
+        payments = list(
+            Payment.objects.select_for_update(of=("self",)).filter(
+                id__in=outcomes, status=Payment.StatusChoices.PENDING
+            )
+        )
+        now = timezone.now()
+        for payment in payments:
+            payment.status = outcomes[payment.id]
+            payment.updated_at = now
+        Payment.objects.bulk_update(payments, ["status", "updated_at"])
+
+        paid = [p for p in payments if p.status == Payment.StatusChoices.PAID]
+        if paid:
+            activate_memberships(paid)
+
+    summary["paid"] += len(paid)
+    summary["expired"] += len(payments) - len(paid)
+
+
+def reconcile_pending_payments(
+    retrieve_session=None,
+    stale_after: timedelta = RECONCILE_STALE_AFTER,
+    batch_size: int = RECONCILE_BATCH_SIZE,
+    max_workers: int = RECONCILE_MAX_WORKERS,
+    rate: float = RECONCILE_RATE_PER_SECOND,
+) -> dict:
+    """
+    Settle PENDING payments whose webhook never arrived by asking Stripe for their
+    checkout sessions.
+
+    Stale payments are scanned in id order, batch by batch. Session lookups run on a
+    bounded thread pool behind a rate limiter; ``retrieve_session(session_id)`` can be
+    swapped for a fake in tests.
+    """
+    retrieve_session = retrieve_session or get_stripe_client().retrieve_checkout_session
+    limiter = RateLimiter(rate)
+    summary = {"checked": 0, "paid": 0, "expired": 0, "errors": 0}
+
+    def fetch(session_id):
+        limiter.acquire()
+        try:
+            return retrieve_session(session_id)
+        except stripe.error.StripeError as e:
+            logger.warning(f"Could not retrieve Stripe session {session_id}: {str(e)}")
+            return None
+
+    pending = Payment.objects.filter(
+        status=Payment.StatusChoices.PENDING,
+        session_id__isnull=False,
+        created_at__lt=timezone.now() - stale_after,
+    ).order_by("id")
+    last_id = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while True:
+            batch = list(
+                pending.filter(id__gt=last_id).values_list("id", "session_id")[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0]
+
+            sessions = pool.map(fetch, [session_id for _, session_id in batch])
+            outcomes = {}
+            for (payment_id, _), session in zip(batch, sessions, strict=True):
+                if session is None:
+                    summary["errors"] += 1
+                elif outcome := _session_outcome(session):
+                    outcomes[payment_id] = outcome
+
+            summary["checked"] += len(batch)
+            if outcomes:
+                _apply_outcomes(outcomes, summary)
+
+    return summary
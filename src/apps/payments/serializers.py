@@ -1,21 +1,17 @@
 from rest_framework import serializers
 from apps.payments.models import Payment
-from apps.membership.models import MembershipPlan
-from apps.plans.models import MembershipPlan
+from apps.plans.cache import plan_catalog
 
 
 class PaymentCreateSerializer(serializers.ModelSerializer):
-    membership = serializers.PrimaryKeyRelatedField(
-        queryset=MembershipPlan.objects.all(),
-        source='membership_id'
-    )
+    membership = serializers.IntegerField(source='membership_id')
 
     class Meta:
         model = Payment
         fields = ["membership"]
 
-    def validate_membership_id(self, value):
-        if not MembershipPlan.objects.filter(id=value).exists():
+    def validate_membership(self, value):
+        if plan_catalog.get(value) is None:
             raise serializers.ValidationError(f"Plan with id {value} does not exist.")
 
         return value
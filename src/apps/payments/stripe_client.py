@@ -0,0 +1,237 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+import stripe
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
+
+from apps.monitoring.metrics import observe_stripe_call
+from core.circuitbreaker import CircuitBreaker, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# Only these say something about Stripe's health; card declines and invalid requests
+# are answers from a working API and must not trip the breaker.
+OUTAGE_ERRORS = (
+    stripe.error.APIConnectionError,
+    stripe.error.APIError,
+    stripe.error.RateLimitError,
+)
+
+
+class StripeUnavailable(stripe.error.StripeError):
+    """Raised without calling Stripe while the circuit breaker is open."""
+
+
+class LoopLocalHTTPXClient:
+    """
+    Async transport with one ``stripe.HTTPXClient`` per event loop. An httpx AsyncClient
+    pools connections of the loop that opened them, and async views served under WSGI
+    run every request on a fresh loop, so one shared client would hand a request the
+    connections of a loop that is already closed.
+    """
+
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _client(self) -> stripe.HTTPXClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None:
+                client = self._clients[loop] = stripe.HTTPXClient(**self._kwargs)
+        return client
+
+    async def request_async(self, method, url, headers, post_data=None):
+        return await self._client().request_async(method, url, headers, post_data)
+
+    async def request_stream_async(self, method, url, headers, post_data=None):
+        return await self._client().request_stream_async(method, url, headers, post_data)
+
+    def sleep_async(self, secs):
+        return self._client().sleep_async(secs)
+
+    async def close_async(self):
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close_async()
+
+
+class StripeClient:
+    """
+    Process-wide Stripe client.
+
+    Requests go through one pooled keep-alive ``requests.Session`` (``httpx`` for the
+    ``*_async`` methods) with connect/read timeouts, the SDK retries connection errors,
+    409s and 5xx with exponential backoff and jitter, and a circuit breaker stops
+    calling Stripe after repeated outages so workers fail fast instead of waiting on
+    timeouts. ``http_client`` lets tests plug in a fake transport.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        *,
+        api_base: str = "",
+        connect_timeout: float = 3,
+        read_timeout: float = 10,
+        max_network_retries: int = 2,
+        pool_size: int = 10,
+        http_client: stripe.HTTPClient | None = None,
+        breaker: CircuitBreaker | None = None,
+    ):
+        if http_client is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            # Async calls go through httpx, with a connection pool per event loop.
+            async_client = LoopLocalHTTPXClient(
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+            )
+            http_client = stripe.RequestsClient(
+                timeout=(connect_timeout, read_timeout),
+                session=session,
+                async_fallback_client=async_client,
+            )
+
+        self.http_client = http_client
+        self.breaker = breaker or CircuitBreaker()
+        self._client = stripe.StripeClient(
+            api_key,
+            http_client=http_client,
+            max_network_retries=max_network_retries,
+            base_addresses={"api": api_base} if api_base else {},
+        )
+
+    @classmethod
+    def from_settings(cls, **kwargs):
+        options = {
+            "api_base": settings.STRIPE_API_BASE,
+            "connect_timeout": settings.STRIPE_CONNECT_TIMEOUT,
+            "read_timeout": settings.STRIPE_READ_TIMEOUT,
+            "max_network_retries": settings.STRIPE_MAX_NETWORK_RETRIES,
+            "pool_size": settings.STRIPE_HTTP_POOL_SIZE,
+            "breaker": CircuitBreaker(
+                failure_threshold=settings.STRIPE_CIRCUIT_FAILURE_THRESHOLD,
+                reset_timeout=settings.STRIPE_CIRCUIT_RESET_TIMEOUT,
+            ),
+        }
+        options.update(kwargs)
+        return cls(settings.STRIPE_SECRET_KEY, **options)
+
+    def _before_call(self):
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError as e:
+            raise StripeUnavailable("Stripe is temporarily unavailable.") from e
+
+    def _record_error(self, error):
+        if not isinstance(error, stripe.error.StripeError) or isinstance(
+            error.__cause__, RuntimeError
+        ):
+            # Raised in this process, e.g. by the event loop around the transport; it says
+            # nothing about Stripe and must not open the circuit for every caller.
+            self.breaker.release_trial()
+            logger.warning(f"Stripe call failed in this process: {error!r}")
+        elif isinstance(error, OUTAGE_ERRORS):
+            self.breaker.record_failure()
+            logger.warning(f"Stripe call failed, circuit is {self.breaker.state}: {str(error)}")
+        else:
+            self.breaker.record_success()
+
+    def _call(self, operation, method, *args):
+        self._before_call()
+        started = time.perf_counter()
+        try:
+            result = method(*args)
+        except Exception as e:
+            self._record_error(e)
+            raise
+        finally:
+            observe_stripe_call(operation, time.perf_counter() - started)
+        self.breaker.record_success()
+        return result
+
+    async def _call_async(self, operation, method, *args):
+        self._before_call()
+        started = time.perf_counter()
+        try:
+            result = await method(*args)
+        except Exception as e:
+            self._record_error(e)
+            raise
+        finally:
+            observe_stripe_call(operation, time.perf_counter() - started)
+        self.breaker.record_success()
+        return result
+
+    @staticmethod
+    def _options(idempotency_key):
+        return {"idempotency_key": idempotency_key} if idempotency_key else {}
+
+    def create_customer(self, params: dict, idempotency_key: str | None = None):
+        return self._call(
+            "customers.create",
+            self._client.v1.customers.create,
+            params,
+            self._options(idempotency_key),
+        )
+
+    def create_checkout_session(self, params: dict, idempotency_key: str | None = None):
+        return self._call(
+            "checkout.sessions.create",
+            self._client.v1.checkout.sessions.create,
+            params,
+            self._options(idempotency_key),
+        )
+
+    def retrieve_checkout_session(self, session_id: str):
+        return self._call(
+            "checkout.sessions.retrieve", self._client.v1.checkout.sessions.retrieve, session_id
+        )
+
+    def create_payment_intent(self, params: dict, idempotency_key: str | None = None):
+        return self._call(
+            "payment_intents.create",
+            self._client.v1.payment_intents.create,
+            params,
+            self._options(idempotency_key),
+        )
+
+    async def create_customer_async(self, params: dict, idempotency_key: str | None = None):
+        return await self._call_async(
+            "customers.create",
+            self._client.v1.customers.create_async,
+            params,
+            self._options(idempotency_key),
+        )
+
+    async def create_checkout_session_async(self, params: dict, idempotency_key: str | None = None):
+        return await self._call_async(
+            "checkout.sessions.create",
+            self._client.v1.checkout.sessions.create_async,
+            params,
+            self._options(idempotency_key),
+        )
+
+
+@functools.cache
+def get_stripe_client() -> StripeClient:
+    return StripeClient.from_settings()
+
+
+@receiver(setting_changed)
+def _reset_stripe_client(setting, **_kwargs):
+    if setting.startswith("STRIPE_"):
+        get_stripe_client.cache_clear()
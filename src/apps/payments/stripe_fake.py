@@ -0,0 +1,172 @@
+import asyncio
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import stripe
+
+
+class FakeStripe:
+    """
+    In-memory stand-in for the parts of the Stripe API this project uses: customers,
+    checkout sessions and off-session payment intents. ``latency`` delays every answer
+    and ``fail_with`` turns every answer into an error with that status code, to
+    simulate a degraded Stripe; payment methods in ``declined`` get a card decline.
+    Like Stripe, a POST repeated with the same idempotency key gets the first answer.
+    """
+
+    def __init__(self, latency: float = 0, fail_with: int | None = None, declined=()):
+        self.latency = latency
+        self.fail_with = fail_with
+        self.declined = set(declined)
+        self.customers = {}
+        self.sessions = {}
+        self.payment_intents = {}
+        self.requests = []
+        self.idempotent_replies = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def handle(
+        self, method: str, path: str, body: str = "", idempotency_key: str | None = None
+    ) -> tuple[int, dict]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._answer(method, path, body, idempotency_key)
+
+    async def handle_async(
+        self, method: str, path: str, body: str = "", idempotency_key: str | None = None
+    ) -> tuple[int, dict]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._answer(method, path, body, idempotency_key)
+
+    def _answer(self, method, path, body, idempotency_key):
+        with self._lock:
+            self.requests.append((method, path))
+            if self.fail_with:
+                return self.fail_with, {
+                    "error": {"type": "api_error", "message": "Stripe is degraded."}
+                }
+            if idempotency_key and idempotency_key in self.idempotent_replies:
+                return self.idempotent_replies[idempotency_key]
+            reply = self._route(method, path, dict(parse_qsl(body)))
+            if idempotency_key and method == "POST":
+                self.idempotent_replies[idempotency_key] = reply
+            return reply
+
+    def _route(self, method, path, params):
+        if method == "POST" and path == "/v1/customers":
+            return 200, self._create("cus", self.customers, "customer", email=params.get("email"))
+        if method == "POST" and path == "/v1/checkout/sessions":
+            session = self._create(
+                "cs",
+                self.sessions,
+                "checkout.session",
+                customer=params.get("customer"),
+                status="open",
+                payment_status="unpaid",
+                metadata={"payment_id": params.get("metadata[payment_id]")},
+            )
+            session["url"] = f"https://checkout.stripe.test/{session['id']}"
+            return 200, session
+        if method == "POST" and path == "/v1/payment_intents":
+            if params.get("payment_method") in self.declined:
+                return 402, {
+                    "error": {
+                        "type": "card_error",
+                        "code": "card_declined",
+                        "message": "Your card was declined.",
+                    }
+                }
+            return 200, self._create(
+                "pi",
+                self.payment_intents,
+                "payment_intent",
+                amount=int(params.get("amount", 0)),
+                customer=params.get("customer"),
+                payment_method=params.get("payment_method"),
+                status="succeeded",
+                metadata={"payment_id": params.get("metadata[payment_id]")},
+            )
+        if method == "GET" and path.startswith("/v1/checkout/sessions/"):
+            session = self.sessions.get(path.rsplit("/", 1)[-1])
+            if session:
+                return 200, session
+        return 404, {"error": {"type": "invalid_request_error", "message": "No such object."}}
+
+    def _create(self, prefix, store, object_name, **fields):
+        obj = {"id": f"{prefix}_test_{next(self._ids)}", "object": object_name, **fields}
+        store[obj["id"]] = obj
+        return obj
+
+
+class FakeStripeHTTPClient(stripe.HTTPClient):
+    """Transport that answers Stripe SDK requests from a FakeStripe, without any network."""
+
+    name = "fake"
+
+    def __init__(self, backend: FakeStripe | None = None):
+        super().__init__()
+        self.backend = backend or FakeStripe()
+
+    @staticmethod
+    def _split(method, url, headers, post_data):
+        parts = urlsplit(url)
+        body = post_data if method.upper() == "POST" else parts.query
+        return method.upper(), parts.path, body or "", headers.get("Idempotency-Key")
+
+    def request(self, method, url, headers, post_data=None, *, _usage=None):
+        status_code, payload = self.backend.handle(*self._split(method, url, headers, post_data))
+        return json.dumps(payload), status_code, {"request-id": "req_fake"}
+
+    async def request_async(self, method, url, headers, post_data=None):
+        status_code, payload = await self.backend.handle_async(
+            *self._split(method, url, headers, post_data)
+        )
+        return json.dumps(payload).encode(), status_code, {"request-id": "req_fake"}
+
+    def sleep_async(self, secs):
+        return asyncio.sleep(secs)
+
+    def request_stream(self, method, url, headers, post_data=None, *, _usage=None):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def make_fake_stripe_server(address=("127.0.0.1", 0), backend: FakeStripe | None = None):
+    """
+    Serve a FakeStripe over HTTP, for runs that go through the real transport
+    (STRIPE_API_BASE=http://host:port). The caller runs ``serve_forever``.
+    """
+    backend = backend or FakeStripe()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length).decode() if length else urlsplit(self.path).query
+            status_code, payload = backend.handle(
+                self.command, urlsplit(self.path).path, body, self.headers.get("Idempotency-Key")
+            )
+            content = json.dumps(payload).encode()
+            self.send_response(status_code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        do_GET = do_POST = _reply
+
+        def log_message(self, *_args):
+            pass
+
+    server = ThreadingHTTPServer(address, Handler)
+    server.backend = backend
+    return server
@@ -1,56 +1,184 @@
+from dataclasses import dataclass
+
 import stripe
-from django.conf import  settings
-from decouple import config
+from django.core.cache import cache
 from apps.payments.models import StripeCustomer, Payment
+from apps.payments.stripe_client import StripeUnavailable, get_stripe_client
+
+STRIPE_CUSTOMER_CACHE_KEY = "stripe:customer:{user_id}"
+STRIPE_CUSTOMER_CACHE_TTL = 24 * 60 * 60
 
-stripe.api_key = config("STRIPE_SECRET_KEY")
 
 def get_or_create_stripe_customer(user):
-    customer_mapping = StripeCustomer.objects.filter(user=user).first()
+    """
+    Stripe customer id of the user, from the cache, the StripeCustomer table or, the
+    first time, from Stripe.
 
-    if customer_mapping:
-        return customer_mapping.stripe_customer_id
+    Concurrent first purchases are race-safe: the Stripe call uses a per-user
+    idempotency key, so both callers get the same customer back, and the mapping is
+    inserted with ON CONFLICT DO NOTHING before the stored row is read back.
+    """
+    cache_key = STRIPE_CUSTOMER_CACHE_KEY.format(user_id=user.id)
+    customer_id = cache.get(cache_key)
+    if customer_id:
+        return customer_id
 
-    stripe_customer = stripe.Customer.create(
-        email=user.email,
-        metadata={"user_id": user.id}
-    )
+    customer_id = StripeCustomer.objects.filter(user_id=user.id).values_list(
+        "stripe_customer_id", flat=True
+    ).first()
+
+    if not customer_id:
+        stripe_customer = get_stripe_client().create_customer({
+            "email": user.email,
+            "metadata": {"user_id": user.id},
+        }, idempotency_key=f"customer-user-{user.id}")
+
+        StripeCustomer.objects.bulk_create(
+            [StripeCustomer(user_id=user.id, stripe_customer_id=stripe_customer.id)],
+            ignore_conflicts=True,
+        )
+        customer_id = StripeCustomer.objects.filter(user_id=user.id).values_list(
+            "stripe_customer_id", flat=True
+        ).get()
+
+    cache.set(cache_key, customer_id, STRIPE_CUSTOMER_CACHE_TTL)
+    return customer_id
+
+
+async def aget_or_create_stripe_customer(user):
+    """Async version of get_or_create_stripe_customer."""
+    cache_key = STRIPE_CUSTOMER_CACHE_KEY.format(user_id=user.id)
+    customer_id = await cache.aget(cache_key)
+    if customer_id:
+        return customer_id
+
+    customer_id = await StripeCustomer.objects.filter(user_id=user.id).values_list(
+        "stripe_customer_id", flat=True
+    ).afirst()
+
+    if not customer_id:
+        stripe_customer = await get_stripe_client().create_customer_async({
+            "email": user.email,
+            "metadata": {"user_id": user.id},
+        }, idempotency_key=f"customer-user-{user.id}")
+
+        await StripeCustomer.objects.abulk_create(
+            [StripeCustomer(user_id=user.id, stripe_customer_id=stripe_customer.id)],
+            ignore_conflicts=True,
+        )
+        customer_id = await StripeCustomer.objects.filter(user_id=user.id).values_list(
+            "stripe_customer_id", flat=True
+        ).aget()
 
-    StripeCustomer.objects.create(
-        user=user,
-        stripe_customer_id=stripe_customer.id,
+    await cache.aset(cache_key, customer_id, STRIPE_CUSTOMER_CACHE_TTL)
+    return customer_id
+
+
+def _checkout_session_params(payment, customer_id, success_url, cancel_url):
+    return {
+        "customer": customer_id,
+        "payment_method_types": ["card"],
+        "line_items": [{
+            "price_data": {
+                "currency": "USD",
+                "product_data": {
+                    "name": f"Fitness Club: {payment.get_type_display()}",
+                    "description": f"Plan ID: {payment.membership_id}",
+                },
+                "unit_amount": int(payment.money_to_pay * 100),
+            },
+            "quantity": 1,
+        }],
+        "mode": "payment",
+        # Keeps the card on the customer so auto-renewals can charge it off-session
+        "payment_intent_data": {"setup_future_usage": "off_session"},
+        "success_url": success_url,
+        "cancel_url": cancel_url,
+
+        "metadata": {
+            "payment_id": payment.id,
+        },
+    }
+
+
+def _failure_message(error):
+    if isinstance(error, StripeUnavailable):
+        return "Stripe is temporarily unavailable. Try again later."
+    if isinstance(error, stripe.error.CardError):
+        return f"Card Error: {error.user_message}"
+    if isinstance(error, stripe.error.StripeError):
+        return "Stripe service error. Try again later."
+    return f"Internal error: {str(error)}"
+
+
+@dataclass
+class ChargeResult:
+    error: str | None = None
+    # Set for outages, rate limits, timeouts and idempotency conflicts: the charge may
+    # still go through when it is repeated with the same key, so the payment stays PENDING.
+    retryable: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _is_definitive(error) -> bool:
+    """
+    Card declines and other 4xx answers; anything else may succeed when retried. A 409
+    means another request with the same idempotency key is still in flight, so its
+    outcome is not known yet.
+    """
+    if isinstance(error, stripe.error.CardError):
+        return True
+    return (
+        isinstance(error, stripe.error.StripeError)
+        and not isinstance(
+            error, StripeUnavailable | stripe.error.RateLimitError | stripe.error.IdempotencyError
+        )
+        and error.http_status is not None
+        and 400 <= error.http_status < 500
+        and error.http_status != 409
     )
 
-    return stripe_customer.id
+
+def charge_saved_payment_method(payment: Payment, customer_id: str, payment_method: str) -> ChargeResult:
+    """
+    Charge ``payment`` off-session to a card saved on the customer, with the payment's
+    idempotency key. The caller records the outcome, so batches can be written back in
+    bulk.
+    """
+    try:
+        intent = get_stripe_client().create_payment_intent({
+            "amount": int(payment.money_to_pay * 100),
+            "currency": "usd",
+            "customer": customer_id,
+            "payment_method": payment_method,
+            "payment_method_types": ["card"],
+            "off_session": True,
+            "confirm": True,
+            "metadata": {"payment_id": payment.id},
+        }, idempotency_key=payment.idempotency_key)
+
+    # noinspection PyBroadException
+    except Exception as e:
+        return ChargeResult(error=_failure_message(e), retryable=not _is_definitive(e))
+
+    if intent.status != "succeeded":
+        return ChargeResult(error=f"Payment intent {intent.status}.")
+    return ChargeResult()
+
 
 def create_checkout_session(
         payment: Payment,
         success_url: str,
         cancel_url: str):
-    customer_id = get_or_create_stripe_customer(payment.user)
-
     try:
-        session = stripe.checkout.Session.create(
-            customer=customer_id,
-            payment_method_types=["card"],
-            line_items=[{
-                "price_data": {
-                    "currency": "USD",
-                    "product_data": {
-                        "name": f"Fitness Club: {payment.get_type_display()}",
-                        "description": f"Plan ID: {payment.membership_id}",
-                    },
-                    "unit_amount": int(payment.money_to_pay * 100),
-                },
-                "quantity": 1,
-            }],
-            mode="payment",
-            success_url=success_url,
-            cancel_url=cancel_url,
-
-            metadata={
-                "payment_id": payment.id,
-            }
+        customer_id = get_or_create_stripe_customer(payment.user)
+
+        session = get_stripe_client().create_checkout_session(
+            _checkout_session_params(payment, customer_id, success_url, cancel_url),
+            idempotency_key=f"checkout-session-{payment.id}",
         )
         payment.session_id = session.id
         payment.session_url = session.url
@@ -58,21 +186,37 @@ def create_checkout_session(
 
         return session
 
-    except stripe.error.CardError as e:
+    # noinspection PyBroadException
+    except Exception as e:
         payment.status = Payment.StatusChoices.FAILED
-        payment.error_message = f"Card Error: {e.user_message}"
+        payment.error_message = _failure_message(e)
         payment.save()
         raise e
 
-    except stripe.error.StripeError as e:
-        payment.status = Payment.StatusChoices.FAILED
-        payment.error_message = "Stripe service error. Try again later."
-        payment.save()
-        raise e
+
+async def acreate_checkout_session(
+        payment: Payment,
+        success_url: str,
+        cancel_url: str):
+    """
+    Async version of create_checkout_session; ``payment.user`` must already be loaded.
+    """
+    try:
+        customer_id = await aget_or_create_stripe_customer(payment.user)
+
+        session = await get_stripe_client().create_checkout_session_async(
+            _checkout_session_params(payment, customer_id, success_url, cancel_url),
+            idempotency_key=f"checkout-session-{payment.id}",
+        )
+        payment.session_id = session.id
+        payment.session_url = session.url
+        await payment.asave()
+
+        return session
 
     # noinspection PyBroadException
     except Exception as e:
         payment.status = Payment.StatusChoices.FAILED
-        payment.error_message = f"Internal error: {str(e)}"
-        payment.save()
+        payment.error_message = _failure_message(e)
+        await payment.asave()
         raise e
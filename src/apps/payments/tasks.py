@@ -0,0 +1,42 @@
+import logging
+
+import stripe
+from celery import shared_task
+from django.contrib.auth import get_user_model
+
+from apps.payments.events import process_pending_events
+from apps.payments.reconciliation import reconcile_pending_payments
+from apps.payments.stripe_helper import get_or_create_stripe_customer
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def process_stripe_events_task():
+    processed = process_pending_events()
+    if processed:
+        logger.info(f"Processed {processed} Stripe events.")
+    return processed
+
+
+@shared_task
+def reconcile_pending_payments_task():
+    summary = reconcile_pending_payments()
+    logger.info(
+        f"Reconciled {summary['checked']} pending payments: {summary['paid']} paid, "
+        f"{summary['expired']} expired, {summary['errors']} lookups failed."
+    )
+    return summary
+
+
+@shared_task(
+    autoretry_for=(stripe.error.StripeError,),
+    retry_backoff=True,
+    max_retries=5,
+)
+def provision_stripe_customer_task(user_id):
+    """Create the Stripe customer ahead of the first checkout."""
+    user = get_user_model().objects.filter(id=user_id).first()
+    if user is None:
+        return None
+    return get_or_create_stripe_customer(user)
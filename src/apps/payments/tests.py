@@ -1,13 +1,27 @@
+import asyncio
+import json
+import threading
 import pytest
+import stripe
 from unittest.mock import patch, MagicMock
 from datetime import date, timedelta
+from django.core.management import call_command
+from django.db import connection
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
-from apps.payments.models import Payment
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.payments.models import Payment, StripeCustomer, StripeEvent
 from apps.membership.models import Membership
 from apps.plans.models import MembershipPlan
-from apps.payments.views import create_or_update_membership
+from apps.payments.events import create_or_update_membership, process_pending_events
+from apps.payments.reconciliation import reconcile_pending_payments
+from apps.payments.tasks import provision_stripe_customer_task
+from apps.payments.stripe_client import StripeClient, StripeUnavailable
+from apps.payments.stripe_helper import get_or_create_stripe_customer
+from apps.payments.stripe_fake import FakeStripe, FakeStripeHTTPClient, make_fake_stripe_server
+from core.circuitbreaker import CircuitBreaker
 
 User = get_user_model()
 
@@ -44,21 +58,33 @@ class TestPaymentFullCoverage:
         create_or_update_membership(payment)
         assert f"Plan {payment.membership_id} not found" in caplog.text
 
+    def post_event(self, mock_webhook, client, event_id, event_type, stripe_obj):
+        mock_event = MagicMock()
+        mock_event.id = event_id
+        mock_event.type = event_type
+        mock_webhook.return_value = mock_event
+        url = reverse("payments:stripe-webhook")
+        payload = {"id": event_id, "type": event_type, "data": {"object": stripe_obj}}
+        return client.post(url, data=payload, content_type="application/json")
+
     @patch("stripe.Webhook.construct_event")
     def test_webhook_success(self, mock_webhook, client, setup_data):
         user, plan, _ = setup_data
         payment = Payment.objects.create(
             user=user, membership_id=plan.id, money_to_pay=100, status=Payment.StatusChoices.PENDING
         )
-        mock_event = MagicMock()
-        mock_event.type = "checkout.session.completed"
-        mock_event.data.object = {"metadata": {"payment_id": str(payment.id)}}
-        mock_webhook.return_value = mock_event
-        url = reverse("payments:stripe-webhook")
-        response = client.post(url, data={}, content_type="application/json")
-        payment.refresh_from_db()
+        response = self.post_event(
+            mock_webhook, client, "evt_paid", "checkout.session.completed",
+            {"metadata": {"payment_id": str(payment.id)}}
+        )
         assert response.status_code == 200
+        payment.refresh_from_db()
+        assert payment.status == Payment.StatusChoices.PENDING
+
+        assert process_pending_events() == 1
+        payment.refresh_from_db()
         assert payment.status == Payment.StatusChoices.PAID
+        assert StripeEvent.objects.get(event_id="evt_paid").status == StripeEvent.StatusChoices.PROCESSED
 
     @patch("stripe.Webhook.construct_event")
     def test_webhook_payment_failed(self, mock_webhook, client, setup_data):
@@ -66,20 +92,34 @@ class TestPaymentFullCoverage:
         payment = Payment.objects.create(
             user=user, membership_id=plan.id, money_to_pay=100, status=Payment.StatusChoices.PENDING
         )
-        mock_event = MagicMock()
-        mock_event.type = "payment_intent.payment_failed"
-        mock_event.data.object = {
-            "metadata": {"payment_id": str(payment.id)},
-            "last_payment_error": {"message": "Insufficient funds"}
-        }
-        mock_webhook.return_value = mock_event
-        url = reverse("payments:stripe-webhook")
-        response = client.post(url, data={}, content_type="application/json")
+        response = self.post_event(
+            mock_webhook, client, "evt_failed", "payment_intent.payment_failed",
+            {
+                "metadata": {"payment_id": str(payment.id)},
+                "last_payment_error": {"message": "Insufficient funds"}
+            }
+        )
+        process_pending_events()
         payment.refresh_from_db()
         assert response.status_code == 200
         assert payment.status == Payment.StatusChoices.FAILED
         assert payment.error_message == "Insufficient funds"
 
+    @patch("stripe.Webhook.construct_event")
+    def test_webhook_retry_is_deduplicated(self, mock_webhook, client, django_capture_on_commit_callbacks):
+        with (
+            patch("apps.payments.views.process_stripe_events_task.delay") as mock_delay,
+            django_capture_on_commit_callbacks(execute=True),
+        ):
+            for _ in range(3):
+                response = self.post_event(
+                    mock_webhook, client, "evt_retry", "checkout.session.completed", {}
+                )
+                assert response.status_code == 200
+
+        assert StripeEvent.objects.filter(event_id="evt_retry").count() == 1
+        mock_delay.assert_called_once()
+
     @patch("stripe.Webhook.construct_event")
     def test_webhook_invalid_signature(self, mock_webhook, client):
         import stripe
@@ -114,4 +154,634 @@ class TestPaymentFullCoverage:
         url = reverse("payments:cancel")
         response = client.get(url)
         assert response.status_code == 200
-        assert b"canceled" in response.content
\ No newline at end of file
+        assert b"canceled" in response.content
+
+
+@pytest.mark.django_db
+class TestStripeEventBatchProcessing:
+
+    def queue_event(self, event_id, event_type, stripe_obj):
+        return StripeEvent.objects.create(
+            event_id=event_id, type=event_type,
+            payload={"id": event_id, "type": event_type, "data": {"object": stripe_obj}}
+        )
+
+    def make_payments(self, plan, count):
+        users = User.objects.bulk_create(
+            User(email=f"member{i}@fitness.com") for i in range(count)
+        )
+        return Payment.objects.bulk_create(
+            Payment(
+                user=user, membership_id=plan.id, money_to_pay=100,
+                type=Payment.TypeChoices.MEMBERSHIP_PURCHASE
+            )
+            for user in users
+        )
+
+    def test_batch_round_trips_do_not_grow_with_events(
+        self, plan, django_assert_max_num_queries
+    ):
+        payments = self.make_payments(plan, 30)
+        for payment in payments[:-1]:
+            self.queue_event(
+                f"evt_{payment.id}", "checkout.session.completed",
+                {"metadata": {"payment_id": str(payment.id)}}
+            )
+        self.queue_event(
+            "evt_failed", "payment_intent.payment_failed",
+            {"metadata": {"payment_id": str(payments[-1].id)}, "last_payment_error": {}}
+        )
+
+        with django_assert_max_num_queries(15):
+            assert process_pending_events() == 30
+
+        assert Payment.objects.filter(status=Payment.StatusChoices.PAID).count() == 29
+        assert Payment.objects.get(id=payments[-1].id).error_message == "Unknown error"
+        assert Membership.objects.filter(status=Membership.Status.ACTIVE).count() == 29
+
+    def test_repeated_payments_in_one_batch_stack_membership(self, plan):
+        user = User.objects.create_user(email="test@fitness.com", password="password")
+        for i in range(2):
+            payment = Payment.objects.create(
+                user=user, membership_id=plan.id, money_to_pay=100,
+                type=Payment.TypeChoices.MEMBERSHIP_PURCHASE
+            )
+            self.queue_event(
+                f"evt_{i}", "checkout.session.completed",
+                {"metadata": {"payment_id": str(payment.id)}}
+            )
+
+        process_pending_events()
+
+        membership = Membership.objects.get(member=user)
+        assert membership.end_date == date.today() + timedelta(days=60)
+
+    def test_bad_event_does_not_block_batch(self, plan):
+        payment = self.make_payments(plan, 1)[0]
+        self.queue_event("evt_bad", "checkout.session.completed", {"metadata": {"payment_id": "x"}})
+        self.queue_event(
+            "evt_good", "checkout.session.completed", {"metadata": {"payment_id": str(payment.id)}}
+        )
+
+        process_pending_events()
+
+        assert StripeEvent.objects.get(event_id="evt_bad").status == StripeEvent.StatusChoices.FAILED
+        assert StripeEvent.objects.get(event_id="evt_good").status == StripeEvent.StatusChoices.PROCESSED
+        payment.refresh_from_db()
+        assert payment.status == Payment.StatusChoices.PAID
+
+    def test_attached_card_is_saved_for_renewals(self):
+        user = User.objects.create(email="member@fitness.com")
+        StripeCustomer.objects.create(user=user, stripe_customer_id="cus_1")
+        self.queue_event(
+            "evt_pm", "payment_method.attached",
+            {"object": "payment_method", "id": "pm_1", "customer": "cus_1"}
+        )
+
+        process_pending_events()
+
+        assert StripeCustomer.objects.get(user=user).default_payment_method == "pm_1"
+
+
+@pytest.mark.django_db
+class TestHotQueryIndexes:
+
+    @pytest.fixture
+    def seeded_user(self):
+        plan = MembershipPlan.objects.create(
+            name="Standard", code="standard", duration_days=30, price=100.00
+        )
+        users = User.objects.bulk_create(
+            User(email=f"member{i}@fitness.com") for i in range(20)
+        )
+        Payment.objects.bulk_create(
+            Payment(
+                user=user, membership_id=plan.id, money_to_pay=100,
+                type=Payment.TypeChoices.MEMBERSHIP_PURCHASE, status=status
+            )
+            for user in users
+            for status in Payment.StatusChoices.values
+        )
+        Membership.objects.bulk_create(
+            Membership(
+                member=user, plan=plan, start_date=date.today(),
+                end_date=date.today() + timedelta(days=30), price_at_purchase=plan.price,
+                status=status
+            )
+            for user in users
+            for status in Membership.Status.values
+        )
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return users[0]
+
+    def assert_index_scan(self, queryset, *indexes):
+        # The planner picks between the composite and the partial index by backend.
+        plan = queryset.explain()
+        assert any(index in plan for index in indexes), plan
+        assert "Seq Scan" not in plan, plan
+
+    def test_checkout_recent_pending_payment_uses_index(self, seeded_user):
+        self.assert_index_scan(Payment.objects.filter(
+            user=seeded_user,
+            membership_id=1,
+            status=Payment.StatusChoices.PENDING,
+            created_at__gte=timezone.now() - timedelta(minutes=15),
+        ), "payment_pending_idx", "payment_user_plan_status_idx")
+
+    def test_checkout_active_membership_uses_index(self, seeded_user):
+        self.assert_index_scan(Membership.objects.filter(
+            member=seeded_user, status=Membership.Status.ACTIVE
+        ), "membership_member_status_idx")
+
+    def test_live_membership_check_uses_index(self, seeded_user):
+        self.assert_index_scan(Membership.objects.filter(
+            member=seeded_user, status__in=["ACTIVE", "FROZEN"]
+        ), "membership_live_idx", "membership_member_status_idx")
+
+
+@pytest.mark.django_db
+class TestPaymentHistoryKeysetPagination:
+
+    @pytest.fixture
+    def client_with_history(self):
+        user = User.objects.create_user(email="test@fitness.com", password="password")
+        created_at = timezone.now()
+        payments = Payment.objects.bulk_create(
+            Payment(
+                user=user, membership_id=1, money_to_pay=100,
+                type=Payment.TypeChoices.MEMBERSHIP_PURCHASE
+            )
+            for _ in range(45)
+        )
+        # Ties on created_at must still page deterministically by id.
+        Payment.objects.filter(id__in=[p.id for p in payments[:10]]).update(created_at=created_at)
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client, user
+
+    def test_cursor_walks_history_in_order(self, client_with_history, django_assert_num_queries):
+        client, user = client_with_history
+        expected = list(
+            Payment.objects.filter(user=user).order_by("-created_at", "-id").values_list("id", flat=True)
+        )
+
+        seen = []
+        url = reverse("payments:history") + "?cursor="
+        while url:
+            with django_assert_num_queries(1):
+                response = client.get(url)
+            assert response.status_code == 200
+            assert "count" not in response.data
+            seen += [row["id"] for row in response.data["results"]]
+            url = response.data["next"]
+
+        assert seen == expected
+
+    def test_page_numbers_still_work_without_cursor(self, client_with_history):
+        client, _ = client_with_history
+        response = client.get(reverse("payments:history") + "?page=3")
+        assert response.data["count"] == 45
+        assert len(response.data["results"]) == 5
+
+    def test_invalid_cursor_is_404(self, client_with_history):
+        client, _ = client_with_history
+        for cursor in ("garbage", "WyJub3QtYS1kYXRlIiwgIjEiXQ=="):
+            response = client.get(reverse("payments:history") + f"?cursor={cursor}")
+            assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestPendingPaymentReconciliation:
+
+    @pytest.fixture
+    def stale_payments(self):
+        plan = MembershipPlan.objects.create(
+            name="Standard", code="standard", duration_days=30, price=100.00
+        )
+        users = User.objects.bulk_create(
+            User(email=f"member{i}@fitness.com") for i in range(5)
+        )
+        payments = Payment.objects.bulk_create(
+            Payment(
+                user=user, membership_id=plan.id, money_to_pay=100, session_id=f"cs_{i}",
+                type=Payment.TypeChoices.MEMBERSHIP_PURCHASE
+            )
+            for i, user in enumerate(users)
+        )
+        Payment.objects.update(created_at=timezone.now() - timedelta(hours=2))
+        return payments
+
+    @pytest.mark.usefixtures("stale_payments")
+    def test_sessions_are_settled_in_bulk(self):
+        sessions = {
+            "cs_0": {"status": "complete", "payment_status": "paid"},
+            "cs_1": {"status": "complete", "payment_status": "paid"},
+            "cs_2": {"status": "expired", "payment_status": "unpaid"},
+            "cs_3": {"status": "open", "payment_status": "unpaid"},
+        }
+
+        def fake_retrieve(session_id):
+            if session_id not in sessions:
+                raise stripe.error.APIConnectionError("Stripe is down")
+            return sessions[session_id]
+
+        summary = reconcile_pending_payments(retrieve_session=fake_retrieve, batch_size=2)
+
+        assert summary == {"checked": 5, "paid": 2, "expired": 1, "errors": 1}
+        statuses = dict(Payment.objects.values_list("session_id", "status"))
+        assert statuses == {
+            "cs_0": "PAID", "cs_1": "PAID", "cs_2": "EXPIRED", "cs_3": "PENDING", "cs_4": "PENDING"
+        }
+        assert Membership.objects.filter(status=Membership.Status.ACTIVE).count() == 2
+
+    def test_recent_and_settled_payments_are_skipped(self, stale_payments):
+        Payment.objects.filter(id=stale_payments[0].id).update(created_at=timezone.now())
+        Payment.objects.filter(id=stale_payments[1].id).update(status=Payment.StatusChoices.PAID)
+        looked_up = []
+
+        def fake_retrieve(session_id):
+            looked_up.append(session_id)
+            return {"status": "open", "payment_status": "unpaid"}
+
+        reconcile_pending_payments(retrieve_session=fake_retrieve)
+
+        assert sorted(looked_up) == ["cs_2", "cs_3", "cs_4"]
+
+
+@pytest.mark.django_db
+class TestPaymentExport:
+
+    @pytest.fixture(autouse=True)
+    def payments(self, staff_user):
+        Payment.objects.bulk_create(
+            Payment(
+                user=staff_user, membership_id=1, money_to_pay=10 + i, status=status,
+                type=Payment.TypeChoices.MEMBERSHIP_PURCHASE
+            )
+            for i, status in enumerate([Payment.StatusChoices.PAID] * 3 + [Payment.StatusChoices.FAILED])
+        )
+
+    def test_csv_export_is_streamed_and_filtered(self, staff_client):
+        response = staff_client.get(reverse("payments:export") + "?status=PAID")
+
+        assert response.status_code == 200
+        assert response.streaming
+        assert response["Content-Type"].startswith("text/csv")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        assert lines[0].startswith("id,user_id,user__email")
+        assert len(lines) == 4
+
+    def test_ndjson_export(self, staff_client):
+        response = staff_client.get(reverse("payments:export") + "?format=ndjson&status=FAILED")
+
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        assert [row["money_to_pay"] for row in rows] == ["13.00"]
+        assert rows[0]["user__email"] == "staff@fitness.com"
+
+    def test_invalid_filter_is_rejected(self, staff_client):
+        response = staff_client.get(reverse("payments:export") + "?status=NOPE")
+        assert response.status_code == 400
+
+    def test_export_is_staff_only(self, client):
+        user = User.objects.create_user(email="test@fitness.com", password="password")
+        client.force_login(user)
+        assert client.get(reverse("payments:export")).status_code == 403
+
+    @pytest.mark.usefixtures("staff_client")
+    def test_export_command_writes_file(self, tmp_path):
+        output = tmp_path / "payments.ndjson"
+        call_command("export_payments", str(output), "--format=ndjson", "--status=PAID")
+
+        assert len(output.read_text().splitlines()) == 3
+
+
+@pytest.mark.django_db
+class TestPaymentListQueryCount:
+
+    @pytest.fixture(params=[10, 1000])
+    def staff(self, request):
+        staff = User.objects.create_superuser(email="staff@fitness.com", password="password")
+        users = User.objects.bulk_create(
+            User(email=f"member{i}@fitness.com") for i in range(request.param)
+        )
+        Payment.objects.bulk_create(
+            Payment(
+                user=user, membership_id=1, money_to_pay=100,
+                type=Payment.TypeChoices.MEMBERSHIP_PURCHASE
+            )
+            for user in users + [staff] * request.param
+        )
+        StripeCustomer.objects.bulk_create(
+            StripeCustomer(user=user, stripe_customer_id=f"cus_{user.id}") for user in users
+        )
+        StripeEvent.objects.bulk_create(
+            StripeEvent(event_id=f"evt_{i}", type="checkout.session.completed", payload={})
+            for i in range(request.param)
+        )
+        return staff
+
+    def test_payment_history(self, staff, django_assert_num_queries):
+        client = APIClient()
+        client.force_authenticate(user=staff)
+
+        with django_assert_num_queries(2):
+            response = client.get(reverse("payments:history"))
+
+        assert response.status_code == 200
+
+    # No unfiltered COUNT(*) besides the capped one; payments add the date hierarchy range.
+    @pytest.mark.parametrize("changelist, queries", [
+        ("admin:payments_payment_changelist", 6),
+        ("admin:payments_stripecustomer_changelist", 4),
+        ("admin:payments_stripeevent_changelist", 5),
+    ])
+    def test_admin_changelists(
+        self, staff, client, changelist, queries, django_assert_num_queries
+    ):
+        client.force_login(staff)
+
+        with django_assert_num_queries(queries):
+            response = client.get(reverse(changelist))
+
+        assert response.status_code == 200
+
+
+@pytest.fixture
+def fake_stripe():
+    backend = FakeStripe()
+    stripe_client = StripeClient(
+        "sk_test",
+        http_client=FakeStripeHTTPClient(backend),
+        max_network_retries=0,
+        breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60),
+    )
+    with patch("apps.payments.stripe_helper.get_stripe_client", return_value=stripe_client):
+        yield backend, stripe_client
+
+
+@pytest.mark.django_db
+class TestStripeClient:
+
+    @pytest.fixture
+    def member_client(self):
+        user = User.objects.create(email="member@fitness.com")
+        MembershipPlan.objects.create(id=1, name="Standard", duration_days=30, price=100.00)
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    def checkout(self, client):
+        return client.post(reverse("payments:create-checkout-session"), {"membership": 1}, format="json")
+
+    def test_checkout_goes_through_the_client(self, fake_stripe, member_client):
+        backend, _ = fake_stripe
+
+        response = self.checkout(member_client)
+
+        assert response.status_code == 201
+        payment = Payment.objects.get()
+        assert payment.session_id in backend.sessions
+        assert response.data["checkout_url"] == backend.sessions[payment.session_id]["url"]
+        assert StripeCustomer.objects.get().stripe_customer_id in backend.customers
+
+    def test_checkout_fails_fast_once_the_circuit_opens(self, fake_stripe, member_client):
+        backend, stripe_client = fake_stripe
+        backend.fail_with = 500
+
+        for _ in range(2):
+            assert self.checkout(member_client).status_code == 400
+            Payment.objects.update(status=Payment.StatusChoices.FAILED)
+        assert stripe_client.breaker.state == CircuitBreaker.OPEN
+        calls = len(backend.requests)
+
+        response = self.checkout(member_client)
+
+        assert response.status_code == 503
+        assert len(backend.requests) == calls
+        payment = Payment.objects.latest("id")
+        assert payment.status == Payment.StatusChoices.FAILED
+        assert payment.error_message == "Stripe is temporarily unavailable. Try again later."
+
+    def test_declines_do_not_trip_the_breaker(self, fake_stripe):
+        backend, stripe_client = fake_stripe
+        backend.fail_with = 400
+
+        for _ in range(3):
+            with pytest.raises(stripe.error.InvalidRequestError):
+                stripe_client.retrieve_checkout_session("cs_missing")
+
+        assert stripe_client.breaker.state == CircuitBreaker.CLOSED
+
+    def test_breaker_lets_one_trial_call_through_after_the_timeout(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+
+        breaker.before_call()
+        with pytest.raises(Exception, match="Circuit is open"):
+            breaker.before_call()
+
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_stub_server_over_the_pooled_transport(self):
+        server = make_fake_stripe_server()
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            host, port = server.server_address
+            stripe_client = StripeClient("sk_test", api_base=f"http://{host}:{port}", max_network_retries=0)
+
+            created = stripe_client.create_checkout_session({"customer": "cus_1", "metadata": {"payment_id": 7}})
+            session = stripe_client.retrieve_checkout_session(created.id)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert session.id == created.id
+        assert session.metadata["payment_id"] == "7"
+
+    def test_async_calls_from_one_event_loop_per_request(self):
+        # Like async views under WSGI, where every request runs on an event loop of its own.
+        server = make_fake_stripe_server()
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            host, port = server.server_address
+            stripe_client = StripeClient(
+                "sk_test",
+                api_base=f"http://{host}:{port}",
+                max_network_retries=0,
+                breaker=CircuitBreaker(failure_threshold=1),
+            )
+            sessions = [
+                asyncio.run(stripe_client.create_checkout_session_async({"customer": "cus_1"}))
+                for _ in range(3)
+            ]
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert len({session.id for session in sessions}) == 3
+        assert stripe_client.breaker.state == CircuitBreaker.CLOSED
+
+    def test_errors_of_this_process_do_not_trip_the_breaker(self, fake_stripe):
+        _, stripe_client = fake_stripe
+        error = stripe.error.APIConnectionError("Unexpected error communicating with Stripe.")
+        error.__cause__ = RuntimeError("Event loop is closed")
+        stripe_client.breaker.failure_threshold = 1
+
+        stripe_client._record_error(error)
+        stripe_client._record_error(ValueError("bad params"))
+
+        assert stripe_client.breaker.state == CircuitBreaker.CLOSED
+
+    def test_open_circuit_counts_as_a_reconciliation_error(self, fake_stripe):
+        _, stripe_client = fake_stripe
+        stripe_client.breaker.record_failure()
+        stripe_client.breaker.record_failure()
+        user = User.objects.create(email="member@fitness.com")
+        Payment.objects.create(user=user, membership_id=1, money_to_pay=100, session_id="cs_1")
+        Payment.objects.update(created_at=timezone.now() - timedelta(hours=2))
+
+        with pytest.raises(StripeUnavailable):
+            stripe_client.retrieve_checkout_session("cs_1")
+        summary = reconcile_pending_payments(retrieve_session=stripe_client.retrieve_checkout_session)
+
+        assert summary["errors"] == 1
+
+
+@pytest.mark.django_db
+class TestStripeCustomerProvisioning:
+
+    @pytest.fixture
+    def user(self):
+        return User.objects.create(email="member@fitness.com")
+
+    def test_customer_id_is_cached(self, fake_stripe, user, django_assert_num_queries):
+        backend, _ = fake_stripe
+        customer_id = get_or_create_stripe_customer(user)
+
+        with django_assert_num_queries(0):
+            assert get_or_create_stripe_customer(user) == customer_id
+        assert len(backend.customers) == 1
+
+    def test_concurrent_creation_keeps_one_customer(self, fake_stripe, user):
+        backend, stripe_client = fake_stripe
+        create_customer = stripe_client.create_customer
+
+        def create_while_racing(params, idempotency_key=None):
+            # Another request creates the customer while this one waits on Stripe.
+            customer = create_customer(params, idempotency_key=idempotency_key)
+            StripeCustomer.objects.create(user=user, stripe_customer_id=customer.id)
+            return create_customer(params, idempotency_key=idempotency_key)
+
+        with patch.object(stripe_client, "create_customer", side_effect=create_while_racing):
+            customer_id = get_or_create_stripe_customer(user)
+
+        assert len(backend.customers) == 1
+        assert StripeCustomer.objects.get().stripe_customer_id == customer_id
+
+    def test_provisioning_task_creates_the_customer(self, fake_stripe, user):
+        backend, _ = fake_stripe
+
+        customer_id = provision_stripe_customer_task(user.id)
+
+        assert StripeCustomer.objects.get(user=user).stripe_customer_id == customer_id
+        assert customer_id in backend.customers
+        assert provision_stripe_customer_task(user.id + 1) is None
+
+
+@pytest.mark.django_db
+class TestAsyncCheckout:
+
+    @pytest.fixture
+    def auth_headers(self):
+        user = User.objects.create(email="member@fitness.com")
+        MembershipPlan.objects.create(id=1, name="Standard", duration_days=30, price=100.00)
+        return {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"}
+
+    def checkout(self, client, **headers):
+        return client.post(
+            reverse("payments:create-checkout-session-async"),
+            {"membership": 1},
+            content_type="application/json",
+            **headers,
+        )
+
+    def test_checkout_session_is_created(self, fake_stripe, client, auth_headers):
+        backend, _ = fake_stripe
+
+        response = self.checkout(client, **auth_headers)
+
+        assert response.status_code == 201
+        payment = Payment.objects.get()
+        assert payment.session_id in backend.sessions
+        assert response.json()["checkout_url"] == payment.session_url
+        assert self.checkout(client, **auth_headers).json()["checkout_url"] == payment.session_url
+        assert len(backend.sessions) == 1
+
+    def test_requires_a_token(self, client):
+        assert self.checkout(client).status_code == 401
+        assert self.checkout(client, HTTP_AUTHORIZATION="Bearer broken").status_code == 401
+
+    def test_fails_fast_when_stripe_is_unavailable(self, fake_stripe, client, auth_headers):
+        _, stripe_client = fake_stripe
+        stripe_client.breaker.record_failure()
+        stripe_client.breaker.record_failure()
+
+        response = self.checkout(client, **auth_headers)
+
+        assert response.status_code == 503
+        payment = Payment.objects.get()
+        assert payment.status == Payment.StatusChoices.FAILED
+        assert payment.error_message == "Stripe is temporarily unavailable. Try again later."
+
+
+@pytest.mark.django_db
+class TestPaymentAdmin:
+
+    @pytest.fixture
+    def payments(self):
+        users = User.objects.bulk_create(User(email=f"member{i}@fitness.com") for i in range(50))
+        return Payment.objects.bulk_create(
+            Payment(
+                user=users[i % 50], membership_id=1, money_to_pay=100, session_id=f"cs_{i}",
+                type=Payment.TypeChoices.MEMBERSHIP_PURCHASE,
+            )
+            for i in range(500)
+        )
+
+    @pytest.fixture
+    def admin_client(self, client):
+        client.force_login(User.objects.create_superuser(email="staff@fitness.com", password="pw"))
+        return client
+
+    @pytest.mark.usefixtures("payments")
+    def test_changelist_query_count(self, admin_client, django_assert_max_num_queries):
+        with django_assert_max_num_queries(8):
+            response = admin_client.get(reverse("admin:payments_payment_changelist"))
+
+        assert response.status_code == 200
+        assert response.context["cl"].result_count == 500
+
+    @pytest.mark.parametrize(
+        ("term", "expected"),
+        [("MEMBER3@fitness.com", 10), ("cs_7", 1), ("cs", 0)],
+    )
+    @pytest.mark.usefixtures("payments")
+    def test_search_routes(self, admin_client, term, expected):
+        response = admin_client.get(reverse("admin:payments_payment_changelist"), {"q": term})
+
+        assert response.context["cl"].result_count == expected
+
+    def test_counts_are_capped(self, admin_client, payments):
+        with patch("core.admin.EstimatedCountPaginator.exact_count_limit", 100):
+            response = admin_client.get(reverse("admin:payments_payment_changelist"))
+
+        assert response.context["cl"].result_count == 100
+        assert str(payments[0].id) in admin_client.get(
+            reverse("admin:payments_payment_changelist"), {"q": str(payments[0].id)}
+        ).content.decode()
@@ -1,18 +1,26 @@
 from django.urls import path
 from .views import (
     StripeCheckoutView,
+    AsyncStripeCheckoutView,
     stripe_webhook,
     payment_cancel,
     payment_success,
     PaymentHistoryView,
+    PaymentExportView,
 )
 
 urlpatterns = [
     path("create-checkout-session/", StripeCheckoutView.as_view(), name="create-checkout-session"),
+    path(
+        "create-checkout-session/async/",
+        AsyncStripeCheckoutView.as_view(),
+        name="create-checkout-session-async",
+    ),
     path("webhook/", stripe_webhook, name="stripe-webhook"),
     path("success/", payment_success, name="success"),
     path("cancel/", payment_cancel, name="cancel"),
     path("history/", PaymentHistoryView.as_view(), name="history"),
+    path("export/", PaymentExportView.as_view(), name="export"),
 ]
 
 app_name = "payments"
\ No newline at end of file
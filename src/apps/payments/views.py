@@ -1,54 +1,69 @@
+import json
 import stripe
 import logging
 
 from datetime import date, timedelta
 
+from django.db import transaction
+from asgiref.sync import sync_to_async
+from django.utils.decorators import method_decorator
+from django.views import View
 from django.views.decorators.csrf import csrf_exempt
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from rest_framework import status, generics
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
 
 
+from apps.payments.exports import PAYMENT_EXPORT_FIELDS, payment_export_queryset
 from apps.payments.serializers import PaymentCreateSerializer, PaymentListSerializer
-from apps.payments.models import Payment
-from apps.payments.stripe_helper import create_checkout_session
-from apps.plans.models import MembershipPlan
+from apps.payments.models import Payment, StripeEvent
+from apps.payments.stripe_client import StripeUnavailable
+from apps.payments.stripe_helper import acreate_checkout_session, create_checkout_session
+from apps.payments.tasks import process_stripe_events_task
+from apps.plans.cache import plan_catalog
+from apps.plans.permissions import IsAuthenticatedStaff
 from apps.membership.models import Membership
+from core.export import EXPORT_RENDERERS, streaming_export_response
+from core.pagination import KeysetPagination
 from decouple import config
 
 logger = logging.getLogger(__name__)
 
-def create_or_update_membership(payment):
-    try:
-        plan = MembershipPlan.objects.get(id=payment.membership_id)
-        membership = Membership.objects.filter(member=payment.user).first()
+RECENT_CHECKOUT_WINDOW = timedelta(minutes=15)
+
+
+def checkout_quote(new_plan, current_membership, current_plan):
+    """
+    Amount and payment type for buying ``new_plan``: the full price, or an upgrade fee
+    with the unused days of the current plan credited. None if ``new_plan`` is not an
+    upgrade of the current plan.
+    """
+    money_to_pay = new_plan.price
+    payment_type = Payment.TypeChoices.MEMBERSHIP_PURCHASE
+
+    #Calculating UpgradeFee
+    if current_membership:
+        if new_plan.price <= current_plan.price:
+            return None
+
         today = date.today()
+        if current_membership.end_date > today:
 
-        if membership and membership.end_date > today:
-            start_date = membership.end_date
-        else:
-            start_date = today
-
-        end_date = start_date + timedelta(days=plan.duration_days)
-
-        Membership.objects.update_or_create(
-            member=payment.user,
-            defaults={
-                'plan': plan,
-                'start_date': start_date,
-                'end_date': end_date,
-                'status': Membership.Status.ACTIVE,
-                'price_at_purchase': plan.price
-            }
-        )
-        logger.info(f"Membership updated for {payment.user.email}. Ends: {end_date}")
+            remaining_days = (current_membership.end_date - today).days
+
+            price_per_day_old = current_plan.price / current_plan.duration_days
+            credit = price_per_day_old * remaining_days
+            money_to_pay = max(0, new_plan.price - credit)
+            payment_type = Payment.TypeChoices.UPGRADE_FEE
+
+    return money_to_pay, payment_type
 
-    except MembershipPlan.DoesNotExist:
-        logger.error(f"Plan {payment.membership_id} not found.")
 
 class StripeCheckoutView(APIView):
     """
@@ -63,11 +78,11 @@ class StripeCheckoutView(APIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         membership_id = serializer.validated_data["membership_id"]
-        new_plan = MembershipPlan.objects.get(id=membership_id)
+        new_plan = plan_catalog.get(membership_id)
         user = request.user
 
         #Idempotency on Django side
-        time_threshold = timezone.now() - timedelta(minutes=15)
+        time_threshold = timezone.now() - RECENT_CHECKOUT_WINDOW
 
         recent_payment = Payment.objects.filter(
             user=user,
@@ -81,32 +96,21 @@ class StripeCheckoutView(APIView):
             return Response({"checkout_url": recent_payment.session_url}, status=status.HTTP_200_OK)
 
         #Current membership for upgrade
-        current_membership = Membership.objects.filter(
-            member=user,
-            status=Membership.Status.ACTIVE,
-        ).first()
-
-        money_to_pay = new_plan.price
-        payment_type = Payment.TypeChoices.MEMBERSHIP_PURCHASE
-
-        #Calculating UpgradeFee
-        if current_membership:
-
-            if new_plan.price <= current_membership.plan.price:
-                return Response(
-                    {"error": "You can choose only higher price plan to upgrade."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            today = date.today()
-            if current_membership.end_date > today:
-
-                remaining_days = (current_membership.end_date - today).days
-
-                price_per_day_old = current_membership.plan.price / current_membership.plan.duration_days
-                credit = price_per_day_old * remaining_days
-                money_to_pay = max(0, new_plan.price - credit)
-                payment_type = Payment.TypeChoices.UPGRADE_FEE
+        current_membership = None
+        if user.current_membership_id:
+            current_membership = Membership.objects.filter(
+                pk=user.current_membership_id,
+                status=Membership.Status.ACTIVE,
+            ).first()
+        current_plan = plan_catalog.get(current_membership.plan_id) if current_membership else None
+
+        quote = checkout_quote(new_plan, current_membership, current_plan)
+        if quote is None:
+            return Response(
+                {"error": "You can choose only higher price plan to upgrade."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        money_to_pay, payment_type = quote
 
         payment = Payment.objects.create(
             user=user,
@@ -128,6 +132,13 @@ class StripeCheckoutView(APIView):
 
             return Response({"checkout_url": session.url}, status=status.HTTP_201_CREATED)
 
+        except StripeUnavailable:
+            # The payment is already marked FAILED with a retry hint, answer right away.
+            return Response(
+                {"error": "Payment provider is temporarily unavailable. Try again later."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
         except Exception as e:
             payment.status = Payment.StatusChoices.FAILED
             payment.error_message = str(e)
@@ -135,15 +146,130 @@ class StripeCheckoutView(APIView):
             return Response({"error": "Failed to create Stripe session."}, status=status.HTTP_400_BAD_REQUEST)
 
 
+async def _aauthenticate(request):
+    try:
+        result = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncStripeCheckoutView(View):
+    """
+    Async variant of StripeCheckoutView for ASGI servers (uvicorn): the ORM queries and
+    the Stripe round trip are awaited, so a checkout waiting on Stripe does not hold a
+    worker thread. Same payload, JWT auth and responses as the sync view.
+    """
+    http_method_names = ["post"]
+
+    async def post(self, request):
+        user = await _aauthenticate(request)
+        if user is None:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return JsonResponse({"detail": "JSON parse error."}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = PaymentCreateSerializer(data=data)
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        membership_id = serializer.validated_data["membership_id"]
+        new_plan = await sync_to_async(plan_catalog.get)(membership_id)
+
+        recent_payment = await Payment.objects.filter(
+            user=user,
+            membership_id=membership_id,
+            status=Payment.StatusChoices.PENDING,
+            created_at__gte=timezone.now() - RECENT_CHECKOUT_WINDOW,
+        ).afirst()
+
+        if recent_payment and recent_payment.session_url:
+            logger.info(f"Returning existing session for payment {recent_payment.id}")
+            return JsonResponse({"checkout_url": recent_payment.session_url}, status=status.HTTP_200_OK)
+
+        current_membership = None
+        if user.current_membership_id:
+            current_membership = await Membership.objects.filter(
+                pk=user.current_membership_id,
+                status=Membership.Status.ACTIVE,
+            ).afirst()
+        current_plan = None
+        if current_membership:
+            current_plan = await sync_to_async(plan_catalog.get)(current_membership.plan_id)
+
+        quote = checkout_quote(new_plan, current_membership, current_plan)
+        if quote is None:
+            return JsonResponse(
+                {"error": "You can choose only higher price plan to upgrade."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        money_to_pay, payment_type = quote
+
+        payment = await Payment.objects.acreate(
+            user=user,
+            membership_id=membership_id,
+            money_to_pay=money_to_pay,
+            type=payment_type,
+            status=Payment.StatusChoices.PENDING,
+        )
+
+        try:
+            session = await acreate_checkout_session(
+                payment=payment,
+                success_url=request.build_absolute_uri(reverse('payments:success')) + "?session_id={CHECKOUT_SESSION_ID}",
+                cancel_url=request.build_absolute_uri(reverse('payments:cancel')),
+            )
+        except StripeUnavailable:
+            return JsonResponse(
+                {"error": "Payment provider is temporarily unavailable. Try again later."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        except Exception as e:
+            payment.status = Payment.StatusChoices.FAILED
+            payment.error_message = str(e)
+            await payment.asave()
+            return JsonResponse({"error": "Failed to create Stripe session."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return JsonResponse({"checkout_url": session.url}, status=status.HTTP_201_CREATED)
+
+
+class PaymentHistoryPagination(KeysetPagination):
+    keyset_ordering = ("-created_at", "-id")
+
+
 class PaymentHistoryView(generics.ListAPIView):
     """
     Returns the payment history for the current authenticated user.
     """
     permission_classes = [IsAuthenticated]
     serializer_class = PaymentListSerializer
+    pagination_class = PaymentHistoryPagination
 
     def get_queryset(self):
-        return Payment.objects.filter(user=self.request.user).order_by('-created_at')
+        return Payment.objects.filter(user=self.request.user).order_by('-created_at', '-id')
+
+class PaymentExportView(APIView):
+    """
+    Streams all payments matching the filters as CSV or NDJSON (?format=csv|ndjson).
+    """
+    permission_classes = [IsAuthenticatedStaff]
+    renderer_classes = EXPORT_RENDERERS
+
+    def get(self, request):
+        return streaming_export_response(
+            payment_export_queryset(request.query_params),
+            PAYMENT_EXPORT_FIELDS,
+            request.accepted_renderer,
+            "payments",
+        )
+
 
 def payment_success(request):
     session_id = request.GET.get('session_id')
@@ -168,27 +294,20 @@ def stripe_webhook(request):
         logger.warning(f"Invalid webhook signature: {str(e)}")
         return HttpResponse(status=400)
 
-    stripe_obj = event.data.object
-    metadata = stripe_obj.get("metadata", {})
-    payment_id = metadata.get("payment_id")
-
-    if event.type == "checkout.session.completed":
-        if payment_id:
-            payment = Payment.objects.filter(id=payment_id).first()
-            if payment and payment.status == Payment.StatusChoices.PENDING:
-                payment.status = Payment.StatusChoices.PAID
-                payment.save()
-                create_or_update_membership(payment)
-                logger.info(f"Payment {payment_id} marked as PAID.")
-
-    elif event.type == "payment_intent.payment_failed":
-        if payment_id:
-            payment = Payment.objects.filter(id=payment_id).first()
-            if payment:
-                error_msg = stripe_obj.get("last_payment_error", {}).get("message", "Unknown error")
-                payment.status = Payment.StatusChoices.FAILED
-                payment.error_message = error_msg
-                payment.save()
-                logger.error(f"Payment {payment_id} failed: {error_msg}")
-
-    return HttpResponse(status=200)
\ No newline at end of file
+    _, created = StripeEvent.objects.get_or_create(
+        event_id=event.id,
+        defaults={"type": event.type, "payload": json.loads(payload)},
+    )
+
+    if created:
+        transaction.on_commit(_enqueue_event_processing)
+
+    return HttpResponse(status=200)
+
+
+def _enqueue_event_processing():
+    # The beat schedule drains the inbox anyway, so a broker hiccup must not fail the webhook.
+    try:
+        process_stripe_events_task.delay()
+    except Exception as e:
+        logger.warning(f"Could not enqueue Stripe event processing: {str(e)}")
@@ -7,3 +7,4 @@ from apps.plans.models import MembershipPlan
 class MembershipPlanAdmin(admin.ModelAdmin):
     list_display = ("name", "tier", "price", "duration_days")
     prepopulated_fields = {"code": ("name",)}
+    search_fields = ("name", "code")
@@ -0,0 +1,89 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.plans.models import MembershipPlan
+
+
+class PlanCatalog:
+    """
+    Two-level cache of the membership plan catalog.
+
+    Every process keeps the catalog in memory for PLAN_CATALOG_LOCAL_TTL seconds and
+    then re-checks the shared cache (Redis in production). The shared entry is tagged
+    with a catalog version, bumped on every plan change, so a stale copy written by a
+    slow reader is never served after an invalidation.
+
+    Returned plans are shared between requests and must not be mutated.
+    """
+
+    CATALOG_KEY = "plans:catalog"
+    VERSION_KEY = "plans:catalog:version"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = None
+        self._local_expires_at = 0.0
+
+    def all(self) -> list[MembershipPlan]:
+        return list(self._catalog()["plans"].values())
+
+    def get(self, plan_id) -> MembershipPlan | None:
+        try:
+            return self._catalog()["plans"].get(int(plan_id))
+        except (TypeError, ValueError):
+            return None
+
+    def in_bulk(self, plan_ids) -> dict[int, MembershipPlan]:
+        plans = self._catalog()["plans"]
+        return {plan_id: plans[plan_id] for plan_id in plan_ids if plan_id in plans}
+
+    @property
+    def version(self) -> int:
+        return self._catalog()["version"]
+
+    def warm(self):
+        self.clear_local()
+        self._catalog()
+
+    def invalidate(self):
+        # Millisecond timestamps keep versions unique even if the shared cache is flushed.
+        version = max(time.time_ns() // 1_000_000, cache.get(self.VERSION_KEY, 0) + 1)
+        cache.set(self.VERSION_KEY, version, timeout=None)
+        cache.delete(self.CATALOG_KEY)
+        self.clear_local()
+
+    def clear_local(self):
+        with self._lock:
+            self._local = None
+            self._local_expires_at = 0.0
+
+    def _catalog(self) -> dict:
+        local = self._local
+        if local is not None and time.monotonic() < self._local_expires_at:
+            return local
+
+        with self._lock:
+            shared = cache.get_many([self.CATALOG_KEY, self.VERSION_KEY])
+            version = shared.get(self.VERSION_KEY)
+            if version is None:
+                version = time.time_ns() // 1_000_000
+                cache.add(self.VERSION_KEY, version, timeout=None)
+                version = cache.get(self.VERSION_KEY, version)
+
+            catalog = shared.get(self.CATALOG_KEY)
+            if catalog is None or catalog["version"] != version:
+                catalog = {
+                    "version": version,
+                    "plans": {plan.id: plan for plan in MembershipPlan.objects.all()},
+                }
+                cache.set(self.CATALOG_KEY, catalog, timeout=None)
+
+            self._local = catalog
+            self._local_expires_at = time.monotonic() + settings.PLAN_CATALOG_LOCAL_TTL
+            return catalog
+
+
+plan_catalog = PlanCatalog()
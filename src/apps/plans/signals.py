@@ -0,0 +1,20 @@
+from celery.signals import worker_process_init
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.plans.cache import plan_catalog
+from apps.plans.models import MembershipPlan
+
+
+@receiver(post_save, sender=MembershipPlan)
+@receiver(post_delete, sender=MembershipPlan)
+def invalidate_plan_catalog(**_kwargs):
+    plan_catalog.invalidate()
+    # Once more after commit, so readers that raced the write cannot keep the old rows.
+    transaction.on_commit(plan_catalog.invalidate)
+
+
+@worker_process_init.connect
+def warm_plan_catalog(**_kwargs):
+    plan_catalog.warm()
@@ -0,0 +1,118 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.plans.cache import plan_catalog
+from apps.plans.models import MembershipPlan
+
+
+@pytest.mark.django_db
+class TestPlanCatalogCache:
+    def test_catalog_is_served_without_queries_once_warm(self, plan):
+        plan_catalog.warm()
+
+        with CaptureQueriesContext(connection) as queries:
+            assert plan_catalog.get(plan.id).name == "Standard"
+            assert plan_catalog.get(str(plan.id)) is not None
+            assert plan_catalog.get("missing") is None
+            assert [p.id for p in plan_catalog.all()] == [plan.id]
+
+        assert len(queries) == 0
+
+    def test_shared_layer_survives_local_expiry(self, plan):
+        plan_catalog.warm()
+        plan_catalog.clear_local()
+
+        with CaptureQueriesContext(connection) as queries:
+            assert plan_catalog.get(plan.id) is not None
+
+        assert len(queries) == 0
+
+    def test_save_and_delete_invalidate_catalog(self, plan):
+        version = plan_catalog.version
+
+        plan.price = 150
+        plan.save()
+        assert plan_catalog.get(plan.id).price == 150
+        assert plan_catalog.version != version
+
+        plan.delete()
+        assert plan_catalog.get(plan.id) is None
+
+
+@pytest.mark.django_db
+class TestPlanConditionalGet:
+    @pytest.mark.usefixtures("plan")
+    def test_unchanged_catalog_returns_304(self, staff_client):
+        url = reverse("plans-list")
+        response = staff_client.get(url)
+        assert response.status_code == 200
+        etag = response["ETag"]
+        assert response["Last-Modified"]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = staff_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert len(queries) == 0
+
+    def test_detail_and_filters_have_their_own_etags(self, staff_client, plan):
+        etags = {
+            staff_client.get(url)["ETag"]
+            for url in (
+                reverse("plans-list"),
+                reverse("plans-list") + "?tier=BASIC",
+                reverse("plans-detail", args=[plan.id]),
+            )
+        }
+        assert len(etags) == 3
+
+    def test_plan_change_invalidates_etag(self, staff_client, plan):
+        url = reverse("plans-detail", args=[plan.id])
+        etag = staff_client.get(url)["ETag"]
+
+        plan.price = 120
+        plan.save()
+
+        response = staff_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.data["price"] == "120.00"
+        assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+class TestPlanListQueryCount:
+    @pytest.fixture(params=[10, 1000])
+    def staff(self, request):
+        MembershipPlan.objects.bulk_create(
+            MembershipPlan(
+                name=f"Plan {i}",
+                code=f"plan-{i}",
+                duration_days=30,
+                price=10 + i,
+                tier=MembershipPlan.Tier.BASIC,
+            )
+            for i in range(request.param)
+        )
+        return get_user_model().objects.create_superuser(
+            email="staff@fitness.com", password="password"
+        )
+
+    def test_plan_list(self, staff, django_assert_num_queries):
+        client = APIClient()
+        client.force_authenticate(user=staff)
+
+        with django_assert_num_queries(3):
+            response = client.get(reverse("plans-list"))
+
+        assert response.status_code == 200
+
+    def test_plan_admin_changelist(self, staff, client, django_assert_num_queries):
+        client.force_login(staff)
+
+        with django_assert_num_queries(5):
+            response = client.get(reverse("admin:plans_membershipplan_changelist"))
+
+        assert response.status_code == 200
@@ -1,5 +1,10 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from rest_framework.viewsets import ModelViewSet
 
+from apps.plans.cache import plan_catalog
 from apps.plans.models import MembershipPlan
 from apps.plans.permissions import IsAuthenticatedStaff
 from apps.plans.serializers import MembershipPlanSerializer
@@ -10,3 +15,31 @@ class MembershipPlanViewSet(ModelViewSet):
     serializer_class = MembershipPlanSerializer
     permission_classes = (IsAuthenticatedStaff,)
     filterset_fields = ("tier",)
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request, super().retrieve, *args, **kwargs)
+
+    def _conditional(self, request, handler, *args, **kwargs):
+        """
+        Answer with 304 while the catalog version is unchanged, before any query or
+        serialization. The ETag also covers the path, so filters and pages differ.
+        """
+        version = plan_catalog.version
+        path_hash = hashlib.md5(request.get_full_path().encode(), usedforsecurity=False)
+        etag = quote_etag(f"{version}-{path_hash.hexdigest()[:16]}")
+        last_modified = int(version / 1000)
+
+        not_modified = get_conditional_response(
+            request._request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+        return response
@@ -2,11 +2,13 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
 from django.utils.translation import gettext as _
 
+from core.admin import LargeTableAdminMixin, looks_like_email
+
 from .models import User
 
 
 @admin.register(User)
-class UserAdmin(DjangoUserAdmin):
+class UserAdmin(LargeTableAdminMixin, DjangoUserAdmin):
     """Define admin model for custom User model with no email field."""
 
     fieldsets = (
@@ -24,8 +26,10 @@ class UserAdmin(DjangoUserAdmin):
                 )
             },
         ),
+        (_("Membership"), {"fields": ("access_card", "current_membership")}),
         (_("Important dates"), {"fields": ("last_login", "date_joined")}),
     )
+    readonly_fields = ("current_membership",)
     add_fieldsets = (
         (
             None,
@@ -36,5 +40,8 @@ class UserAdmin(DjangoUserAdmin):
         ),
     )
     list_display = ("email", "first_name", "last_name", "is_staff")
+    # Full addresses and ids (also from autocomplete widgets) use an index, other
+    # terms still search all three columns.
+    search_routes = ((looks_like_email, "email__iexact"), (str.isdigit, "pk"))
     search_fields = ("email", "first_name", "last_name")
     ordering = ("email",)
@@ -2,6 +2,7 @@ from typing import Any
 
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils.translation import gettext as _
 
 
@@ -49,8 +50,25 @@ class User(AbstractUser):
 
     username = None
     email = models.EmailField(_("email address"), unique=True)
+    access_card = models.CharField(
+        _("access card"), max_length=64, unique=True, null=True, blank=True
+    )
+    # Maintained by apps.membership.current, see there.
+    current_membership = models.ForeignKey(
+        "membership.Membership",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
     objects: Any = UserManager()
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Case-insensitive e-mail lookups (admin search, autocomplete).
+            models.Index(Upper("email"), name="user_email_upper_idx"),
+        ]
@@ -1 +1,57 @@
-# Create your tests here.
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestUserAdminQueryCount:
+    @pytest.mark.parametrize("rows", [10, 1000])
+    def test_user_admin_changelist(self, rows, client, django_assert_num_queries):
+        User.objects.bulk_create(User(email=f"member{i}@fitness.com") for i in range(rows))
+        client.force_login(User.objects.create_superuser(email="staff@fitness.com", password="pw"))
+
+        with django_assert_num_queries(5):
+            response = client.get(reverse("admin:user_user_changelist"))
+
+        assert response.status_code == 200
+
+
+@pytest.mark.django_db
+class TestRegistration:
+    @pytest.fixture
+    def client(self, client):
+        # Registration falls under the default IsAuthenticatedOrReadOnly permission.
+        client.force_login(User.objects.create(email="staff@fitness.com", is_staff=True))
+        return client
+
+    def test_stripe_customer_is_provisioned_after_commit(
+        self, client, django_capture_on_commit_callbacks
+    ):
+        with (
+            patch("apps.user.views.provision_stripe_customer_task.delay") as mock_delay,
+            django_capture_on_commit_callbacks(execute=True),
+        ):
+            response = client.post(
+                reverse("user:create"), {"email": "new@fitness.com", "password": "secret123"}
+            )
+
+        assert response.status_code == 201
+        mock_delay.assert_called_once_with(response.data["id"])
+
+    def test_registration_survives_a_broker_outage(
+        self, client, django_capture_on_commit_callbacks
+    ):
+        with (
+            patch("apps.user.views.provision_stripe_customer_task.delay", side_effect=OSError),
+            django_capture_on_commit_callbacks(execute=True),
+        ):
+            response = client.post(
+                reverse("user:create"), {"email": "new@fitness.com", "password": "secret123"}
+            )
+
+        assert response.status_code == 201
+        assert User.objects.filter(email="new@fitness.com").exists()
@@ -1,5 +1,7 @@
+import logging
 from typing import Any
 
+from django.db import transaction
 from rest_framework import generics
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.authtoken.views import ObtainAuthToken
@@ -7,12 +9,27 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.settings import api_settings
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from apps.payments.tasks import provision_stripe_customer_task
 from apps.user.serializers import AuthTokenSerializer, UserSerializer
 
+logger = logging.getLogger(__name__)
+
 
 class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
 
+    def perform_create(self, serializer) -> None:
+        user = serializer.save()
+        transaction.on_commit(lambda: _enqueue_customer_provisioning(user.id))
+
+
+def _enqueue_customer_provisioning(user_id: int) -> None:
+    # Checkout creates the customer itself if this never runs, so registration must not fail.
+    try:
+        provision_stripe_customer_task.delay(user_id)
+    except Exception as e:
+        logger.warning(f"Could not enqueue Stripe customer for user {user_id}: {str(e)}")
+
 
 class CreateTokenView(ObtainAuthToken):
     renderer_classes: Any = api_settings.DEFAULT_RENDERER_CLASSES
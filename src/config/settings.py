@@ -1,6 +1,7 @@
 from datetime import timedelta
 from pathlib import Path
 
+from celery.schedules import crontab
 from decouple import Csv, config
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -28,10 +29,14 @@ INSTALLED_APPS = [
     "apps.payments",
     "apps.user",
     "apps.membership",
+    "apps.monitoring",
+    "apps.bot",
+    "apps.analytics",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "apps.monitoring.middleware.RequestMetricsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -74,6 +79,29 @@ DATABASES = {
 }
 
 
+# Cache
+# Swap CACHE_BACKEND for django.core.cache.backends.locmem.LocMemCache to run without Redis
+CACHES = {
+    "default": {
+        "BACKEND": config("CACHE_BACKEND", default="django.core.cache.backends.redis.RedisCache"),
+        "LOCATION": config("CACHE_LOCATION", default="redis://localhost:6379/1"),
+    }
+}
+
+# Seconds a process trusts its local copy of the plan catalog before checking Redis
+PLAN_CATALOG_LOCAL_TTL = config("PLAN_CATALOG_LOCAL_TTL", default=30, cast=int)
+
+# Door access checks (apps.membership.access): entries live ACCESS_CACHE_TTL seconds in
+# Redis and ACCESS_LOCAL_TTL seconds in each process, so other workers see a membership
+# change after at most ACCESS_LOCAL_TTL seconds.
+ACCESS_CACHE_TTL = config("ACCESS_CACHE_TTL", default=300, cast=int)
+ACCESS_LOCAL_TTL = config("ACCESS_LOCAL_TTL", default=2, cast=float)
+ACCESS_LOCAL_MAX_ENTRIES = config("ACCESS_LOCAL_MAX_ENTRIES", default=100_000, cast=int)
+ACCESS_CHECK_MAX_BATCH = config("ACCESS_CHECK_MAX_BATCH", default=500, cast=int)
+# Bearer keys of the front desk scanners
+ACCESS_CHECK_API_KEYS = config("ACCESS_CHECK_API_KEYS", default="", cast=Csv())
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -186,6 +214,40 @@ CELERY_RESULT_BACKEND = config("CELERY_RESULT_BACKEND")
 CELERY_TIMEZONE = "Europe/Kyiv"
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
+CELERY_BEAT_SCHEDULE = {
+    # Before the expiry sweep, so memberships ending on a closed day are extended first.
+    "apply-facility-closures": {
+        "task": "apps.membership.tasks.apply_facility_closures_task",
+        "schedule": crontab(hour=0, minute=1),
+    },
+    "expire-memberships": {
+        "task": "apps.membership.tasks.expire_memberships_task",
+        "schedule": crontab(hour=0, minute=5),
+    },
+    "renew-memberships": {
+        "task": "apps.membership.tasks.schedule_renewals_task",
+        # Hourly, so charges that hit a Stripe outage are retried within the 24 hours
+        # Stripe keeps their idempotency key; runs with nothing due are a cheap index scan.
+        "schedule": crontab(minute=10),
+    },
+    "process-stripe-events": {
+        "task": "apps.payments.tasks.process_stripe_events_task",
+        "schedule": timedelta(minutes=1),
+    },
+    "reconcile-pending-payments": {
+        "task": "apps.payments.tasks.reconcile_pending_payments_task",
+        "schedule": timedelta(minutes=15),
+    },
+    # Webhook mode: picks up updates whose kick-off task never made it to the broker.
+    "process-telegram-updates": {
+        "task": "apps.bot.tasks.process_telegram_updates_task",
+        "schedule": timedelta(minutes=1),
+    },
+    "deliver-notifications": {
+        "task": "apps.bot.tasks.deliver_notifications_task",
+        "schedule": timedelta(minutes=1),
+    },
+}
 
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
@@ -202,3 +264,62 @@ if not DEBUG:
 STRIPE_SECRET_KEY = config("STRIPE_SECRET_KEY", default="")
 STRIPE_PUBLIC_KEY = config("STRIPE_PUBLIC_KEY", default="")
 STRIPE_WEBHOOK_SECRET = config("STRIPE_WEBHOOK_SECRET", default="")
+
+# Request metrics (apps.monitoring): published to the cache for /metrics/ every
+# METRICS_PUBLISH_INTERVAL seconds; snapshots of dead workers expire after METRICS_SHARED_TTL.
+METRICS_ENABLED = config("METRICS_ENABLED", default=True, cast=bool)
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+METRICS_PUBLISH_INTERVAL = config("METRICS_PUBLISH_INTERVAL", default=15, cast=float)
+METRICS_SHARED_TTL = config("METRICS_SHARED_TTL", default=300, cast=int)
+METRICS_SLOW_REQUEST_SECONDS = config("METRICS_SLOW_REQUEST_SECONDS", default=1.0, cast=float)
+METRICS_SLOW_REQUEST_SAMPLE_RATE = config("METRICS_SLOW_REQUEST_SAMPLE_RATE", default=0.1, cast=float)
+
+# Telegram notifications (apps.bot): nothing is queued without a bot token. Point
+# TELEGRAM_API_BASE at apps.bot.fake_api for load tests. Rates are Telegram's limits.
+TG_BOT_TOKEN = config("TG_BOT_TOKEN", default="")
+TELEGRAM_API_BASE = config("TELEGRAM_API_BASE", default="https://api.telegram.org")
+TELEGRAM_GLOBAL_RATE = config("TELEGRAM_GLOBAL_RATE", default=30, cast=float)
+TELEGRAM_CHAT_INTERVAL = config("TELEGRAM_CHAT_INTERVAL", default=1.0, cast=float)
+TELEGRAM_SEND_CONCURRENCY = config("TELEGRAM_SEND_CONCURRENCY", default=20, cast=int)
+# Bot subscription lookups: entries live TELEGRAM_SUBSCRIPTION_CACHE_TTL seconds in Redis and
+# TELEGRAM_SUBSCRIPTION_LOCAL_TTL seconds in each process's LRU of
+# TELEGRAM_SUBSCRIPTION_CACHE_SIZE entries, so other workers see a change after at most
+# TELEGRAM_SUBSCRIPTION_LOCAL_TTL seconds.
+TELEGRAM_SUBSCRIPTION_CACHE_SIZE = config("TELEGRAM_SUBSCRIPTION_CACHE_SIZE", default=10_000, cast=int)
+TELEGRAM_SUBSCRIPTION_CACHE_TTL = config("TELEGRAM_SUBSCRIPTION_CACHE_TTL", default=300, cast=int)
+TELEGRAM_SUBSCRIPTION_LOCAL_TTL = config("TELEGRAM_SUBSCRIPTION_LOCAL_TTL", default=2, cast=float)
+# Webhook mode: `manage.py run_bot --set-webhook` registers TELEGRAM_WEBHOOK_URL (the public
+# URL of /telegram/webhook/) and the secret; updates are stored by the web app and handled
+# by the Celery workers. Without a secret the endpoint is off.
+TELEGRAM_WEBHOOK_URL = config("TELEGRAM_WEBHOOK_URL", default="")
+TELEGRAM_WEBHOOK_SECRET = config("TELEGRAM_WEBHOOK_SECRET", default="")
+TELEGRAM_WEBHOOK_MAX_CONNECTIONS = config("TELEGRAM_WEBHOOK_MAX_CONNECTIONS", default=40, cast=int)
+
+# Staff analytics (apps.analytics): reports are cached per period, for ANALYTICS_CACHE_TTL
+# seconds while the period's last month is still running and for a day once it is over.
+ANALYTICS_CACHE_TTL = config("ANALYTICS_CACHE_TTL", default=300, cast=int)
+ANALYTICS_CLOSED_PERIOD_CACHE_TTL = config("ANALYTICS_CLOSED_PERIOD_CACHE_TTL", default=86400, cast=int)
+
+# Auto-renewal (apps.membership.renewals): memberships ending within RENEWAL_DAYS_AHEAD
+# days are split over at least RENEWAL_SHARDS Celery tasks, each with RENEWAL_CONCURRENCY
+# Stripe calls in flight. Shards times concurrency should stay within STRIPE_HTTP_POOL_SIZE
+# per worker and within the Stripe account's rate limit overall.
+# A shard starts no batch after RENEWAL_TIME_BUDGET seconds, so it is done before the next
+# hourly run. Busy days get more shards, each with at most RENEWAL_SHARD_CAPACITY
+# memberships: about what one shard renews within the budget at 0.3s per Stripe call (26/s,
+# see benchmarks/README.md). With a worker per shard the month-start run ends within the hour.
+RENEWAL_DAYS_AHEAD = config("RENEWAL_DAYS_AHEAD", default=1, cast=int)
+RENEWAL_SHARDS = config("RENEWAL_SHARDS", default=4, cast=int)
+RENEWAL_CONCURRENCY = config("RENEWAL_CONCURRENCY", default=8, cast=int)
+RENEWAL_TIME_BUDGET = config("RENEWAL_TIME_BUDGET", default=45 * 60, cast=int)
+RENEWAL_SHARD_CAPACITY = config("RENEWAL_SHARD_CAPACITY", default=60_000, cast=int)
+
+# Stripe HTTP client: an empty STRIPE_API_BASE means api.stripe.com, point it at a stub
+# server for local load tests. Timeouts are in seconds.
+STRIPE_API_BASE = config("STRIPE_API_BASE", default="")
+STRIPE_CONNECT_TIMEOUT = config("STRIPE_CONNECT_TIMEOUT", default=3, cast=float)
+STRIPE_READ_TIMEOUT = config("STRIPE_READ_TIMEOUT", default=10, cast=float)
+STRIPE_MAX_NETWORK_RETRIES = config("STRIPE_MAX_NETWORK_RETRIES", default=2, cast=int)
+STRIPE_HTTP_POOL_SIZE = config("STRIPE_HTTP_POOL_SIZE", default=10, cast=int)
+STRIPE_CIRCUIT_FAILURE_THRESHOLD = config("STRIPE_CIRCUIT_FAILURE_THRESHOLD", default=5, cast=int)
+STRIPE_CIRCUIT_RESET_TIMEOUT = config("STRIPE_CIRCUIT_RESET_TIMEOUT", default=30, cast=float)
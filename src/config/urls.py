@@ -12,6 +12,7 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/users/", include("apps.user.urls", namespace="user")),
     path("api/v1/", include("apps.plans.urls")),
+    path("api/v1/", include("apps.membership.urls")),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
         "api/docs/",
@@ -24,6 +25,9 @@ urlpatterns = [
         name="redoc",
     ),
     path("api/payments/", include("apps.payments.urls", namespace="payments")),
+    path("metrics/", include("apps.monitoring.urls", namespace="monitoring")),
+    path("telegram/", include("apps.bot.urls", namespace="bot")),
+    path("api/analytics/", include("apps.analytics.urls", namespace="analytics")),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,51 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    """Run every test against a fresh local-memory cache instead of Redis."""
+    from django.core.cache import cache
+
+    from apps.bot.subscriptions import subscription_cache
+    from apps.membership.access import access_cache
+    from apps.plans.cache import plan_catalog
+
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    }
+    cache.clear()
+    plan_catalog.clear_local()
+    access_cache.clear_local()
+    subscription_cache.clear_local()
+    yield
+    plan_catalog.clear_local()
+    access_cache.clear_local()
+    subscription_cache.clear_local()
+
+
+@pytest.fixture
+def plan(db):
+    from apps.plans.models import MembershipPlan
+
+    return MembershipPlan.objects.create(
+        name="Standard", code="standard", duration_days=30, price=100.00
+    )
+
+
+@pytest.fixture
+def staff_user(db):
+    from django.contrib.auth import get_user_model
+
+    return get_user_model().objects.create_user(
+        email="staff@fitness.com", password="password", is_staff=True
+    )
+
+
+@pytest.fixture
+def staff_client(staff_user):
+    """API client authenticated as a staff member."""
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.force_authenticate(user=staff_user)
+    return client
@@ -0,0 +1,65 @@
+from django.core.paginator import Paginator
+from django.db import connections, router
+from django.utils.functional import cached_property
+
+
+def estimated_row_count(model) -> int | None:
+    """The planner's row estimate for ``model``'s table on PostgreSQL, None elsewhere."""
+    connection = connections[router.db_for_read(model)]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    # -1 until the table has been vacuumed or analyzed once.
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never runs an unbounded COUNT(*).
+
+    Unfiltered lists of big PostgreSQL tables use the planner's estimate, everything
+    else is counted up to ``exact_count_limit`` rows; beyond that the last pages are
+    not linked, narrowing the filters brings them back.
+    """
+
+    exact_count_limit = 10_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model)
+            if estimate is not None and estimate > self.exact_count_limit:
+                return estimate
+        return queryset.order_by()[: self.exact_count_limit].count()
+
+
+def looks_like_email(term: str) -> bool:
+    return "@" in term
+
+
+class LargeTableAdminMixin:
+    """
+    Changelist settings for tables with millions of rows: estimated or capped counts,
+    no second count of the unfiltered table, and searches that hit one index.
+
+    ``search_routes`` are ``(predicate, lookup)`` pairs; a search term is matched with
+    the lookup of the first predicate that accepts it, e.g. e-mail addresses with
+    ``user__email__iexact``. Terms no route accepts fall back to ``search_fields``.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    search_routes = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        for accepts, lookup in self.search_routes:
+            if term and accepts(term):
+                return queryset.filter(**{lookup: term}), False
+        return super().get_search_results(request, queryset, search_term)
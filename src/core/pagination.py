@@ -0,0 +1,117 @@
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset (seek) mode.
+
+    Passing ``?cursor=`` switches a request to keyset mode: rows are ordered by
+    ``keyset_ordering`` (which must end with a unique field) and each page continues
+    after the last row of the previous one, so there is no COUNT(*) and no OFFSET and
+    deep pages cost the same as the first one. Without the parameter the regular
+    page-number responses are returned unchanged.
+    """
+
+    cursor_query_param = "cursor"
+    keyset_ordering: tuple[str, ...] = ("id",)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            self.keyset = False
+            return super().paginate_queryset(queryset, request, view)
+
+        self.keyset = True
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.keyset_ordering)
+        cursor = request.query_params[self.cursor_query_param]
+        if cursor:
+            try:
+                queryset = queryset.filter(self._seek(self._decode_cursor(cursor)))
+            except (ValidationError, ValueError, TypeError) as e:
+                raise NotFound("Invalid cursor.") from e
+
+        rows = list(queryset[: page_size + 1])
+        self.next_position = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            self.next_position = [
+                getattr(rows[-1], field.lstrip("-")) for field in self.keyset_ordering
+            ]
+        return rows
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self._encode_cursor(self.next_position)
+        )
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["next"]["description"] = (
+            f"With ?{self.cursor_query_param}= the link carries the keyset cursor."
+        )
+        return response_schema
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Keyset cursor; pass an empty value to start from the first page.",
+                "schema": {"type": "string"},
+            }
+        ]
+
+    def _seek(self, position):
+        """
+        Rows strictly after ``position`` in keyset order, e.g. for (-created_at, -id):
+        created_at < c OR (created_at = c AND id < i).
+        """
+        conditions = []
+        for index, field in enumerate(self.keyset_ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            equal = {
+                previous.lstrip("-"): value
+                for previous, value in zip(self.keyset_ordering[:index], position, strict=False)
+            }
+            conditions.append(Q(**equal, **{f"{name}__{lookup}": position[index]}))
+        return reduce(or_, conditions)
+
+    def _encode_cursor(self, position):
+        raw = json.dumps([str(value) for value in position])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def _decode_cursor(self, cursor):
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (binascii.Error, ValueError) as e:
+            raise NotFound("Invalid cursor.") from e
+
+        if not isinstance(position, list) or len(position) != len(self.keyset_ordering):
+            raise NotFound("Invalid cursor.")
+        return position
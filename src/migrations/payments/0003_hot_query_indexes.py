@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_payment_user_alter_payment_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['user', 'membership_id', 'status', 'created_at'], name='payment_user_plan_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('status', 'PENDING')), fields=['user', 'membership_id', 'created_at'], name='payment_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('session_id__isnull', False), ('status', 'PENDING')), fields=['id'], name='payment_pending_session_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.10 on 2026-10-17 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0007_payment_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='stripecustomer',
+            name='default_payment_method',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='type',
+            field=models.CharField(choices=[('MEMBERSHIP_PURCHASE', 'Membership Purchase'), ('UPGRADE_FEE', 'Upgrade Fee'), ('RENEWAL', 'Renewal')], max_length=50),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.10 on 2026-10-17 19:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_current_membership(apps, schema_editor):
+    User = apps.get_model("user", "User")
+    Membership = apps.get_model("membership", "Membership")
+    User.objects.update(
+        current_membership=Subquery(
+            Membership.objects.filter(member=OuterRef("pk"), status__in=["ACTIVE", "FROZEN"])
+            .order_by("-end_date", "-id")
+            .values("id")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0003_keyset_pagination_indexes'),
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='current_membership',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='membership.membership'),
+        ),
+        migrations.RunPython(backfill_current_membership, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-17 19:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_user_current_membership'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='access_card',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True, verbose_name='access card'),
+        ),
+    ]